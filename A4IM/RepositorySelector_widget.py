@@ -8,6 +8,8 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
 import requests
+from http_cache import http_get
+from fetch_policy import HostUnavailableError
 
 class RepositorySelector(QMainWindow):
     def __init__(self):
@@ -254,7 +256,7 @@ class RepositorySelector(QMainWindow):
             if 'github.com' in url:
                 # GitHub API check
                 api_url = url.replace('github.com', 'api.github.com/repos')
-                response = requests.get(api_url, timeout=10)
+                response = http_get(api_url, timeout=10)
             elif 'gitlab.com' in url:
                 # GitLab API check - extract project path and use GitLab API
                 # Format: https://gitlab.com/username/project -> username%2Fproject
@@ -262,7 +264,7 @@ class RepositorySelector(QMainWindow):
                 if len(path_parts) >= 2:
                     project_path = '%2F'.join(path_parts)  # URL encode the forward slashes
                     api_url = f"https://gitlab.com/api/v4/projects/{project_path}"
-                    response = requests.get(api_url, timeout=10)
+                    response = http_get(api_url, timeout=10)
                 else:
                     raise requests.RequestException("Invalid GitLab URL format")
             else:
@@ -281,7 +283,7 @@ class RepositorySelector(QMainWindow):
                 if reply != QMessageBox.Yes:
                     return
                     
-        except requests.RequestException as e:
+        except (requests.RequestException, HostUnavailableError) as e:
             # Ask user if they want to continue without verification
             reply = QMessageBox.question(self, "Network Error", 
                                        f"Could not verify repository due to network error: {str(e)}\n"
@@ -353,7 +355,7 @@ class RepositorySelector(QMainWindow):
             # Force fetch the latest version from GitHub
             url = "https://raw.githubusercontent.com/MatthewBeddows/ArchitectList/main/architectList.txt"
             headers = {'Cache-Control': 'no-cache', 'Pragma': 'no-cache'}
-            response = requests.get(url, headers=headers, verify=True)
+            response = http_get(url, timeout=30, headers=headers, verify=True)
             response.raise_for_status()
             
             print("Raw content from GitHub:", response.text)
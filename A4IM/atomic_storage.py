@@ -0,0 +1,206 @@
+"""
+Atomic Storage Module
+Crash-safe file writes and a cross-process lock per project folder.
+
+Several app instances may work on the same "Downloaded Repositories" tree.
+Every write goes to a temp file in the target directory, is fsynced and then
+renamed over the target, so readers see either the old or the new file and
+never a truncated one. Read-modify-write updates (ModuleInfo.txt status
+edits, the hierarchy cache) hold the project's advisory lock so two
+instances can't interleave.
+"""
+
+import os
+import time
+import tempfile
+import threading
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+PROJECTS_ROOT = "Downloaded Repositories"
+LOCK_FILENAME = ".lock"
+
+
+class LockTimeout(Exception):
+    """Another process held the project lock for longer than the timeout"""
+
+
+def _fsync_directory(directory):
+    """Persist a rename on POSIX; directories can't be opened for fsync on Windows"""
+    if os.name == 'nt':
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _umask():
+    """The process umask (os.umask can only be read by setting it)"""
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+_UMASK = _umask()
+
+
+def atomic_write(path, data, encoding='utf-8'):
+    """
+    Replace path with data (str or bytes) via temp file + fsync + rename
+
+    The new file keeps the mode of the one it replaces; a new file gets the
+    usual 0666 minus the umask rather than mkstemp's 0600.
+
+    Raises:
+        OSError: the write failed; the previous file is left untouched
+    """
+    if isinstance(data, str):
+        data = data.encode(encoding)
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except OSError:
+        mode = 0o666 & ~_UMASK
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".part")
+    try:
+        try:
+            os.chmod(tmp_path, mode)
+        except OSError:
+            pass  # Filesystems without POSIX modes
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(directory)
+
+
+def project_dir_for(path):
+    """
+    The project folder (Downloaded Repositories/<project>) that contains path,
+    or path's own directory if it isn't inside one
+    """
+    absolute = os.path.abspath(path)
+    current = absolute
+    while True:
+        parent = os.path.dirname(current)
+        if parent == current:
+            return os.path.dirname(absolute)
+        if os.path.basename(parent) == PROJECTS_ROOT:
+            return current
+        current = parent
+
+
+class ProjectLock:
+    """
+    Advisory lock on a project folder, shared by all threads of this process
+
+    Usage:
+        with ProjectLock(project_dir):
+            ... read, modify and atomic_write files ...
+    """
+    _held = {}  # lock file path -> [file object, depth, RLock]
+    _held_guard = threading.Lock()
+
+    def __init__(self, project_dir, timeout=10.0):
+        self.lock_path = os.path.abspath(os.path.join(project_dir, LOCK_FILENAME))
+        self.timeout = timeout
+
+    @classmethod
+    def for_path(cls, path, timeout=10.0):
+        """Lock of the project folder that contains path"""
+        return cls(project_dir_for(path), timeout)
+
+    def _entry(self):
+        with self._held_guard:
+            entry = self._held.get(self.lock_path)
+            if entry is None:
+                entry = [None, 0, threading.RLock()]
+                self._held[self.lock_path] = entry
+            return entry
+
+    @staticmethod
+    def _try_lock(f):
+        try:
+            if os.name == 'nt':
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def _unlock(f):
+        try:
+            if os.name == 'nt':
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        except OSError:
+            pass
+
+    def acquire(self):
+        entry = self._entry()
+        thread_lock = entry[2]
+        if not thread_lock.acquire(timeout=self.timeout):
+            raise LockTimeout(f"Timed out waiting for {self.lock_path}")
+        if entry[1] > 0:
+            entry[1] += 1  # Re-entrant within this thread
+            return self
+
+        try:
+            os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+            f = open(self.lock_path, 'a+b')
+            deadline = time.monotonic() + self.timeout
+            while not self._try_lock(f):
+                if time.monotonic() >= deadline:
+                    f.close()
+                    raise LockTimeout(f"Another instance is holding {self.lock_path}")
+                time.sleep(0.05)
+        except BaseException:
+            thread_lock.release()
+            raise
+        entry[0] = f
+        entry[1] = 1
+        return self
+
+    def release(self):
+        entry = self._entry()
+        entry[1] -= 1
+        if entry[1] == 0:
+            self._unlock(entry[0])
+            entry[0].close()
+            entry[0] = None
+        entry[2].release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+def locked_atomic_write(path, data, encoding='utf-8'):
+    """atomic_write while holding the lock of the project folder that contains path"""
+    with ProjectLock.for_path(path):
+        atomic_write(path, data, encoding)
@@ -0,0 +1,258 @@
+"""
+Benchmark Module
+Headless timings of the ModuleInfo parse -> hierarchy build -> cache round trip.
+
+A synthetic corpus of ModuleInfo.txt files (varied [Module Address] counts,
+long multi-line [Module Info] blocks) is generated for each requested size
+and pushed through the same code the app runs:
+
+    parse       parse_module_info_text over every file's content
+    read_cold   read_module_info on files not yet in the parse cache
+    read_warm   read_module_info again (unchanged files, cache hits)
+    build       HierarchyCrawler.run() with an in-memory fetch function
+    save        save_hierarchy under the project lock, as save_hierarchy_cache does
+    load        load_hierarchy (top level only, as load_hierarchy_cache does)
+    load_full   load_hierarchy plus decoding every subtree
+
+Every run is appended to a JSON history file together with the commit it was
+run on, and compared against the previous run so regressions show up.
+
+Usage:
+    python benchmark.py                      # 10, 100, 1000 and 10000 modules
+    python benchmark.py --sizes 10 1000 --repeat 5 --output results.json
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import datetime
+import tempfile
+import subprocess
+import contextlib
+
+from hierarchy_crawler import HierarchyCrawler
+from hierarchy_store import save_hierarchy, load_hierarchy
+from metadata_writer import MetadataWriter
+from module_info import parse_module_info_text, ModuleInfoCache
+from atomic_storage import ProjectLock
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+DEFAULT_OUTPUT = "benchmark_results.json"
+BENCH_HOST = "https://bench.invalid/bench"
+
+WORDS = ['bracket', 'motor', 'sensor', 'frame', 'board', 'housing', 'driver', 'mount',
+         'power', 'supply', 'gear', 'shaft', 'panel', 'cable', 'enclosure', 'controller',
+         'coil', 'magnet', 'shim', 'gradient', 'amplifier', 'preamp', 'phantom', 'bore']
+
+
+def generate_corpus(size, seed=0):
+    """
+    Build a hierarchy of size modules as {address: ModuleInfo.txt content}
+
+    Modules get 0-12 children (so address counts vary) and a [Module Info]
+    block of 1-40 lines. Returns (root address, corpus).
+    """
+    rng = random.Random(seed)
+    addresses = [f"{BENCH_HOST}/module-{i}" for i in range(size)]
+    children = {i: [] for i in range(size)}
+    next_id = 1
+    queue = [0]
+    while next_id < size:
+        parent = queue.pop(0) if queue else rng.randrange(next_id)
+        for _ in range(rng.choice([0, 1, 2, 3, 4, 6, 8, 12])):
+            if next_id >= size:
+                break
+            children[parent].append(next_id)
+            queue.append(next_id)
+            next_id += 1
+
+    corpus = {}
+    for i, address in enumerate(addresses):
+        info_lines = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 14)))
+                      for _ in range(rng.randint(1, 40))]
+        lines = [f"[Module Name] {rng.choice(WORDS).title()} {i}",
+                 f"[Module Info] {info_lines[0]}"]
+        lines.extend(info_lines[1:])
+        lines.append("[Module Branch] main")
+        lines.extend(f"[Module Address] {addresses[child]}" for child in children[i])
+        lines.append(f"[Team/Assigned] {rng.choice(['None', 'Mechanical', 'Electronics'])}")
+        lines.append(f"[Completed] {rng.choice(['Yes', 'No', 'In progress'])}")
+        corpus[address] = '\n'.join(lines) + '\n'
+    return addresses[0], corpus
+
+
+def write_corpus(corpus, directory):
+    """Write the corpus as <module>/lib/ModuleInfo.txt files; returns their paths"""
+    paths = []
+    for address, content in corpus.items():
+        path = os.path.join(directory, address.rsplit('/', 1)[-1], "lib", "ModuleInfo.txt")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        paths.append(path)
+    return paths
+
+
+def best_of(repeat, func):
+    """Fastest of repeat timed calls, plus the last call's return value"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def count_modules(modules, seen=None):
+    """Decode every subtree and count distinct module dicts"""
+    seen = set() if seen is None else seen
+    for module in modules.values():
+        if id(module) not in seen:
+            seen.add(id(module))
+            count_modules(module.get('submodules', {}), seen)
+    return len(seen)
+
+
+def bench_size(size, repeat, work_dir, seed=0):
+    """Run every stage for one corpus size; returns {stage: seconds, ...}"""
+    root, corpus = generate_corpus(size, seed)
+    project_dir = os.path.join(work_dir, "Downloaded Repositories", f"bench-{size}")
+    paths = write_corpus(corpus, project_dir)
+    contents = list(corpus.values())
+    results = {
+        'modules': size,
+        'corpus_bytes': sum(len(content.encode('utf-8')) for content in contents),
+    }
+
+    results['parse'], _ = best_of(repeat, lambda: [parse_module_info_text(c) for c in contents])
+
+    def read_cold():
+        cache = ModuleInfoCache(max_entries=size)
+        return cache, [cache.read(path) for path in paths]
+    results['read_cold'], (cache, _) = best_of(repeat, read_cold)
+    results['read_warm'], _ = best_of(repeat, lambda: [cache.read(path) for path in paths])
+
+    metadata_dir = os.path.join(project_dir, ".metadata")
+    writer = MetadataWriter()
+
+    def build():
+        crawler = HierarchyCrawler(root, lambda address, branch=None: corpus.get(address),
+                                   metadata_dir, root_name="bench", resolve_heads=False,
+                                   metadata_writer=writer)
+        built = {}
+        crawler.finished.connect(lambda modules: built.update(modules=modules))
+        with contextlib.redirect_stdout(io.StringIO()):  # The crawler logs every module
+            crawler.run()
+        return built['modules']
+    results['build'], modules = best_of(repeat, build)
+    results['metadata_flush'], _ = best_of(1, lambda: writer.flush())
+    if count_modules(modules) != size:
+        raise RuntimeError(f"Built {count_modules(modules)} modules, expected {size}")
+
+    cache_path = os.path.join(project_dir, "hierarchy_cache.bin")
+
+    def save():
+        with ProjectLock.for_path(cache_path):
+            save_hierarchy(cache_path, modules, {'cached_at': datetime.datetime.now().isoformat(),
+                                                 'initial_repo_url': root})
+    with contextlib.redirect_stdout(io.StringIO()):
+        results['save'], _ = best_of(repeat, save)
+    results['cache_bytes'] = os.path.getsize(cache_path)
+
+    results['load'], _ = best_of(repeat, lambda: load_hierarchy(cache_path))
+
+    def load_full():
+        loaded, _meta = load_hierarchy(cache_path)
+        return count_modules(loaded)
+    results['load_full'], loaded_count = best_of(repeat, load_full)
+    if loaded_count != size:
+        raise RuntimeError(f"Loaded {loaded_count} modules, expected {size}")
+    return results
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    try:
+        with open(path, 'r') as f:
+            history = json.load(f)
+        return history if isinstance(history, list) else []
+    except (OSError, ValueError):
+        return []
+
+
+def print_run(run, previous=None):
+    """Print a run's timings, with the change against the previous run where sizes match"""
+    previous_sizes = {r['modules']: r for r in previous['results']} if previous else {}
+    stages = ['parse', 'read_cold', 'read_warm', 'build', 'metadata_flush', 'save', 'load', 'load_full']
+    print(f"\n{'modules':>8} " + ' '.join(f"{stage:>16}" for stage in stages))
+    for result in run['results']:
+        before = previous_sizes.get(result['modules'])
+        cells = []
+        for stage in stages:
+            cell = f"{result[stage] * 1000:.1f}ms"
+            if before and before.get(stage):
+                cell += f" {(result[stage] / before[stage] - 1) * 100:+.0f}%"
+            cells.append(f"{cell:>16}")
+        print(f"{result['modules']:>8} " + ' '.join(cells))
+    if previous:
+        print(f"\nChanges are against the run on {previous.get('commit') or 'unknown commit'} "
+              f"({previous.get('timestamp')})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ModuleInfo parsing, hierarchy build and the cache")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Corpus sizes in modules")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed repetitions per stage (best is kept)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="JSON history file to append results to")
+    parser.add_argument('--keep', action='store_true', help="Keep the generated corpus directory")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="a4im-bench-")
+    try:
+        results = []
+        for size in args.sizes:
+            print(f"Benchmarking {size} modules...")
+            results.append(bench_size(size, args.repeat, work_dir, args.seed))
+    finally:
+        if args.keep:
+            print(f"Corpus kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    run = {
+        'commit': current_commit(),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'results': results,
+    }
+    history = load_history(args.output)
+    print_run(run, history[-1] if history else None)
+    history.append(run)
+    with open(args.output, 'w') as f:
+        json.dump(history, f, indent=2)
+    print(f"\nResults appended to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
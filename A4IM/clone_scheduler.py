@@ -0,0 +1,285 @@
+"""
+Clone Scheduler Module
+Clones many module repositories in parallel for tree downloads and hierarchy sync.
+
+A single QThread drives a worker pool. Tasks are started in hierarchy order:
+a module only becomes eligible once its parent's clone has finished, and
+shallower modules go first. Concurrent clones against one host are capped so
+we don't get rate limited. Progress is reported as one aggregate (n/m,
+bytes received, ETA) and failures are collected into one summary.
+
+stop() cancels the clones that are running through their TransferMonitors;
+they abort at their next transfer callback and leave nothing behind.
+
+Given a DownloadQueue (see download_queue), the scheduler journals its tasks
+there, so a run cut short by closing the app can be resumed at next launch.
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from download_profiles import clone_with_profile, DEFAULT_PROFILE
+from transfer_progress import TransferMonitor, CloneCancelled, format_bytes, format_eta, format_transfer
+from download_manifest import record_download, get_manifest, has_repo_content
+
+
+class CloneTask:
+    """One repository to clone; parent is the key of the task that must finish first"""
+
+    def __init__(self, name, url, local_path, branch=None, parent=None, depth=0, profile=None):
+        self.name = name
+        self.url = url
+        self.local_path = local_path
+        self.branch = branch
+        self.parent = parent
+        self.depth = depth
+        self.profile = profile  # Overrides the scheduler's profile (resumed downloads)
+        self.monitor = None  # TransferMonitor while the clone runs
+
+    @property
+    def received_bytes(self):
+        return self.monitor.snapshot['received_bytes'] if self.monitor else 0
+
+    @property
+    def key(self):
+        return os.path.abspath(self.local_path)
+
+    @property
+    def host(self):
+        url = self.url if '://' in self.url else 'https://' + self.url
+        return urlparse(url).netloc.lower()
+
+
+def tasks_from_modules(modules, repo_dir, names=None):
+    """
+    CloneTasks for every repository in a modules hierarchy, each linked to its parent's task
+
+    Args:
+        names: Optional set of repository names to keep; parents outside it impose no order
+    """
+    tasks = []
+    seen = set()
+
+    def visit(submodules, parent_key, depth):
+        for module in submodules.values():
+            repo = module.get('repository', {})
+            name = repo.get('name')
+            key = parent_key
+            if name and repo.get('address') and (names is None or name in names):
+                task = CloneTask(name, repo['address'].rstrip('/'), os.path.join(repo_dir, name),
+                                 repo.get('branch'), parent=parent_key, depth=depth)
+                key = task.key
+                if key in seen:
+                    continue  # Shared module, already scheduled under another parent
+                seen.add(key)
+                tasks.append(task)
+            visit(module.get('submodules', {}), key, depth + 1)
+
+    visit(modules, None, 0)
+    return tasks
+
+
+class CloneScheduler(QThread):
+    """
+    Background thread that clones CloneTasks in a worker pool
+
+    finished carries a summary dict: succeeded (names), failed ((name, error) pairs),
+    cancelled, unfinished (names of clones aborted or never started), elapsed (seconds) and bytes.
+    """
+    task_started = pyqtSignal(str)  # task key
+    task_finished = pyqtSignal(str, bool, str)  # task key, success, message
+    progress = pyqtSignal(object)  # aggregate progress dict, see _report
+    finished = pyqtSignal(object)  # summary dict
+
+    def __init__(self, tasks, max_workers=4, per_host_limit=3, report_interval=0.5,
+                 profile=DEFAULT_PROFILE, download_queue=None):
+        """
+        Args:
+            tasks: CloneTasks; duplicates (same local path) are cloned once
+            max_workers: Clones running at once
+            per_host_limit: Clones running at once against a single host
+            report_interval: Seconds between aggregate progress reports while clones run
+            profile: Download profile for tasks that don't set their own (see download_profiles)
+            download_queue: Optional DownloadQueue to journal the tasks in
+        """
+        super().__init__()
+        self.tasks = []
+        keys = set()
+        for task in tasks:
+            if task.key not in keys:
+                keys.add(task.key)
+                self.tasks.append(task)
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.report_interval = report_interval
+        self.profile = profile
+        self.download_queue = download_queue
+        self.succeeded = []
+        self.failed = []
+        self.unfinished = []
+        self._started_at = None
+        self._is_running = True
+        self._cancel = threading.Event()  # Shared by every task's TransferMonitor
+
+    def stop(self):
+        """Start no further clones and abort the running ones"""
+        self._is_running = False
+        self._cancel.set()
+
+    def _clone(self, task):
+        """Runs in the worker pool"""
+        profile = task.profile or self.profile
+        if has_repo_content(task.local_path):
+            # Downloaded before this run (or by hand); a lone ModuleInfo.txt doesn't count
+            project_dir, name = os.path.split(os.path.abspath(task.local_path))
+            entry = get_manifest(project_dir).get(name)
+            if not entry or not entry.get('sha'):  # Missing, or only seeded from the folder listing
+                record_download(task.local_path)
+            return True, "Already downloaded"
+        task.monitor = TransferMonitor(task.name, cancel_event=self._cancel)
+        clone_with_profile(task.url, task.local_path, branch=task.branch, profile=profile,
+                           callbacks=task.monitor)
+        record_download(task.local_path, profile)
+        return True, "Download complete"
+
+    def _report(self, done, running):
+        """
+        Emit aggregate progress: done/total, bytes so far, current throughput, ETA,
+        and a TransferMonitor snapshot per running clone under 'repos'
+        """
+        total = len(self.tasks)
+        elapsed = time.monotonic() - self._started_at
+        repos = [task.monitor.current() for task in running if task.monitor]
+        # Running clones count for the fraction of their objects already transferred
+        progressed = done + sum(repo['fraction'] for repo in repos)
+        eta = elapsed / progressed * (total - progressed) if progressed else None
+        self.progress.emit({
+            'done': done,
+            'total': total,
+            'failed': len(self.failed),
+            'bytes': sum(task.received_bytes for task in self.tasks),
+            'rate': sum(repo['rate'] for repo in repos),
+            'eta': eta,
+            'active': [task.name for task in running],
+            'repos': repos,
+        })
+
+    def _next_ready(self, waiting, finished_keys, host_counts):
+        """Shallowest waiting task whose parent has finished and whose host has a free slot"""
+        task_keys = {task.key for task in self.tasks}
+        for task in waiting:
+            parent_done = task.parent is None or task.parent not in task_keys or task.parent in finished_keys
+            if parent_done and host_counts.get(task.host, 0) < self.per_host_limit:
+                return task
+        return None
+
+    def _collect(self, task, future):
+        """Record a finished clone's outcome, update the download queue and emit task_finished"""
+        cancelled = False
+        try:
+            ok, message = future.result()
+        except CloneCancelled:
+            ok, message = False, "Download cancelled"
+            cancelled = True
+            self.unfinished.append(task.name)
+        except Exception as e:
+            ok, message = False, str(e)
+            self.failed.append((task.name, message))
+            print(f"Failed to download {task.name}: {message}")
+        else:
+            self.succeeded.append(task.name)
+        if self.download_queue is not None:
+            if cancelled:
+                self.download_queue.requeue(task)  # Resumed next time
+            else:
+                self.download_queue.remove(task)
+        self.task_finished.emit(task.key, ok, message)
+
+    def run(self):
+        self._started_at = time.monotonic()
+        waiting = sorted(self.tasks, key=lambda task: task.depth)
+        finished_keys = set()
+        host_counts = {}
+        running = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+        if self.download_queue is not None:
+            self.download_queue.add(self.tasks, self.profile)
+
+        try:
+            self._report(0, [])
+            while self._is_running and (waiting or running):
+                while len(running) < self.max_workers:
+                    task = self._next_ready(waiting, finished_keys, host_counts)
+                    if task is None:
+                        break
+                    waiting.remove(task)
+                    host_counts[task.host] = host_counts.get(task.host, 0) + 1
+                    if self.download_queue is not None:
+                        self.download_queue.mark_running(task)
+                    running[executor.submit(self._clone, task)] = task
+                    self.task_started.emit(task.key)
+
+                if not running:
+                    break  # Nothing runnable is left (only tasks waiting on a failed start)
+
+                done, _ = wait(running, timeout=self.report_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    host_counts[task.host] -= 1
+                    finished_keys.add(task.key)
+                    self._collect(task, future)
+                self._report(len(finished_keys), running.values())
+        finally:
+            if running:
+                # Cancelled clones abort at their next transfer callback and remove their staging directory
+                wait(running)
+                for future, task in running.items():
+                    self._collect(task, future)
+            executor.shutdown(wait=False)
+        self.unfinished.extend(task.name for task in waiting)
+        if self._is_running and self.download_queue is not None:
+            for task in waiting:
+                self.download_queue.remove(task)  # Could never start; don't resume them either
+
+        self.finished.emit({
+            'succeeded': list(self.succeeded),
+            'failed': list(self.failed),
+            'cancelled': not self._is_running,
+            'unfinished': list(self.unfinished),
+            'elapsed': time.monotonic() - self._started_at,
+            'bytes': sum(task.received_bytes for task in self.tasks),
+        })
+
+
+def format_progress(progress):
+    """One-line summary of a CloneScheduler progress dict"""
+    text = f"{progress['done']}/{progress['total']} · {format_bytes(progress['bytes'])}"
+    if progress['rate']:
+        text += f" · {format_bytes(progress['rate'])}/s"
+    if progress['eta'] is not None and progress['done'] < progress['total']:
+        text += f" · ETA {format_eta(progress['eta'])}"
+    return text
+
+
+def format_repo_progress(progress):
+    """One line per running clone of a CloneScheduler progress dict"""
+    return "\n".join(format_transfer(repo) for repo in progress.get('repos', []))
+
+
+def format_summary(summary):
+    """Message text for a CloneScheduler summary dict"""
+    total = len(summary['succeeded']) + len(summary['failed']) + len(summary.get('unfinished', []))
+    lines = [f"Downloaded {len(summary['succeeded'])} of {total} repositories "
+             f"({format_bytes(summary['bytes'])} in {summary['elapsed']:.0f}s)."]
+    if summary['cancelled']:
+        lines.append(f"Download was cancelled; {len(summary['unfinished'])} repositories were not downloaded.")
+    if summary['failed']:
+        lines.append("\nFailed:")
+        lines.extend(f"  • {name}: {error}" for name, error in summary['failed'])
+    return "\n".join(lines)
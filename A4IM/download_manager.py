@@ -6,43 +6,51 @@ Handles all Git repository downloading functionality for the System View
 from PyQt5.QtCore import QThread, pyqtSignal
 from PyQt5.QtWidgets import QMessageBox
 from PyQt5.QtGui import QColor
-import pygit2
 import os
+import threading
+
+from download_profiles import clone_with_profile, DEFAULT_PROFILE
+from clone_scheduler import CloneScheduler, CloneTask, format_progress, format_repo_progress, format_summary
+from transfer_progress import TransferMonitor, CloneCancelled, format_transfer
+from download_manifest import record_download
+from download_queue import get_download_queue
 
 
 class DownloadWorker(QThread):
     """Background thread for downloading repositories"""
     progress = pyqtSignal(str)
+    transfer = pyqtSignal(object)  # TransferMonitor snapshot, throttled
     finished = pyqtSignal(bool, str)
 
-    def __init__(self, repo_url, local_path, branch=None):
+    def __init__(self, repo_url, local_path, branch=None, profile=DEFAULT_PROFILE):
         super().__init__()
         self.repo_url = repo_url
         self.local_path = local_path
         self.branch = branch
-        self._is_running = True
+        self.profile = profile
+        self._cancel = threading.Event()
 
     def stop(self):
-        """Stop the download thread"""
-        self._is_running = False
+        """Cancel the download; the clone aborts at its next transfer callback"""
+        self._cancel.set()
 
     def run(self):
         try:
-            if not self._is_running:
+            if self._cancel.is_set():
                 self.finished.emit(False, "Download cancelled")
                 return
 
             if self.branch:
                 self.progress.emit(f"Cloning repository (branch: {self.branch})...")
-                pygit2.clone_repository(self.repo_url, self.local_path, checkout_branch=self.branch)
             else:
                 self.progress.emit(f"Cloning repository...")
-                pygit2.clone_repository(self.repo_url, self.local_path)
-
-            if self._is_running:
-                self.finished.emit(True, "Download complete")
-            else:
-                self.finished.emit(False, "Download cancelled")
+            monitor = TransferMonitor(on_progress=self.transfer.emit, cancel_event=self._cancel)
+            clone_with_profile(self.repo_url, self.local_path, branch=self.branch, profile=self.profile,
+                               callbacks=monitor)
+            record_download(self.local_path, self.profile)
+            self.finished.emit(True, "Download complete")
+        except CloneCancelled:
+            self.finished.emit(False, "Download cancelled")
         except Exception as e:
             self.finished.emit(False, str(e))
 
@@ -62,41 +70,52 @@ class DownloadManager:
         """
         self.system_view = system_view
         self.download_worker = None
-        self.download_queue = []
-        self.current_download_index = 0
+        self.scheduler = None  # CloneScheduler for tree downloads
+        self.nodes_by_task = {}  # clone task key -> [(NodeItem, repo name)]
+        self.max_workers = 4
+        self.retired_workers = []  # Cancelled workers still waiting on the network
     
     def cleanup_download_worker(self):
         """Properly cleanup the download worker thread"""
         if self.download_worker:
-            # Stop the worker
-            self.download_worker.stop()
+            worker = self.download_worker
+            self.download_worker = None
+
+            # Cancel the clone; it aborts and removes its staging directory
+            worker.stop()
             
             # Disconnect signals to prevent issues
             try:
-                self.download_worker.progress.disconnect()
-                self.download_worker.finished.disconnect()
+                worker.progress.disconnect()
+                worker.transfer.disconnect()
+                worker.finished.disconnect()
             except:
                 pass
             
             # Wait for thread to finish (with timeout)
-            if self.download_worker.isRunning():
-                self.download_worker.wait(2000)  # Wait up to 2 seconds
-                
-                # Force quit if still running
-                if self.download_worker.isRunning():
-                    self.download_worker.terminate()
-                    self.download_worker.wait()
+            if worker.isRunning() and not worker.wait(2000):
+                # Stuck waiting on the network with no callback to abort from. Never
+                # terminate(): keep the thread alive until it gives up by itself
+                self.retired_workers.append(worker)
+                worker.finished.connect(lambda *_: self._release_worker(worker))
+                return
             
             # Delete the worker
-            self.download_worker.deleteLater()
-            self.download_worker = None
+            worker.deleteLater()
+
+    def _release_worker(self, worker):
+        """Delete a cancelled worker once its thread has finished"""
+        if worker in self.retired_workers:
+            self.retired_workers.remove(worker)
+        worker.deleteLater()
     
-    def download_single_module(self, node):
+    def download_single_module(self, node, profile=DEFAULT_PROFILE):
         """
         Clone the repository for a single module
 
         Args:
             node: NodeItem representing the module to download
+            profile: Download profile (see download_profiles)
         """
         repo_info = node.data.get('repository', {})
         if not repo_info or not repo_info.get('address'):
@@ -123,8 +142,9 @@ class DownloadManager:
             self.cleanup_download_worker()
 
         # Create and start download worker
-        self.download_worker = DownloadWorker(repo_url, local_path, branch)
+        self.download_worker = DownloadWorker(repo_url, local_path, branch, profile)
         self.download_worker.progress.connect(lambda msg: print(msg))
+        self.download_worker.transfer.connect(self.on_single_transfer)
         self.download_worker.finished.connect(
             lambda success, msg: self.on_download_finished(node, repo_name, success, msg)
         )
@@ -135,6 +155,10 @@ class DownloadManager:
         
         self.download_worker.start()
     
+    def on_single_transfer(self, snapshot):
+        """Show the clone's percentage, bytes, rate and ETA on the download button"""
+        self.system_view.download_module_button.setText(f"Downloading {format_transfer(snapshot)}")
+
     def on_download_finished(self, node, repo_name, success, message):
         """
         Handle download completion for a single module
@@ -178,26 +202,41 @@ class DownloadManager:
         # Clean up the worker
         self.cleanup_download_worker()
     
-    def download_node_tree(self, node):
+    def download_node_tree(self, node, profile=DEFAULT_PROFILE):
         """
-        Recursively download node and all its children
+        Download node and all its children in parallel, parents before children
         
         Args:
             node: Root NodeItem to start downloading from
+            profile: Download profile (see download_profiles)
         """
-        # Create list of all nodes to download
-        nodes_to_download = []
-        
-        def collect_nodes(n):
-            # Only add if not already downloaded
-            if not n.is_downloaded:
-                nodes_to_download.append(n)
+        if self.scheduler and self.scheduler.isRunning():
+            QMessageBox.information(self.system_view, "Download", "A download is already in progress.")
+            return
+
+        repo_dir = os.path.join("Downloaded Repositories", self.system_view.parent.repo_folder)
+        tasks = []
+        self.nodes_by_task = {}
+
+        def collect_nodes(n, parent_key, depth):
+            key = parent_key
+            repo_info = n.data.get('repository', {})
+            if not n.is_downloaded and repo_info and repo_info.get('address'):
+                repo_url = repo_info['address'].rstrip('/')
+                repo_name = repo_url.split('/')[-1].replace('.git', '')
+                task = CloneTask(repo_name, repo_url, os.path.join(repo_dir, repo_name),
+                                 repo_info.get('branch'), parent=parent_key, depth=depth)
+                key = task.key
+                if key not in self.nodes_by_task:
+                    tasks.append(task)
+                # A module shared by several parents is cloned once and marks every node
+                self.nodes_by_task.setdefault(key, []).append((n, repo_name))
             for child in n.child_nodes:
-                collect_nodes(child)
-        
-        collect_nodes(node)
+                collect_nodes(child, key, depth + 1)
+
+        collect_nodes(node, None, 0)
         
-        if not nodes_to_download:
+        if not tasks:
             QMessageBox.information(
                 self.system_view, 
                 "Complete", 
@@ -205,105 +244,56 @@ class DownloadManager:
             )
             return
         
-        # Start downloading
-        self.download_queue = nodes_to_download
-        self.current_download_index = 0
-        self.download_next_in_queue()
-    
-    def download_next_in_queue(self):
-        """Download the next module in the queue"""
-        if self.current_download_index >= len(self.download_queue):
-            # All downloads complete
-            self.system_view.download_module_button.setEnabled(True)
-            self.system_view.download_module_button.setText("Download Module")
-            self.system_view.download_module_button.hide()  # Hide since all are downloaded
-            
-            QMessageBox.information(
-                self.system_view, 
-                "Complete", 
-                "All modules downloaded successfully!"
-            )
-            
-            # Clean up
-            self.download_queue = []
-            self.cleanup_download_worker()
-            return
-        
-        current_node = self.download_queue[self.current_download_index]
-        
-        repo_info = current_node.data.get('repository', {})
-        if not repo_info or not repo_info.get('address'):
-            self.current_download_index += 1
-            self.download_next_in_queue()
-            return
-        
-        repo_url = repo_info['address'].rstrip('/')
-        branch = repo_info.get('branch')
-        repo_name = repo_url.split('/')[-1].replace('.git', '')
-        repo_dir = os.path.join("Downloaded Repositories", self.system_view.parent.repo_folder)
-        local_path = os.path.join(repo_dir, repo_name)
+        # Journaled per project, so closing the app mid-tree resumes at next launch
+        self.scheduler = CloneScheduler(tasks, max_workers=self.max_workers, profile=profile,
+                                        download_queue=get_download_queue(repo_dir))
+        self.scheduler.task_finished.connect(self.on_tree_task_finished)
+        self.scheduler.progress.connect(self.on_tree_progress)
+        self.scheduler.finished.connect(self.on_tree_download_finished)
 
-        print(f"=== Download Queue Debug ===")
-        print(f"  repo_info: {repo_info}")
-        print(f"  repo_url: {repo_url}")
-        print(f"  branch: {branch}")
-        print(f"  repo_name: {repo_name}")
-        print(f"  repo_dir: {repo_dir}")
-        print(f"  local_path: {local_path}")
-        print(f"============================")
-
-        # Clean up any existing worker
-        if self.download_worker:
-            self.cleanup_download_worker()
-
-        # Create and start download worker
-        self.download_worker = DownloadWorker(repo_url, local_path, branch)
-        self.download_worker.progress.connect(lambda msg: print(msg))
-        self.download_worker.finished.connect(
-            lambda success, msg: self.on_queue_download_finished(current_node, repo_name, success, msg)
-        )
-        
-        # Update button to show progress
         self.system_view.download_module_button.setEnabled(False)
-        self.system_view.download_module_button.setText(
-            f"Downloading {self.current_download_index + 1}/{len(self.download_queue)}..."
-        )
-        
-        self.download_worker.start()
-    
-    def on_queue_download_finished(self, node, repo_name, success, message):
-        """
-        Handle completion of a queued download
-        
-        Args:
-            node: The module node that was downloaded
-            repo_name: Name of the repository
-            success: Whether download succeeded
-            message: Success or error message
-        """
-        if success:
-            # Update node state
+        self.system_view.download_module_button.setText(f"Downloading 0/{len(tasks)}...")
+        self.scheduler.start()
+
+    def on_tree_task_finished(self, key, success, message):
+        """Mark the nodes of a finished clone as downloaded"""
+        if not success:
+            return  # Collected into the summary shown when the whole tree is done
+        for node, repo_name in self.nodes_by_task.get(key, []):
             node.is_downloaded = True
             node.download_indicator.setPlainText("✓")
             node.download_indicator.setDefaultTextColor(QColor("#32CD32"))
-            print(f"Downloaded {repo_name}")
-        else:
-            print(f"Failed to download {repo_name}: {message}")
-            # Show error but continue with remaining downloads
-            QMessageBox.warning(
-                self.system_view, 
-                "Download Error", 
-                f"Failed to download {repo_name}: {message}\n\nContinuing with remaining downloads..."
-            )
-        
-        # Clean up the current worker
-        self.cleanup_download_worker()
-        
-        # Move to next download
-        self.current_download_index += 1
-        self.download_next_in_queue()
+            if 'repository' in node.data and 'name' not in node.data['repository']:
+                node.data['repository']['name'] = repo_name
+
+    def on_tree_progress(self, progress):
+        """Show aggregate n/m, bytes and ETA on the download button and each running clone below it"""
+        self.system_view.download_module_button.setText(f"Downloading {format_progress(progress)}")
+        self.system_view.set_download_details(format_repo_progress(progress))
+
+    def on_tree_download_finished(self, summary):
+        """Re-enable the button and report every failure in one message"""
+        self.system_view.set_download_details("")
+        self.system_view.download_module_button.setEnabled(True)
+        self.system_view.download_module_button.setText("Download Module")
+        if not summary['failed'] and not summary['cancelled']:
+            self.system_view.download_module_button.hide()  # Hide since all are downloaded
+            QMessageBox.information(self.system_view, "Complete", format_summary(summary))
+        elif not summary['cancelled']:
+            QMessageBox.warning(self.system_view, "Download Errors", format_summary(summary))
+
+        if self.system_view.selected_node is not None:
+            self.system_view.node_clicked(self.system_view.selected_node)
+        self.nodes_by_task = {}
+        self.scheduler.deleteLater()
+        self.scheduler = None
     
     def shutdown(self):
         """Clean up when the system view is closed"""
         if self.download_worker:
-            self.cleanup_download_worker()
\ No newline at end of file
+            self.cleanup_download_worker()
+        for worker in list(self.retired_workers):
+            worker.wait(5000)
+        if self.scheduler:
+            self.scheduler.stop()
+            self.scheduler.wait()
\ No newline at end of file
@@ -0,0 +1,230 @@
+"""
+Download Manifest Module
+Per-project record of which module repositories are downloaded.
+
+.metadata/download_manifest.json maps each repository folder name to the
+commit it has checked out, its branch, the download profile, its size on
+disk and when it was last downloaded or updated. The download, sync and
+update paths record into it as they finish, so SystemView can tell whether
+a module is downloaded with a dict lookup instead of listing its folder.
+
+The disk stays the source of truth: reconcile() compares the manifest with
+the project folder (folders deleted or copied in by hand, commits pulled
+outside the app) and is run in the background by ManifestReconcileThread.
+A project without a manifest yet starts from a listing of its folder; the
+first reconcile fills in the commits and sizes.
+"""
+
+import os
+import json
+import time
+import threading
+
+import pygit2
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from atomic_storage import atomic_write, ProjectLock, LockTimeout
+
+MANIFEST_FILENAME = "download_manifest.json"
+MODULE_INFO_NAMES = ('moduleinfo.txt', 'moduleinfor.txt')
+
+
+def manifest_path(project_dir):
+    return os.path.join(project_dir, ".metadata", MANIFEST_FILENAME)
+
+
+def has_repo_content(path):
+    """A folder counts as downloaded if it holds anything besides a ModuleInfo.txt"""
+    try:
+        return any(entry.lower() not in MODULE_INFO_NAMES for entry in os.listdir(path))
+    except OSError:
+        return False
+
+
+def _downloaded_folders(project_dir):
+    """Names of the repository folders in a project folder that have content"""
+    try:
+        return {entry for entry in os.listdir(project_dir)
+                if not entry.startswith('.')
+                and os.path.isdir(os.path.join(project_dir, entry))
+                and has_repo_content(os.path.join(project_dir, entry))}
+    except OSError:
+        return set()
+
+
+def _directory_size(path):
+    total = 0
+    for directory, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(directory, name))
+            except OSError:
+                pass
+    return total
+
+
+def _head_of(path):
+    """(commit SHA, branch) checked out at path; (None, None) if it isn't a git repository"""
+    try:
+        repo = pygit2.Repository(path)
+        if repo.head_is_unborn:
+            return None, None
+        branch = None if repo.head_is_detached else repo.head.shorthand
+        return str(repo.head.target), branch
+    except (pygit2.GitError, KeyError):
+        return None, None
+
+
+class DownloadManifest:
+    """Thread-safe manifest of one project's downloaded repositories"""
+
+    def __init__(self, project_dir):
+        self.project_dir = project_dir
+        self.path = manifest_path(project_dir)
+        self._lock = threading.RLock()
+        self._entries = {}
+        self.exists = self._load()
+        if not self.exists:
+            self._seed()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        repos = data.get('repos') if isinstance(data, dict) else None
+        if not isinstance(repos, dict):
+            return False
+        self._entries = repos
+        return True
+
+    def _seed(self):
+        """Start a missing manifest from the repository folders on disk, without opening them"""
+        for name in _downloaded_folders(self.project_dir):
+            self._entries[name] = {'sha': None, 'branch': None, 'profile': None,
+                                   'size': None, 'updated': None}
+
+    def save(self):
+        """Write the manifest under the project lock"""
+        with self._lock:
+            content = json.dumps({'repos': self._entries}, indent=2, sort_keys=True)
+        try:
+            with ProjectLock(self.project_dir):
+                atomic_write(self.path, content)
+            self.exists = True
+        except (LockTimeout, OSError) as e:
+            print(f"Failed to save download manifest: {e}")
+
+    def get(self, name):
+        """The entry for a repository folder name, or None"""
+        with self._lock:
+            entry = self._entries.get(name)
+            return dict(entry) if entry else None
+
+    def is_downloaded(self, name):
+        with self._lock:
+            return name in self._entries
+
+    def names(self):
+        with self._lock:
+            return set(self._entries)
+
+    def _entry_for(self, name, profile=None):
+        path = os.path.join(self.project_dir, name)
+        sha, branch = _head_of(path)
+        with self._lock:
+            previous = self._entries.get(name, {})
+        return {
+            'sha': sha,
+            'branch': branch,
+            'profile': profile or previous.get('profile'),
+            'size': _directory_size(path),
+            'updated': time.time(),
+        }
+
+    def record(self, name, profile=None, save=True):
+        """Record the repository folder name as downloaded, reading its commit and size from disk"""
+        entry = self._entry_for(name, profile)
+        with self._lock:
+            self._entries[name] = entry
+        if save:
+            self.save()
+
+    def remove(self, name, save=True):
+        with self._lock:
+            removed = self._entries.pop(name, None) is not None
+        if removed and save:
+            self.save()
+
+    def reconcile(self):
+        """
+        Bring the manifest in line with the project folder
+
+        Returns:
+            Set of repository names whose downloaded state or commit changed
+        """
+        on_disk = _downloaded_folders(self.project_dir)
+        changed = set()
+        filled = False
+        for name in self.names() - on_disk:
+            self.remove(name, save=False)
+            changed.add(name)
+        for name in on_disk:
+            entry = self.get(name)
+            if entry is None:
+                self.record(name, save=False)
+                changed.add(name)
+            elif entry.get('updated') is None:
+                self.record(name, save=False)  # Seeded from the folder listing
+                filled = True
+            elif _head_of(os.path.join(self.project_dir, name))[0] != entry.get('sha'):
+                self.record(name, save=False)  # Pulled or reset outside the app
+                changed.add(name)
+        if changed or filled or not self.exists:
+            self.save()
+        return changed
+
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+
+def get_manifest(project_dir):
+    """
+    Return the shared DownloadManifest of a project folder
+
+    Cheap enough for the GUI thread: a project without a manifest file is
+    only seeded from its folder listing (see ManifestReconcileThread).
+    """
+    key = os.path.abspath(project_dir)
+    with _manifests_lock:
+        if key not in _manifests:
+            _manifests[key] = DownloadManifest(project_dir)
+        return _manifests[key]
+
+
+def record_download(local_path, profile=None):
+    """Record a just downloaded or updated checkout in its project's manifest"""
+    local_path = os.path.abspath(local_path)
+    try:
+        get_manifest(os.path.dirname(local_path)).record(os.path.basename(local_path), profile)
+    except Exception as e:
+        print(f"Failed to record {local_path} in the download manifest: {e}")
+
+
+class ManifestReconcileThread(QThread):
+    """Background reconcile of a project's manifest; finished carries the changed names"""
+    finished = pyqtSignal(object)
+
+    def __init__(self, project_dir):
+        super().__init__()
+        self.project_dir = project_dir
+
+    def run(self):
+        try:
+            changed = get_manifest(self.project_dir).reconcile()
+        except Exception as e:
+            print(f"Download manifest reconcile failed: {e}")
+            changed = set()
+        self.finished.emit(changed)
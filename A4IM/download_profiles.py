@@ -0,0 +1,237 @@
+"""
+Download Profiles Module
+How much of a module repository to download.
+
+    docs-only  Latest commit, with only the paths the app reads checked out
+               (lib/, src/doc/, docs/, doc/, orshards/, CSVs and the README).
+    shallow    Latest commit, every file.
+    full       Full history.
+
+Every profile checks out from the shared object store (see object_store), so
+re-downloading a module, in this project or another, doesn't touch the
+network. The mirror behind a checkout always holds full history: the first
+download of a module fetches it once, and the checkout itself only borrows
+objects, so shallow and full cost the same on disk. docs-only applies a
+sparse checkout to the mirror-backed repository, so only its working tree
+is smaller.
+
+Without the store (A4IM_SHARED_OBJECTS=0, or it can't be used) shallow is a
+depth-1 clone and docs-only a blobless depth-1 partial clone, so large
+CAD/STL/image files are never downloaded. docs-only needs the git command
+line for sparse checkout (and partial clone), which libgit2 doesn't
+support; without git it falls back to shallow.
+
+The profile is chosen per project (stored in .metadata/download_settings.json)
+and can be overridden in the download dialog.
+
+Every profile clones into a hidden staging directory beside the target
+(.<name>.partial-XXXX) and renames it into place only once the clone has
+finished, so a failed or cancelled clone never leaves a directory that looks
+downloaded.
+"""
+
+import os
+import json
+import time
+import shutil
+import subprocess
+from collections import OrderedDict
+
+import pygit2
+
+from atomic_storage import atomic_write
+from download_manifest import has_repo_content, MODULE_INFO_NAMES
+from object_store import clone_repository, checkout_shared
+from transfer_progress import CloneCancelled
+
+PROFILE_DOCS_ONLY = 'docs-only'
+PROFILE_SHALLOW = 'shallow'
+PROFILE_FULL = 'full'
+DEFAULT_PROFILE = PROFILE_FULL
+
+PROFILES = OrderedDict([
+    (PROFILE_DOCS_ONLY, "Docs only (smallest)"),
+    (PROFILE_SHALLOW, "Latest version (shallow)"),
+    (PROFILE_FULL, "Full history"),
+])
+
+# Non-cone sparse-checkout patterns for everything SystemView and GitBuilding open
+DOCS_ONLY_PATTERNS = [
+    '/lib/',
+    '/src/doc/',
+    '/src/lib/*.csv',
+    '/docs/',
+    '/doc/',
+    '/data/*.csv',
+    '/orshards/',
+    '/*.csv',
+    '/README*',
+    '/readme*',
+]
+
+SETTINGS_FILENAME = "download_settings.json"
+PARTIAL_MARKER = ".partial-"
+STALE_PARTIAL_AGE = 24 * 3600  # Staging directories older than this were left by a crash
+GIT_POLL_INTERVAL = 0.2  # Seconds between cancellation checks while the git command line runs
+
+
+def settings_path(project_dir):
+    return os.path.join(project_dir, ".metadata", SETTINGS_FILENAME)
+
+
+def load_project_profile(project_dir):
+    """The project's download profile, or DEFAULT_PROFILE"""
+    try:
+        with open(settings_path(project_dir), 'r') as f:
+            profile = json.load(f).get('profile')
+    except (OSError, ValueError, AttributeError):
+        return DEFAULT_PROFILE
+    return profile if profile in PROFILES else DEFAULT_PROFILE
+
+
+def save_project_profile(project_dir, profile):
+    """Remember profile as the project's default"""
+    path = settings_path(project_dir)
+    try:
+        with open(path, 'r') as f:
+            settings = json.load(f)
+    except (OSError, ValueError):
+        settings = {}
+    settings['profile'] = profile
+    atomic_write(path, json.dumps(settings, indent=2))
+
+
+def git_executable():
+    """Path of the git command line, or None"""
+    return shutil.which('git')
+
+
+def _is_cancelled(callbacks):
+    return bool(getattr(callbacks, 'cancelled', False))
+
+
+def run_git(git, args, cwd=None, callbacks=None):
+    """
+    Run git, killing it if callbacks is cancelled meanwhile
+
+    Raises:
+        pygit2.GitError: git failed
+        CloneCancelled: callbacks was cancelled
+    """
+    env = dict(os.environ, GIT_TERMINAL_PROMPT='0')  # Never hang on a credentials prompt
+    process = subprocess.Popen([git] + args, cwd=cwd, env=env, stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE, text=True)
+    while True:
+        try:
+            stdout, stderr = process.communicate(timeout=GIT_POLL_INTERVAL)
+            break
+        except subprocess.TimeoutExpired:
+            if _is_cancelled(callbacks):
+                process.kill()
+                process.communicate()
+                raise CloneCancelled("Download cancelled")
+    if process.returncode != 0:
+        lines = (stderr or stdout).strip().splitlines()
+        raise pygit2.GitError(lines[-1] if lines else f"git {args[0]} failed")
+    return stdout.strip()
+
+
+def _clone_docs_only(git, url, local_path, branch=None, callbacks=None):
+    """
+    Sparse checkout of DOCS_ONLY_PATTERNS, from the shared mirror if possible,
+    otherwise from a blobless depth-1 clone
+    """
+    if checkout_shared(url, local_path, branch=branch, callbacks=callbacks, checkout_files=False) is not None:
+        run_git(git, ['sparse-checkout', 'set', '--no-cone'] + DOCS_ONLY_PATTERNS, cwd=local_path,
+                 callbacks=callbacks)
+        run_git(git, ['read-tree', '-mu', 'HEAD'], cwd=local_path, callbacks=callbacks)
+        return
+
+    args = ['clone', '--quiet', '--filter=blob:none', '--depth', '1', '--no-checkout']
+    if branch:
+        args += ['--branch', branch]
+    run_git(git, args + [url, local_path], callbacks=callbacks)
+    run_git(git, ['sparse-checkout', 'set', '--no-cone'] + DOCS_ONLY_PATTERNS, cwd=local_path,
+             callbacks=callbacks)
+    checkout_branch = branch or run_git(git, ['symbolic-ref', '--short', 'HEAD'], cwd=local_path)
+    run_git(git, ['checkout', '--quiet', checkout_branch], cwd=local_path, callbacks=callbacks)
+
+
+def remove_stale_partials(local_path):
+    """Delete staging directories for local_path left behind by a crashed or killed app"""
+    parent, name = os.path.split(os.path.abspath(local_path))
+    prefix = f".{name}{PARTIAL_MARKER}"
+    try:
+        entries = os.listdir(parent)
+    except OSError:
+        return
+    for entry in entries:
+        path = os.path.join(parent, entry)
+        try:
+            stale = entry.startswith(prefix) and time.time() - os.path.getmtime(path) > STALE_PARTIAL_AGE
+        except OSError:
+            continue
+        if stale:
+            print(f"Removing unfinished download {path}")
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _make_staging_dir(parent, name):
+    """Create a uniquely named staging directory; os.mkdir honours the umask, unlike mkdtemp's 0700"""
+    while True:
+        path = os.path.join(parent, f".{name}{PARTIAL_MARKER}{os.urandom(4).hex()}")
+        try:
+            os.mkdir(path)
+            return path
+        except FileExistsError:
+            continue
+
+
+def _clone(url, staging_path, branch, profile, callbacks):
+    if profile == PROFILE_DOCS_ONLY:
+        git = git_executable()
+        if git:
+            _clone_docs_only(git, url, staging_path, branch, callbacks)
+            return
+        print("git not found; downloading the latest version instead of a docs-only checkout")
+        profile = PROFILE_SHALLOW
+
+    clone_repository(url, staging_path, branch=branch, callbacks=callbacks,
+                     depth=1 if profile == PROFILE_SHALLOW else 0)
+
+
+def clone_with_profile(url, local_path, branch=None, profile=DEFAULT_PROFILE, callbacks=None):
+    """
+    Clone url into local_path as much as profile asks for
+
+    The clone is staged beside local_path and renamed into place on success;
+    on any failure the staging directory is removed.
+
+    Raises:
+        pygit2.GitError: the clone failed
+        CloneCancelled: callbacks (a TransferMonitor) was cancelled
+        FileExistsError: local_path already holds more than a ModuleInfo.txt
+    """
+    if has_repo_content(local_path):
+        raise FileExistsError(f"'{local_path}' exists and is not an empty directory")
+
+    parent, name = os.path.split(os.path.abspath(local_path))
+    os.makedirs(parent, exist_ok=True)
+    remove_stale_partials(local_path)
+    # Same parent as local_path, so the rename is atomic and relative alternates stay valid
+    staging_path = _make_staging_dir(parent, name)
+    try:
+        _clone(url, staging_path, branch, profile, callbacks)
+        if _is_cancelled(callbacks):
+            raise CloneCancelled("Download cancelled")  # Cancelled after the last transfer callback
+        if os.path.isdir(local_path):
+            # Placeholder, empty or holding only a ModuleInfo.txt the clone brings its own copy of;
+            # rmdir fails if something else appeared meanwhile
+            for entry in os.listdir(local_path):
+                if entry.lower() in MODULE_INFO_NAMES:
+                    os.remove(os.path.join(local_path, entry))
+            os.rmdir(local_path)
+        os.rename(staging_path, local_path)
+    except BaseException:
+        shutil.rmtree(staging_path, ignore_errors=True)
+        raise
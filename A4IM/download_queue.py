@@ -0,0 +1,145 @@
+"""
+Download Queue Module
+Persistent queue of bulk download jobs, so tree and sync downloads survive restarts.
+
+CloneScheduler journals every task it is given into the project's
+.metadata/download_queue.json, marks it running when its clone starts, and
+drops it once the clone has succeeded or failed. Whatever is still listed
+when the app starts again was cut short by closing the app or a crash;
+pending_tasks() turns those jobs back into CloneTasks, leaving out any the
+download manifest already shows as downloaded.
+"""
+
+import os
+import json
+import time
+import threading
+
+from atomic_storage import atomic_write, ProjectLock, LockTimeout
+from clone_scheduler import CloneTask
+from download_manifest import get_manifest
+
+QUEUE_FILENAME = "download_queue.json"
+QUEUED = 'queued'
+RUNNING = 'running'
+
+
+def queue_path(project_dir):
+    return os.path.join(project_dir, ".metadata", QUEUE_FILENAME)
+
+
+class DownloadQueue:
+    """Thread-safe journal of one project's unfinished bulk download jobs"""
+
+    def __init__(self, project_dir):
+        self.project_dir = project_dir
+        self.path = queue_path(project_dir)
+        self._lock = threading.Lock()
+        self._jobs = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                jobs = json.load(f).get('jobs')
+        except (OSError, ValueError, AttributeError):
+            return {}
+        if not isinstance(jobs, list):
+            return {}
+        return {job['name']: job for job in jobs if isinstance(job, dict) and job.get('name')}
+
+    def _save(self):
+        """Write the journal (call with self._lock held); an empty queue removes the file"""
+        try:
+            with ProjectLock(self.project_dir):
+                if self._jobs:
+                    atomic_write(self.path, json.dumps({'jobs': list(self._jobs.values())}, indent=2))
+                elif os.path.exists(self.path):
+                    os.remove(self.path)
+        except (LockTimeout, OSError) as e:
+            print(f"Failed to save download queue: {e}")
+
+    def add(self, tasks, profile):
+        """Journal CloneTasks as queued; tasks already in the queue keep their place"""
+        with self._lock:
+            for task in tasks:
+                if task.name in self._jobs:
+                    continue
+                self._jobs[task.name] = {
+                    'name': task.name,
+                    'url': task.url,
+                    'branch': task.branch,
+                    'parent': os.path.basename(task.parent) if task.parent else None,
+                    'depth': task.depth,
+                    'profile': task.profile or profile,
+                    'state': QUEUED,
+                    'queued_at': time.time(),
+                }
+            self._save()
+
+    def _set_state(self, task, state):
+        with self._lock:
+            job = self._jobs.get(task.name)
+            if job is not None and job['state'] != state:
+                job['state'] = state
+                self._save()
+
+    def mark_running(self, task):
+        self._set_state(task, RUNNING)
+
+    def requeue(self, task):
+        """A cancelled clone goes back to queued, to be resumed next time"""
+        self._set_state(task, QUEUED)
+
+    def remove(self, task):
+        """Forget a job whose clone succeeded or failed"""
+        with self._lock:
+            if self._jobs.pop(task.name, None) is not None:
+                self._save()
+
+    def clear(self):
+        with self._lock:
+            self._jobs = {}
+            self._save()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._jobs)
+
+    def pending_tasks(self):
+        """
+        CloneTasks for the jobs left over from an earlier run
+
+        Jobs the download manifest shows as downloaded (finished just before
+        the app closed) are dropped from the queue instead.
+        """
+        manifest = get_manifest(self.project_dir)
+        with self._lock:
+            done = [name for name in self._jobs if manifest.is_downloaded(name)]
+            for name in done:
+                del self._jobs[name]
+            if done:
+                self._save()
+            jobs = sorted(self._jobs.values(), key=lambda job: (job.get('depth', 0), job.get('queued_at', 0)))
+
+        tasks = []
+        for job in jobs:
+            parent = job.get('parent')
+            parent_key = os.path.abspath(os.path.join(self.project_dir, parent)) if parent else None
+            task = CloneTask(job['name'], job['url'], os.path.join(self.project_dir, job['name']),
+                             job.get('branch'), parent=parent_key, depth=job.get('depth', 0))
+            task.profile = job.get('profile')
+            tasks.append(task)
+        return tasks
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_download_queue(project_dir):
+    """Return the shared DownloadQueue of a project folder"""
+    key = os.path.abspath(project_dir)
+    with _queues_lock:
+        if key not in _queues:
+            _queues[key] = DownloadQueue(project_dir)
+        return _queues[key]
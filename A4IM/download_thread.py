@@ -1,7 +1,9 @@
 import os
-import pygit2
 import datetime
 from PyQt5.QtCore import QThread, pyqtSignal, pyqtSlot
+from object_store import clone_repository
+from repo_updater import update_repository, UPDATED
+from download_manifest import record_download
 
 class DownloadThread(QThread):
     progress = pyqtSignal(int)
@@ -26,23 +28,17 @@ class DownloadThread(QThread):
             repo_updated = False
             if os.path.exists(local_path):
                 try:
-                    # Open existing repository
-                    repo = pygit2.Repository(local_path)
-                    # Get current remote
-                    remote = repo.remotes["origin"]
-                    # Fetch and merge changes
-                    remote.fetch()
-                    # Hard reset to latest
-                    remote_master = repo.lookup_reference('refs/remotes/origin/master')
-                    repo.reset(remote_master.target, pygit2.GIT_RESET_HARD)
-                    repo_updated = True
+                    # Fetch and fast-forward the checked out branch; never reset local work
+                    status, message = update_repository(local_path)
+                    print(f"{repo_name}: {message}")
+                    repo_updated = status == UPDATED
                 except Exception as e:
                     print(f"Failed to update {repo_name}: {e}")
             else:
                 try:
                     print(f"Cloning {url} to {local_path}")
-                    # Clone with pygit2
-                    pygit2.clone_repository(url, local_path)
+                    # Clone through the shared object store
+                    clone_repository(url, local_path)
                     repo_updated = True
                 except Exception as e:
                     print(f"Failed to clone {url}: {e}")
@@ -50,6 +46,7 @@ class DownloadThread(QThread):
             # Add timestamp to ModuleInfo.txt if repo was updated or cloned
             if repo_updated:
                 self.add_timestamp_to_module_info(local_path)
+                record_download(local_path)
                 
             self.progress.emit(int((i + 1) / len(self.repo_urls) * 100))
         
@@ -0,0 +1,207 @@
+"""
+Fetch Policy Module
+Timeouts, retries and circuit breaking for metadata requests.
+
+Every host gets its own connect/read timeouts and a cap on the requests in
+flight against it at once, shared by every caller (short speculative probes
+can opt out, see module_fetcher). Connection errors,
+timeouts, 429 and 5xx responses are retried with jittered exponential
+backoff, and repeated failures trip a per-host circuit breaker, so the rest
+of a crawl fails fast against a dead or rate-limiting host instead of
+waiting out every timeout of every module.
+"""
+
+import time
+import random
+import threading
+from contextlib import nullcontext
+from urllib.parse import urlparse
+
+import requests
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HostUnavailableError(IOError):
+    """A host could not be reached after retrying, or its circuit breaker is open"""
+
+    def __init__(self, host, message, cached=None):
+        super().__init__(message)
+        self.host = host
+        self.cached = cached  # Last known content for the request, if the caller had one
+
+
+class CircuitOpenError(HostUnavailableError):
+    """Raised without touching the network while a host's circuit breaker is open"""
+
+
+class HostPolicy:
+    """Timeouts and retry schedule for one host"""
+
+    def __init__(self, connect_timeout=5, read_timeout=20, max_attempts=3,
+                 base_delay=0.5, max_delay=8.0, max_connections=4):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_connections = max_connections  # Requests in flight at once, whoever sends them
+
+    def backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential delay before retry number attempt + 1, honouring Retry-After"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        try:
+            delay = max(delay, min(self.max_delay, float(retry_after)))
+        except (TypeError, ValueError):
+            pass
+        return delay
+
+
+HOST_POLICIES = {
+    'raw.githubusercontent.com': HostPolicy(read_timeout=10),
+    'github.com': HostPolicy(read_timeout=10),
+    'api.github.com': HostPolicy(read_timeout=30),
+    'gitlab.com': HostPolicy(read_timeout=30),
+}
+
+
+class CircuitBreaker:
+    """
+    Per-host breaker: opens after failure_threshold consecutive failures and
+    lets a single trial request through once reset_after seconds have passed
+    """
+
+    def __init__(self, failure_threshold=5, reset_after=60):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        """True if a request may be sent now"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if not self._trial_in_flight and time.monotonic() - self.opened_at >= self.reset_after:
+                self._trial_in_flight = True  # Half-open
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """Count a failure; returns True if this failure opened the breaker"""
+        with self._lock:
+            self.failures += 1
+            was_open = self.opened_at is not None
+            if was_open or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+            return not was_open and self.opened_at is not None
+
+
+class FetchPolicy:
+    """Applies HostPolicy timeouts/retries and a CircuitBreaker per host to session requests"""
+
+    def __init__(self, host_policies=None, default_policy=None, failure_threshold=5, reset_after=60):
+        self.host_policies = dict(HOST_POLICIES if host_policies is None else host_policies)
+        self.default_policy = default_policy or HostPolicy()
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._breakers = {}
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def policy_for(self, host):
+        return self.host_policies.get(host, self.default_policy)
+
+    def breaker_for(self, host):
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_after)
+            return self._breakers[host]
+
+    def slot_for(self, host):
+        """Semaphore bounding the requests in flight against a host"""
+        with self._lock:
+            if host not in self._slots:
+                self._slots[host] = threading.BoundedSemaphore(self.policy_for(host).max_connections)
+            return self._slots[host]
+
+    def open_hosts(self):
+        """Hosts whose circuit breaker is currently open"""
+        with self._lock:
+            return [host for host, breaker in self._breakers.items() if breaker.is_open]
+
+    def request(self, session, method, url, timeout=None, capped=True, **kwargs):
+        """
+        Send a request with the host's timeouts, retries, circuit breaker and connection cap
+
+        The cap is held only while a request is on the wire, not across backoff delays.
+
+        Args:
+            timeout: Read timeout overriding the host policy's (the connect timeout always applies)
+            capped: Take one of the host's connection slots; False for requests bounded
+                some other way (the speculative probes of a module_fetcher race)
+
+        Returns:
+            The requests.Response; 4xx responses other than 429 are returned, not retried
+
+        Raises:
+            CircuitOpenError: the host's breaker is open
+            HostUnavailableError: every attempt failed
+        """
+        host = urlparse(url).netloc.lower()
+        policy = self.policy_for(host)
+        breaker = self.breaker_for(host)
+        slot = self.slot_for(host) if capped else nullcontext()
+        read_timeout = timeout if timeout is not None else policy.read_timeout
+
+        last_error = None
+        for attempt in range(policy.max_attempts):
+            if not breaker.allow():
+                raise CircuitOpenError(host, f"Circuit open for {host}, skipping {url}")
+
+            retry_after = None
+            try:
+                with slot:
+                    response = session.request(method, url, timeout=(policy.connect_timeout, read_timeout),
+                                               **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = str(e)
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    breaker.record_success()
+                    return response
+                last_error = f"HTTP {response.status_code}"
+                retry_after = response.headers.get('Retry-After')
+
+            if breaker.record_failure():
+                print(f"Circuit breaker opened for {host} after {breaker.failures} failures")
+            if attempt + 1 < policy.max_attempts:
+                time.sleep(policy.backoff(attempt, retry_after))
+
+        raise HostUnavailableError(host, f"{url} failed after {policy.max_attempts} attempts: {last_error}")
+
+
+_default_policy = None
+_default_policy_lock = threading.Lock()
+
+
+def get_policy():
+    """Return the shared FetchPolicy"""
+    global _default_policy
+    with _default_policy_lock:
+        if _default_policy is None:
+            _default_policy = FetchPolicy()
+        return _default_policy
@@ -8,6 +8,8 @@ import subprocess
 import platform
 import webbrowser
 import re
+from atomic_storage import atomic_write, ProjectLock
+from module_info import read_module_info
 
 
 class BrowserOpenerThread(QThread):
@@ -354,51 +356,25 @@ class GitBuildingWindow(QWidget):
             self.log(f"ModuleInfo.txt file doesn't exist: {self.task_progress_file}")
             return
             
-        try:
-            with open(self.task_progress_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            self.log(f"Loading task progress from ModuleInfo.txt: {self.task_progress_file}")
-            
-            # Look for [Tasks] section
-            if '[Tasks]' not in content:
-                self.log("No [Tasks] section found in ModuleInfo.txt")
-                return
-                
-            # Extract tasks section
-            tasks_section = content.split('[Tasks]')[1]
-            # Stop at next section (any line starting with [)
-            lines = tasks_section.split('\n')
-            task_lines = []
-            for line in lines:
-                line = line.strip()
-                if line.startswith('[') and line.endswith(']') and 'Completed' not in line:
-                    # This is a new section, stop parsing tasks
-                    break
-                if line:
-                    task_lines.append(line)
-            
-            # Parse individual tasks
-            for line in task_lines:
-                if not line:
-                    continue
-                    
-                # Look for pattern: [Task Name] Completed Yes/No
-                task_match = re.match(r'\[([^\]]+)\]\s*Completed\s+(Yes|No)', line, re.IGNORECASE)
-                if task_match:
-                    task_name = task_match.group(1).strip()
-                    is_completed = task_match.group(2).lower() == 'yes'
-                    
-                    if is_completed:
-                        # Find the corresponding doc link and mark as completed
-                        for doc in self.doc_links:
-                            if task_name in doc['title'] or doc['title'] in task_name:
-                                self.completed_docs.add(doc['href'])
-                                self.log(f"Loaded completed task: {task_name}")
-                                break
-                                
-        except Exception as e:
-            self.log(f"Error loading task progress: {e}")
+        info = read_module_info(self.task_progress_file)
+        if info is None:
+            self.log(f"Error loading task progress from {self.task_progress_file}")
+            return
+
+        self.log(f"Loading task progress from ModuleInfo.txt: {self.task_progress_file}")
+
+        if not info.tasks:
+            self.log("No [Tasks] section found in ModuleInfo.txt")
+            return
+
+        for task_name, is_completed in info.tasks:
+            if is_completed:
+                # Find the corresponding doc link and mark as completed
+                for doc in self.doc_links:
+                    if task_name in doc['title'] or doc['title'] in task_name:
+                        self.completed_docs.add(doc['href'])
+                        self.log(f"Loaded completed task: {task_name}")
+                        break
 
     def save_task_progress(self):
         """Save task completion status to ModuleInfo.txt [Tasks] section"""
@@ -407,58 +383,57 @@ class GitBuildingWindow(QWidget):
             return False
             
         try:
-            # Read existing content if file exists
-            content = ""
-            if os.path.exists(self.task_progress_file):
-                with open(self.task_progress_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            
-            # Remove existing [Tasks] section if it exists
-            if '[Tasks]' in content:
-                parts = content.split('[Tasks]')
-                before_tasks = parts[0].rstrip()
-                
-                # Look for next section after tasks
-                if len(parts) > 1:
-                    after_tasks_content = parts[1]
-                    lines = after_tasks_content.split('\n')
-                    next_section_start = -1
-                    
-                    for i, line in enumerate(lines):
-                        line = line.strip()
-                        if line.startswith('[') and line.endswith(']') and 'Completed' not in line:
-                            next_section_start = i
-                            break
-                    
-                    if next_section_start >= 0:
-                        # Preserve content after tasks section
-                        after_tasks = '\n' + '\n'.join(lines[next_section_start:])
+            # Hold the project lock across the read-modify-write so other instances
+            # can't interleave their own edit of this file
+            with ProjectLock.for_path(self.task_progress_file):
+                # Read existing content if file exists
+                content = ""
+                if os.path.exists(self.task_progress_file):
+                    with open(self.task_progress_file, 'r', encoding='utf-8') as f:
+                        content = f.read()
+
+                # Remove existing [Tasks] section if it exists
+                if '[Tasks]' in content:
+                    parts = content.split('[Tasks]')
+                    before_tasks = parts[0].rstrip()
+
+                    # Look for next section after tasks
+                    if len(parts) > 1:
+                        after_tasks_content = parts[1]
+                        lines = after_tasks_content.split('\n')
+                        next_section_start = -1
+
+                        for i, line in enumerate(lines):
+                            line = line.strip()
+                            if line.startswith('[') and line.endswith(']') and 'Completed' not in line:
+                                next_section_start = i
+                                break
+
+                        if next_section_start >= 0:
+                            # Preserve content after tasks section
+                            after_tasks = '\n' + '\n'.join(lines[next_section_start:])
+                        else:
+                            after_tasks = ""
                     else:
                         after_tasks = ""
-                else:
-                    after_tasks = ""
-                    
-                content = before_tasks + after_tasks
-            
-            # Add [Tasks] section
-            if not content.endswith('\n') and content:
-                content += '\n'
-            content += '[Tasks]\n'
-            
-            # Add each task with its completion status
-            for doc in self.doc_links:
-                task_name = doc['title']
-                is_completed = doc['href'] in self.completed_docs
-                completion_text = 'Yes' if is_completed else 'No'
-                content += f'[{task_name}] Completed {completion_text}\n'
-            
-            # Write back to file
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.task_progress_file), exist_ok=True)
-            
-            with open(self.task_progress_file, 'w', encoding='utf-8') as f:
-                f.write(content)
-                
+
+                    content = before_tasks + after_tasks
+
+                # Add [Tasks] section
+                if not content.endswith('\n') and content:
+                    content += '\n'
+                content += '[Tasks]\n'
+
+                # Add each task with its completion status
+                for doc in self.doc_links:
+                    task_name = doc['title']
+                    is_completed = doc['href'] in self.completed_docs
+                    completion_text = 'Yes' if is_completed else 'No'
+                    content += f'[{task_name}] Completed {completion_text}\n'
+
+                # Write back to file (atomic_write creates the directory if needed)
+                atomic_write(self.task_progress_file, content)
+
             self.log(f"Saved task progress to ModuleInfo.txt: {self.task_progress_file}")
             return True
             
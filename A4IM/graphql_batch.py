@@ -0,0 +1,175 @@
+"""
+GraphQL Batch Module
+Fetches the lib/ModuleInfo.txt blobs of many sibling repositories in one
+GraphQL query per host instead of one raw-file request per repository.
+
+GitHub's GraphQL API always needs a token, and GitLab's is only used when a
+token is configured; without one the crawler falls back to the raw-URL path
+in fetch_module_info_only. The endpoints can be overridden so the adapter can
+be pointed at a local stand-in server serving fixture data.
+"""
+
+import os
+import json
+
+from http_cache import get_session
+from fetch_policy import get_policy
+from module_fetcher import (MODULE_INFO_FILENAMES, DEFAULT_BRANCHES,
+                            ProbeTable, normalize_repo_address)
+
+GITHUB_GRAPHQL_URL = "https://api.github.com/graphql"
+GITLAB_GRAPHQL_URL = "https://gitlab.com/api/graphql"
+
+
+class GraphQLBatchError(Exception):
+    """Raised when a batch query fails as a whole; callers fall back to raw fetches"""
+
+
+def _literal(value):
+    """Quote a value as a GraphQL string literal"""
+    return json.dumps(value)
+
+
+def _candidate_branches(branch):
+    branches = [branch] if branch else []
+    branches.extend(b for b in DEFAULT_BRANCHES if b != branch)
+    return branches
+
+
+def _repo_path(address, host):
+    """owner/repo path of a repository address on the given host, or None"""
+    normalized = normalize_repo_address(address)
+    if not normalized.startswith(host + '/'):
+        return None
+    path = normalized[len(host) + 1:]
+    return path if path.count('/') >= 1 else None
+
+
+class GraphQLBatchFetcher:
+    """Batched ModuleInfo.txt fetches against the GitHub and GitLab GraphQL APIs"""
+
+    def __init__(self, github_token=None, gitlab_token=None,
+                 github_url=GITHUB_GRAPHQL_URL, gitlab_url=GITLAB_GRAPHQL_URL,
+                 probe_table=None, batch_size=25, timeout=30):
+        self.github_token = github_token
+        self.gitlab_token = gitlab_token
+        self.github_url = github_url
+        self.gitlab_url = gitlab_url
+        self.probe_table = probe_table
+        self.batch_size = batch_size
+        self.timeout = timeout
+
+    @classmethod
+    def from_environment(cls, probe_table=None):
+        """Build a fetcher from GITHUB_TOKEN / GITLAB_TOKEN and optional endpoint overrides"""
+        return cls(
+            github_token=os.environ.get('GITHUB_TOKEN'),
+            gitlab_token=os.environ.get('GITLAB_TOKEN'),
+            github_url=os.environ.get('A4IM_GITHUB_GRAPHQL_URL', GITHUB_GRAPHQL_URL),
+            gitlab_url=os.environ.get('A4IM_GITLAB_GRAPHQL_URL', GITLAB_GRAPHQL_URL),
+            probe_table=probe_table,
+        )
+
+    def host_for(self, address):
+        """'github.com' / 'gitlab.com' if this address can be batched, otherwise None"""
+        if self.github_token and _repo_path(address, 'github.com'):
+            return 'github.com'
+        if self.gitlab_token and _repo_path(address, 'gitlab.com'):
+            return 'gitlab.com'
+        return None
+
+    def _post(self, url, token, query):
+        response = get_policy().request(
+            get_session(), 'POST', url,
+            json={'query': query},
+            headers={'Authorization': f"Bearer {token}"},
+            timeout=self.timeout,
+        )
+        if response.status_code != 200:
+            raise GraphQLBatchError(f"GraphQL request to {url} failed with HTTP {response.status_code}")
+        payload = response.json()
+        if payload.get('data') is None:
+            raise GraphQLBatchError(f"GraphQL request to {url} failed: {payload.get('errors')}")
+        return payload['data']
+
+    def _github_batch(self, items):
+        fields = []
+        for i, (address, branch) in enumerate(items):
+            owner, name = _repo_path(address, 'github.com').split('/')[:2]
+            blobs = []
+            for j, b in enumerate(_candidate_branches(branch)):
+                for k, filename in enumerate(MODULE_INFO_FILENAMES):
+                    expression = _literal(f"{b}:lib/{filename}")
+                    blobs.append(f"b{j}_{k}: object(expression: {expression}) {{ ... on Blob {{ text }} }}")
+            fields.append(f"r{i}: repository(owner: {_literal(owner)}, name: {_literal(name)}) {{ {' '.join(blobs)} }}")
+        data = self._post(self.github_url, self.github_token, "query { " + " ".join(fields) + " }")
+
+        results = {}
+        for i, (address, branch) in enumerate(items):
+            repo = data.get(f"r{i}") or {}
+            results[(address, branch)] = self._pick(address, branch, lambda j, k:
+                                                   (repo.get(f"b{j}_{k}") or {}).get('text'))
+        return results
+
+    def _gitlab_batch(self, items):
+        fields = []
+        paths = _literal([f"lib/{filename}" for filename in MODULE_INFO_FILENAMES])
+        for i, (address, branch) in enumerate(items):
+            full_path = _repo_path(address, 'gitlab.com')
+            blobs = [f"b{j}: blobs(ref: {_literal(b)}, paths: {paths}) {{ nodes {{ path rawTextBlob }} }}"
+                     for j, b in enumerate(_candidate_branches(branch))]
+            fields.append(f"p{i}: project(fullPath: {_literal(full_path)}) {{ repository {{ {' '.join(blobs)} }} }}")
+        data = self._post(self.gitlab_url, self.gitlab_token, "query { " + " ".join(fields) + " }")
+
+        results = {}
+        for i, (address, branch) in enumerate(items):
+            repository = (data.get(f"p{i}") or {}).get('repository') or {}
+
+            def blob_text(j, k, repository=repository):
+                nodes = (repository.get(f"b{j}") or {}).get('nodes') or []
+                for node in nodes:
+                    if node.get('path') == f"lib/{MODULE_INFO_FILENAMES[k]}":
+                        return node.get('rawTextBlob')
+                return None
+
+            results[(address, branch)] = self._pick(address, branch, blob_text)
+        return results
+
+    def _pick(self, address, branch, blob_text):
+        """Return the highest-priority (branch, filename) blob and remember where it was"""
+        for j, b in enumerate(_candidate_branches(branch)):
+            for k, filename in enumerate(MODULE_INFO_FILENAMES):
+                text = blob_text(j, k)
+                if text is not None:
+                    if self.probe_table:
+                        self.probe_table.record(ProbeTable.make_key(address, branch), b, filename)
+                    return text
+        return None
+
+    def fetch_batch(self, items):
+        """
+        Fetch ModuleInfo.txt for many repositories on the same host
+
+        Args:
+            items: List of (address, branch) pairs; every address must share one host_for()
+
+        Returns:
+            Dict of (address, branch) -> content, None where the repository has no ModuleInfo.txt
+
+        Raises:
+            GraphQLBatchError: the query failed and the caller should fall back to raw fetches
+        """
+        if not items:
+            return {}
+        host = self.host_for(items[0][0])
+        batch = self._github_batch if host == 'github.com' else self._gitlab_batch
+
+        results = {}
+        for start in range(0, len(items), self.batch_size):
+            try:
+                results.update(batch(items[start:start + self.batch_size]))
+            except GraphQLBatchError:
+                raise
+            except Exception as e:
+                raise GraphQLBatchError(str(e))
+        return results
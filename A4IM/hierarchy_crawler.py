@@ -0,0 +1,410 @@
+"""
+Hierarchy Crawler Module
+Discovers the module hierarchy by fetching ModuleInfo.txt files breadth-first
+in a background worker pool, so the GUI thread never blocks on the network
+"""
+
+import os
+import datetime
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from fetch_policy import HostUnavailableError
+from graphql_batch import GraphQLBatchError
+from metadata_writer import get_metadata_writer
+from module_fetcher import normalize_repo_address, is_supported_address
+from module_info import parse_module_info_text
+from remote_heads import resolve_remote_heads
+
+
+def extract_branch_from_url(url):
+    """Extract branch name from GitLab/GitHub URL if present"""
+    if '/-/tree/' in url:
+        parts = url.split('/-/tree/')
+        if len(parts) > 1:
+            branch = parts[1].split('?')[0].strip()
+            clean_url = parts[0]
+            return clean_url, branch
+    elif '/tree/' in url:
+        parts = url.split('/tree/')
+        if len(parts) > 1:
+            branch = parts[1].split('?')[0].strip()
+            clean_url = parts[0]
+            return clean_url, branch
+    return url, None
+
+
+def module_key(address, branch=None):
+    """Identity of a module in the hierarchy: normalized repo address plus requested branch"""
+    return f"{normalize_repo_address(address)}@{branch or ''}"
+
+
+def index_modules(modules, root_url):
+    """
+    Map the crawl key of every module in a cached hierarchy to (name, module dict),
+    following the same [Module Address] entries the crawler would follow
+    """
+    known = {}
+
+    def visit(name, module, key):
+        if key in known:
+            return  # Shared module, already indexed through another parent
+        known[key] = (name, module)
+        children_by_address = {}
+        for child_name, child in module.get('submodules', {}).items():
+            address = child.get('repository', {}).get('address')
+            if address:
+                children_by_address[address] = (child_name, child)
+        for address in module.get('submodule_addresses', []):
+            clean_address, branch = extract_branch_from_url(address)
+            child = children_by_address.get(clean_address.rstrip('/'))
+            if child:
+                visit(child[0], child[1], module_key(clean_address.rstrip('/'), branch))
+
+    if modules:
+        root_name, root_module = next(iter(modules.items()))
+        clean_root, root_branch = extract_branch_from_url(root_url)
+        visit(root_name, root_module, module_key(clean_root.rstrip('/'), root_branch))
+    return known
+
+
+def patch_modules(current, updated, _patched=None, _changes=None):
+    """
+    Update a modules OrderedDict in place so it matches a freshly crawled one
+
+    Returns:
+        Dict with 'updated' (existing module dicts whose own fields changed) and
+        'structure_changed' (modules were added, removed, replaced or reordered)
+    """
+    if _changes is None:
+        _patched = {}  # id(new module) -> module dict it was merged into
+        _changes = {'updated': [], 'structure_changed': False}
+    if list(current.keys()) != list(updated.keys()):
+        _changes['structure_changed'] = True
+
+    for name in list(current.keys()):
+        if name not in updated:
+            del current[name]
+
+    for name, new_module in updated.items():
+        old_module = current.get(name)
+        if id(new_module) in _patched:
+            # Shared module already patched under another parent: reference it
+            shared = _patched[id(new_module)]
+            if (old_module is not None and old_module is not shared and
+                    list(old_module.get('submodules', {})) != list(shared.get('submodules', {}))):
+                _changes['structure_changed'] = True
+            current[name] = shared
+            if hasattr(current, 'move_to_end'):
+                current.move_to_end(name)
+            continue
+
+        same_repo = (old_module is not None and
+                     old_module.get('repository', {}).get('address') ==
+                     new_module.get('repository', {}).get('address'))
+        if same_repo:
+            old_submodules = old_module.setdefault('submodules', OrderedDict())
+            changed = False
+            for key, value in new_module.items():
+                if key != 'submodules' and old_module.get(key) != value:
+                    old_module[key] = value
+                    changed = True
+            if changed:
+                _changes['updated'].append(old_module)
+            patch_modules(old_submodules, new_module.get('submodules', OrderedDict()), _patched, _changes)
+            _patched[id(new_module)] = old_module
+        else:
+            if old_module is not None:
+                _changes['structure_changed'] = True
+            current[name] = new_module
+            _patched[id(new_module)] = new_module
+        if hasattr(current, 'move_to_end'):
+            current.move_to_end(name)
+    return _changes
+
+
+class CrawlJob:
+    """A single repository to fetch, and the children discovered in it"""
+
+    def __init__(self, address, depth, is_root=False):
+        clean_address, url_branch = extract_branch_from_url(address)
+        self.address = clean_address.rstrip('/')
+        self.url_branch = url_branch
+        self.repo_name = self.address.split('/')[-1].replace('.git', '')
+        self.key = module_key(self.address, url_branch)
+        self.depth = depth
+        self.is_root = is_root
+        self.name = None
+        self.module = None  # Module dict, None until fetched (or if the fetch failed)
+        self.commit_sha = None  # Remote branch head when the job was fetched
+        self.reused = None  # (name, module) from the previous hierarchy if the SHA is unchanged
+        self.unavailable_host = None  # Set when the fetch failed because the host was unavailable
+        self.children = []  # CrawlJobs in [Module Address] order, shared with other parents by key
+
+
+class HierarchyCrawler(QThread):
+    """
+    Background thread that builds the modules hierarchy.
+
+    Each ModuleInfo.txt is fetched in a worker pool; children are queued as
+    soon as their parent has been parsed, which makes the crawl breadth-first.
+    The number of jobs in flight against a single host is bounded, and every
+    request they send also takes one of the host's connection slots in
+    fetch_policy, so we don't get rate limited by GitHub/GitLab.
+
+    The hierarchy is treated as a DAG keyed by normalized address + branch:
+    a repository referenced by several parents is fetched once and the same
+    module dict is attached under each parent. References that would close
+    a cycle are dropped and reported in self.cycles.
+
+    Every module records the commit SHA of its branch head. When a previous
+    hierarchy is passed in as known_modules, modules whose SHA hasn't changed
+    are reused instead of re-fetched, so a refresh only downloads the
+    ModuleInfo.txt files that actually changed. Heads are resolved before the
+    fetch, so a recorded SHA is never newer than the content fetched with it:
+    a push in between only costs a refetch on the next refresh.
+
+    Modules on a host that is unavailable (fetch_func raised
+    HostUnavailableError) fall back to the HTTP-cached ModuleInfo.txt or their
+    known_modules entry when there is one; every such module is listed in
+    self.unavailable.
+    """
+    module_loaded = pyqtSignal(str, int)  # module name, depth
+    progress = pyqtSignal(int, int, str)  # fetched, discovered, repo name
+    finished = pyqtSignal(object)  # modules OrderedDict, or None if the root could not be fetched
+
+    def __init__(self, root_url, fetch_func, metadata_dir, root_name=None,
+                 max_workers=8, per_host_limit=4, batch_fetcher=None,
+                 known_modules=None, resolve_heads=True, metadata_writer=None):
+        """
+        Args:
+            root_url: Address of the architect repository (may include /-/tree/<branch>)
+            fetch_func: Callable(address, branch=None) returning ModuleInfo.txt text or None
+            metadata_dir: Folder where fetched ModuleInfo.txt copies are mirrored
+            root_name: Repository name to record for the root module
+            max_workers: Size of the fetch worker pool
+            per_host_limit: Maximum jobs in flight against a single host (requests are
+                further capped per host by fetch_policy)
+            batch_fetcher: Optional GraphQLBatchFetcher used to fetch sibling modules in one query
+            known_modules: Optional index_modules() of a previous hierarchy to reuse unchanged modules from
+            resolve_heads: Record each module's remote branch head SHA
+            metadata_writer: Write-behind stage for the .metadata mirror (defaults to the shared one)
+        """
+        super().__init__()
+        self.root_url = root_url
+        self.fetch_func = fetch_func
+        self.metadata_dir = metadata_dir
+        self.root_name = root_name
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.batch_fetcher = batch_fetcher
+        self.known_modules = known_modules or {}
+        self.resolve_heads = resolve_heads
+        self.metadata_writer = metadata_writer or get_metadata_writer()
+        self.fetched_count = 0
+        self.reused_count = 0
+        self.cycles = []  # (parent name, child name, child address) references that formed a cycle
+        self.unavailable = []  # (repo name, host, used cached data) for modules whose host was down
+        self._host_slots = {}
+        self._host_slots_lock = threading.Lock()
+        self._is_running = True
+
+    def stop(self):
+        """Stop crawling; modules fetched so far are discarded"""
+        self._is_running = False
+
+    def _host_slot(self, address):
+        host = urlparse(address if '://' in address else 'https://' + address).netloc
+        with self._host_slots_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_slots[host]
+
+    def _write_metadata(self, job, content):
+        """Queue the .metadata mirror copy; the parsed content never goes back through disk"""
+        module_info_path = os.path.join(self.metadata_dir, f"{job.repo_name}_ModuleInfo.txt")
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.metadata_writer.write(module_info_path, f"{content}\n[Deployed] {timestamp}")
+
+    def _fetch(self, jobs):
+        """
+        Runs in the worker pool: fetch ModuleInfo.txt for one job, or for a
+        batch of sibling jobs on the same host, and queue their .metadata mirrors
+
+        Returns:
+            List of contents (None where nothing was found), parallel to jobs
+        """
+        if not self._is_running:
+            return [None] * len(jobs)
+
+        with self._host_slot(jobs[0].address):
+            if self.resolve_heads:
+                # An unknown module on an unsupported host won't be fetched, so has no SHA to record
+                head_jobs = [job for job in jobs
+                             if self.known_modules.get(job.key) or is_supported_address(job.address)]
+                # One round of ref advertisements for the whole batch, before any content is fetched
+                shas = resolve_remote_heads([(job.address, job.url_branch) for job in head_jobs])
+                for job in head_jobs:
+                    job.commit_sha = shas.get((job.address, job.url_branch))
+                    known = self.known_modules.get(job.key)
+                    if (known and job.commit_sha and
+                            known[1].get('repository', {}).get('commit_sha') == job.commit_sha):
+                        job.reused = known
+
+            to_fetch = [job for job in jobs if job.reused is None]
+            fetched = None
+            if len(to_fetch) > 1:
+                items = [(job.address, job.url_branch) for job in to_fetch]
+                try:
+                    batch = self.batch_fetcher.fetch_batch(items)
+                    fetched = [batch.get(item) for item in items]
+                except (GraphQLBatchError, HostUnavailableError) as e:
+                    # The raw-file fetches note an unavailable host and fall back to cached copies
+                    print(f"Batched fetch failed, falling back to raw files: {e}")
+
+            if fetched is None:
+                fetched = [self._fetch_one(job) if self._is_running else None for job in to_fetch]
+
+        contents_by_job = dict(zip(map(id, to_fetch), fetched))
+        contents = [contents_by_job.get(id(job)) for job in jobs]
+        for job, content in zip(jobs, contents):
+            if content:
+                self._write_metadata(job, content)
+        return contents
+
+    def _fetch_one(self, job):
+        """fetch_func for a single job, noting a host outage instead of raising"""
+        try:
+            return self.fetch_func(job.address, branch=job.url_branch)
+        except HostUnavailableError as e:
+            job.unavailable_host = e.host
+            return e.cached  # HTTP-cached copy, if any
+
+    def _submit_children(self, executor, pending, children):
+        """Queue child jobs, grouping siblings that can share one GraphQL query"""
+        batches = OrderedDict()
+        for child in children:
+            host = self.batch_fetcher.host_for(child.address) if self.batch_fetcher else None
+            key = host if host else id(child)
+            batches.setdefault(key, []).append(child)
+        for jobs in batches.values():
+            pending[executor.submit(self._fetch, jobs)] = jobs
+
+    def _build_module(self, job, content):
+        """Turn fetched ModuleInfo.txt content into the module dict stored in self.modules"""
+        info = parse_module_info_text(content)
+        if job.is_root:
+            job.name = info.name or "Root Module"
+            repo_name = self.root_name or job.repo_name
+        else:
+            job.name = info.name or job.repo_name
+            repo_name = job.repo_name
+
+        job.module = {
+            'description': info.description,
+            'submodules': OrderedDict(),
+            'submodule_addresses': list(info.addresses),
+            'repository': {
+                'name': repo_name,
+                'address': job.address,
+                'branch': job.url_branch if job.url_branch else info.branch,
+                'docs_path': None,
+                'commit_sha': job.commit_sha
+            },
+            'is_downloaded': False
+        }
+        return job.module['submodule_addresses']
+
+    def _reuse_module(self, job):
+        """Carry an unchanged module over from the previous hierarchy; its children are still checked"""
+        job.name, previous = job.reused
+        job.module = dict(previous)
+        job.module['submodules'] = OrderedDict()
+        return list(previous.get('submodule_addresses', []))
+
+    def _assemble(self, job, ancestors, assembled):
+        """Attach fetched children to their parents, preserving [Module Address] order"""
+        assembled.add(job.key)
+        ancestors.add(job.key)
+        for child in job.children:
+            if child.module is None:
+                continue
+            if child.key in ancestors:
+                print(f"Warning: Cycle in module hierarchy: {job.name} -> {child.name} ({child.address})")
+                self.cycles.append((job.name, child.name, child.address))
+                continue
+            if child.key not in assembled:
+                self._assemble(child, ancestors, assembled)
+            job.module['submodules'][child.name] = child.module
+        ancestors.discard(job.key)
+
+    def run(self):
+        root = CrawlJob(self.root_url, depth=0, is_root=True)
+        jobs_by_key = {root.key: root}  # Every repository is fetched once, whoever references it
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        pending = {executor.submit(self._fetch, [root]): [root]}
+        fetched = 0
+        discovered = 1
+
+        try:
+            while pending and self._is_running:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    jobs = pending.pop(future)
+                    try:
+                        contents = future.result()
+                    except Exception as e:
+                        print(f"Error fetching module info for {jobs[0].repo_name}: {e}")
+                        contents = [None] * len(jobs)
+
+                    for job, content in zip(jobs, contents):
+                        fetched += 1
+                        if job.unavailable_host and job.reused is None:
+                            # Host is down: fall back to what we already had for this module
+                            if not content:
+                                job.reused = self.known_modules.get(job.key)
+                            self.unavailable.append((job.repo_name, job.unavailable_host,
+                                                     bool(content) or job.reused is not None))
+                        if job.reused is not None or content:
+                            if job.reused is not None:
+                                addresses = self._reuse_module(job)
+                                self.reused_count += 1
+                            else:
+                                addresses = self._build_module(job, content)
+                                self.fetched_count += 1
+                                print(f"Added module info: {job.name}")
+                            self.module_loaded.emit(job.name, job.depth)
+                            new_children = []
+                            for address in addresses:
+                                child = CrawlJob(address, depth=job.depth + 1)
+                                if child.key in jobs_by_key:
+                                    child = jobs_by_key[child.key]
+                                else:
+                                    jobs_by_key[child.key] = child
+                                    new_children.append(child)
+                                job.children.append(child)
+                            discovered += len(new_children)
+                            self._submit_children(executor, pending, new_children)
+                        else:
+                            print(f"Warning: Could not fetch module info for {job.repo_name}")
+
+                        self.progress.emit(fetched, discovered, job.repo_name)
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+        if not self._is_running or root.module is None:
+            self.finished.emit(None)
+            return
+
+        print(f"Crawl finished: {self.fetched_count} fetched, {self.reused_count} unchanged"
+              f"{f', {len(self.unavailable)} unavailable' if self.unavailable else ''}")
+        self._assemble(root, set(), set())
+        modules = OrderedDict()
+        modules[root.name] = root.module
+        self.finished.emit(modules)
@@ -0,0 +1,331 @@
+"""
+Hierarchy Store Module
+Compact binary cache of the module hierarchy with lazy subtree loading.
+
+File layout (all integers little-endian):
+    header   magic "A4HC", format version (u16), flags (u16), node count (u32),
+             meta length (u32), index offset (u64), CRC32 of everything after the header (u32)
+    meta     compact JSON: cached_at, initial_repo_url and the top-level [name, node id] list
+    records  one per module: payload length (u32) + compact JSON [fields, [[child name, node id], ...]]
+    index    node count x u64 record offsets
+
+A module shared by several parents is stored once and referenced by node id.
+The file is read in one go and closed at load (an open mapping or handle
+would stop atomic_write from replacing it on Windows); only the top-level
+modules are decoded up front and every submodules mapping decodes its
+children the first time it is touched (e.g. when SystemView lays that part
+of the graph out).
+
+The checksum is verified when the file is opened. Every save keeps the
+previous good file next to it as <name>.bak, so a torn or corrupted cache
+falls back to the last good one instead of forcing a cold crawl.
+"""
+
+import os
+import json
+import zlib
+import shutil
+import struct
+from collections import OrderedDict
+
+from atomic_storage import atomic_write
+
+MAGIC = b'A4HC'
+FORMAT_VERSION = 2
+
+HEADER = struct.Struct('<4sHHIIQI')
+LENGTH = struct.Struct('<I')
+OFFSET = struct.Struct('<Q')
+
+
+class HierarchyCacheError(Exception):
+    """The cache file is missing, truncated or in an unknown format"""
+
+
+class LazyModules(OrderedDict):
+    """
+    Submodules OrderedDict whose entries are decoded from the cache on first access
+
+    Behaves exactly like the OrderedDict it replaces once materialized.
+    """
+
+    def __init__(self, reader=None, entries=None):
+        super().__init__()
+        self._reader = reader
+        self._entries = entries
+
+    def _ensure(self):
+        if self._entries is not None:
+            entries, reader = self._entries, self._reader
+            self._entries = self._reader = None
+            for name, node_id in entries:
+                OrderedDict.__setitem__(self, name, reader.node(node_id))
+
+    def __getitem__(self, key):
+        self._ensure()
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        self._ensure()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._ensure()
+        super().__delitem__(key)
+
+    def __iter__(self):
+        self._ensure()
+        return super().__iter__()
+
+    def __reversed__(self):
+        self._ensure()
+        return super().__reversed__()
+
+    def __len__(self):
+        self._ensure()
+        return super().__len__()
+
+    def __contains__(self, key):
+        self._ensure()
+        return super().__contains__(key)
+
+    def __eq__(self, other):
+        self._ensure()
+        return super().__eq__(other)
+
+    def __repr__(self):
+        self._ensure()
+        return super().__repr__()
+
+    def __reduce__(self):
+        self._ensure()
+        return OrderedDict, (), None, None, iter(self.items())
+
+    def keys(self):
+        self._ensure()
+        return super().keys()
+
+    def values(self):
+        self._ensure()
+        return super().values()
+
+    def items(self):
+        self._ensure()
+        return super().items()
+
+    def get(self, key, default=None):
+        self._ensure()
+        return super().get(key, default)
+
+    def pop(self, key, *default):
+        self._ensure()
+        return super().pop(key, *default)
+
+    def popitem(self, last=True):
+        self._ensure()
+        return super().popitem(last)
+
+    def setdefault(self, key, default=None):
+        self._ensure()
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self._ensure()
+        super().update(*args, **kwargs)
+
+    def move_to_end(self, key, last=True):
+        self._ensure()
+        super().move_to_end(key, last)
+
+    def clear(self):
+        self._entries = self._reader = None
+        super().clear()
+
+    def copy(self):
+        self._ensure()
+        return OrderedDict(self.items())
+
+
+class HierarchyCacheReader:
+    """In-memory copy of a cache file that decodes module records on demand"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._data = f.read()
+
+        try:
+            magic, version, _flags, self.node_count, meta_length, self._index_offset, checksum = \
+                HEADER.unpack_from(self._data, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise HierarchyCacheError(f"{path} is not a version {FORMAT_VERSION} hierarchy cache")
+            if self._index_offset + self.node_count * OFFSET.size != len(self._data):
+                raise HierarchyCacheError(f"{path} is truncated")
+            if zlib.crc32(memoryview(self._data)[HEADER.size:]) != checksum:
+                raise HierarchyCacheError(f"{path} failed its checksum")
+            self.meta = json.loads(self._data[HEADER.size:HEADER.size + meta_length].decode('utf-8'))
+        except (struct.error, ValueError) as e:
+            self.close()
+            raise HierarchyCacheError(f"Corrupt hierarchy cache {path}: {e}")
+        except HierarchyCacheError:
+            self.close()
+            raise
+        self._nodes = {}
+
+    def node(self, node_id):
+        """Decode one module record (once; shared modules decode to the same dict)"""
+        module = self._nodes.get(node_id)
+        if module is None:
+            offset, = OFFSET.unpack_from(self._data, self._index_offset + node_id * OFFSET.size)
+            length, = LENGTH.unpack_from(self._data, offset)
+            start = offset + LENGTH.size
+            fields, children = json.loads(self._data[start:start + length].decode('utf-8'),
+                                          object_pairs_hook=OrderedDict)
+            module = fields
+            module['submodules'] = LazyModules(self, children)
+            self._nodes[node_id] = module
+            if len(self._nodes) == self.node_count:
+                self.close()  # Everything is decoded; drop the raw bytes
+        return module
+
+    def modules(self):
+        """The top-level modules, decoded lazily"""
+        return LazyModules(self, self.meta.get('roots', []))
+
+    def close(self):
+        self._data = None
+
+
+def load_hierarchy(path):
+    """
+    Open a binary hierarchy cache and verify its checksum
+
+    Returns:
+        (modules, meta): modules is a LazyModules mapping; meta holds cached_at and initial_repo_url
+
+    Raises:
+        HierarchyCacheError: the file is unreadable or in another format
+    """
+    try:
+        reader = HierarchyCacheReader(path)
+    except OSError as e:
+        raise HierarchyCacheError(f"Could not open {path}: {e}")
+    modules = reader.modules()
+    meta = {key: value for key, value in reader.meta.items() if key != 'roots'}
+    if reader.node_count == 0:
+        reader.close()
+    else:
+        # Decode the top level now so the main menu never waits on the cache
+        for module in modules.values():
+            len(module['submodules'])
+    return modules, meta
+
+
+def _encode_records(modules):
+    """Assign node ids depth-first (shared module dicts get one id) and encode their records"""
+    ids = {}
+    order = []
+
+    def assign(submodules):
+        entries = []
+        for name, module in submodules.items():
+            if id(module) not in ids:
+                ids[id(module)] = len(order)
+                order.append(module)
+                assign(module.get('submodules', {}))
+            entries.append([name, ids[id(module)]])
+        return entries
+
+    roots = assign(modules)
+    records = []
+    for module in order:
+        fields = OrderedDict((key, value) for key, value in module.items() if key != 'submodules')
+        children = [[name, ids[id(child)]] for name, child in module.get('submodules', {}).items()]
+        records.append(json.dumps([fields, children], separators=(',', ':')).encode('utf-8'))
+    return roots, records
+
+
+def backup_path(path):
+    """Where save_hierarchy keeps the previous good cache"""
+    return path + '.bak'
+
+
+def save_hierarchy(path, modules, meta=None):
+    """
+    Write modules to path in the binary cache format (temp file + fsync + rename)
+
+    The file being replaced is kept as backup_path(path) if it passes its checksum.
+    Callers sharing the project folder with other instances should hold its ProjectLock.
+    """
+    roots, records = _encode_records(modules)
+    meta = dict(meta or {})
+    meta['roots'] = roots
+    meta_bytes = json.dumps(meta, separators=(',', ':')).encode('utf-8')
+
+    offsets = []
+    position = HEADER.size + len(meta_bytes)
+    body = [meta_bytes]
+    for record in records:
+        offsets.append(position)
+        position += LENGTH.size + len(record)
+        body.append(LENGTH.pack(len(record)))
+        body.append(record)
+    body.append(b''.join(OFFSET.pack(offset) for offset in offsets))
+    body = b''.join(body)
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(records), len(meta_bytes), position,
+                         zlib.crc32(body))
+
+    if os.path.exists(path):
+        try:
+            HierarchyCacheReader(path).close()
+        except (HierarchyCacheError, OSError):
+            pass  # Don't let a corrupt file replace the last good backup
+        else:
+            shutil.copyfile(path, backup_path(path))
+    atomic_write(path, header + body)
+
+
+def _resolve_json_refs(modules):
+    """Resolve the {"$ref": [path]} entries a version 2 JSON cache used for shared modules, in place"""
+    def lookup(path):
+        module = modules[path[0]]
+        for name in path[1:]:
+            module = module['submodules'][name]
+        return module
+
+    def resolve(submodules):
+        for name, module in submodules.items():
+            if '$ref' in module:
+                submodules[name] = lookup(module['$ref'])
+            else:
+                resolve(module.get('submodules', {}))
+
+    resolve(modules)
+    return modules
+
+
+def migrate_json_cache(json_path, path):
+    """
+    Convert a JSON hierarchy_cache.json (version 1, or version 2 with $ref entries)
+    to the binary format and remove the JSON file
+
+    Returns:
+        True if a JSON cache was migrated
+    """
+    try:
+        with open(json_path, 'r') as f:
+            cache_data = json.load(f, object_pairs_hook=OrderedDict)
+        if cache_data.get("version") not in (1, 2):
+            return False
+        modules = _resolve_json_refs(cache_data.get("modules", OrderedDict()))
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Could not migrate {json_path}: {e}")
+        return False
+
+    save_hierarchy(path, modules, {
+        'cached_at': cache_data.get('cached_at'),
+        'initial_repo_url': cache_data.get('initial_repo_url'),
+    })
+    os.remove(json_path)
+    print(f"Migrated {json_path} to {path}")
+    return True
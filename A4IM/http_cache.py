@@ -0,0 +1,183 @@
+"""
+HTTP Cache Module
+Shared keep-alive HTTP session with a persistent on-disk cache.
+
+Every cached URL stores its body together with the ETag/Last-Modified
+validators the server sent. Later fetches send If-None-Match /
+If-Modified-Since, so a file that has not changed costs a 304 instead
+of a full download.
+
+Requests go through fetch_policy's per-host timeouts, retries and circuit
+breaker. When a host is unavailable, a cached copy is served if one exists.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from fetch_policy import get_policy, HostUnavailableError
+
+# Machine-wide caches live next to the project folders
+CACHE_ROOT = os.path.join("Downloaded Repositories", ".cache")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the shared requests.Session, creating it on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            # Enough pooled connections for the hierarchy crawler's worker pool
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+class CachedResponse:
+    """The parts of a requests.Response the app uses, possibly served from the cache"""
+
+    def __init__(self, url, status_code, content, headers=None, from_cache=False, stale=False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.from_cache = from_cache
+        self.stale = stale  # Served from the cache because the host was unavailable
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+class HttpCache:
+    """On-disk store of response bodies keyed by URL, revalidated with conditional requests"""
+
+    def __init__(self, cache_dir=None, session=None):
+        self.cache_dir = cache_dir or os.path.join(CACHE_ROOT, "http")
+        self.session = session
+
+    def _entry_paths(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return (os.path.join(self.cache_dir, key + ".json"),
+                os.path.join(self.cache_dir, key + ".body"))
+
+    def _read_entry(self, url):
+        meta_path, body_path = self._entry_paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None, None
+        if meta.get('url') != url:
+            return None, None
+        return meta, body
+
+    def _write_file(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _write_entry(self, url, response):
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_type': response.headers.get('Content-Type'),
+        }
+        if not meta['etag'] and not meta['last_modified']:
+            return  # Nothing to revalidate with
+
+        meta_path, body_path = self._entry_paths(url)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Body first, so a metadata file always points at a complete body
+            self._write_file(body_path, response.content)
+            self._write_file(meta_path, json.dumps(meta).encode('utf-8'))
+        except OSError as e:
+            print(f"Could not write HTTP cache entry for {url}: {e}")
+
+    def get(self, url, timeout=None, headers=None, **kwargs):
+        """
+        GET a URL through the shared session, revalidating any cached copy
+
+        Args:
+            timeout: Read timeout; None uses the host's fetch policy
+
+        Returns:
+            CachedResponse; a 304 from the server is returned as a 200 with the cached body,
+            and a cached copy is returned (marked stale) if the host is unavailable
+
+        Raises:
+            HostUnavailableError: the host is unavailable and nothing is cached
+        """
+        session = self.session or get_session()
+        request_headers = dict(headers or {})
+        meta, body = self._read_entry(url)
+        if meta:
+            if meta.get('etag'):
+                request_headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                request_headers['If-Modified-Since'] = meta['last_modified']
+
+        try:
+            response = get_policy().request(session, 'GET', url, timeout=timeout,
+                                            headers=request_headers, **kwargs)
+        except HostUnavailableError as e:
+            if not meta:
+                raise
+            print(f"{e.host} unavailable, using cached copy of {url}")
+            cached_headers = {'Content-Type': meta.get('content_type') or ''}
+            return CachedResponse(url, 200, body, cached_headers, from_cache=True, stale=True)
+
+        if response.status_code == 304 and meta:
+            cached_headers = {'Content-Type': meta.get('content_type') or ''}
+            return CachedResponse(url, 200, body, cached_headers, from_cache=True)
+
+        if response.status_code == 200:
+            self._write_entry(url, response)
+
+        return CachedResponse(url, response.status_code, response.content, response.headers)
+
+
+_default_cache = None
+
+
+def get_cache():
+    """Return the shared HttpCache"""
+    global _default_cache
+    with _session_lock:
+        if _default_cache is None:
+            _default_cache = HttpCache()
+        return _default_cache
+
+
+def http_get(url, timeout=None, headers=None, **kwargs):
+    """Conditional GET through the shared session and on-disk cache"""
+    return get_cache().get(url, timeout=timeout, headers=headers, **kwargs)
@@ -65,6 +65,14 @@ class LoadingWidget(QWidget):
         self.status_label.setStyleSheet("color: #888888;")
         layout.addWidget(self.status_label)
 
+        # Per-repository transfer lines while clones run
+        self.details_label = QLabel("")
+        self.details_label.setFont(QFont('Arial', 9))
+        self.details_label.setAlignment(Qt.AlignCenter)
+        self.details_label.setStyleSheet("color: #888888;")
+        self.details_label.hide()
+        layout.addWidget(self.details_label)
+
         layout.addStretch()
         self.setLayout(layout)
 
@@ -76,6 +84,11 @@ class LoadingWidget(QWidget):
         """Update the detailed status message"""
         self.status_label.setText(status)
 
+    def update_details(self, details):
+        """Show secondary lines (e.g. per-repository transfer rates) below the status; empty hides them"""
+        self.details_label.setText(details)
+        self.details_label.setVisible(bool(details))
+
     def set_progress(self, current, total):
         """Set determinate progress"""
         if total > 0:
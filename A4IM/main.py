@@ -1,13 +1,11 @@
 import sys
 import os
-import json
 import shutil
 import datetime
-import requests
 
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QStackedWidget, QProgressBar, QMessageBox)
-from PyQt5.QtCore import Qt, QCoreApplication
+from PyQt5.QtCore import Qt, QCoreApplication, QTimer
 from collections import OrderedDict
 from mainmenu_widget import MainMenuWidget
 from gitbuilding_widget import GitBuildingWindow
@@ -16,6 +14,22 @@ from download_thread import DownloadThread
 from gitbuilding_setup import GitBuildingSetup
 from RepositorySelector_widget import RepositorySelector
 from loading_widget import LoadingWidget
+from hierarchy_crawler import HierarchyCrawler, extract_branch_from_url, index_modules, patch_modules
+from hierarchy_store import (save_hierarchy, load_hierarchy, migrate_json_cache, backup_path,
+                             HierarchyCacheError)
+from atomic_storage import atomic_write, ProjectLock, LockTimeout
+from module_fetcher import ModuleInfoFetcher
+from module_info import read_module_info
+from graphql_batch import GraphQLBatchFetcher
+from fetch_policy import HostUnavailableError
+from metadata_writer import get_metadata_writer
+from status_writer import flush_status_writer
+from download_profiles import load_project_profile
+from download_manifest import get_manifest
+from download_queue import get_download_queue
+from clone_scheduler import (CloneScheduler, CloneTask, tasks_from_modules, format_progress,
+                             format_repo_progress, format_summary)
+from repo_updater import RepoUpdater, tasks_from_clone_tasks, format_update_summary
 
 class GitFileReaderApp(QMainWindow):
     def __init__(self, initial_repo_url, repo_folder):
@@ -67,6 +81,12 @@ class GitFileReaderApp(QMainWindow):
 
         # Keep track of active threads
         self.active_threads = []
+        self.crawler = None  # Background hierarchy crawler
+        self.module_fetcher = ModuleInfoFetcher()  # Remembers where each repo keeps ModuleInfo.txt
+        # Sibling modules are fetched in one GraphQL query when GITHUB_TOKEN / GITLAB_TOKEN is set
+        self.batch_fetcher = GraphQLBatchFetcher.from_environment(self.module_fetcher.probe_table)
+        # Show a cached hierarchy immediately and revalidate it in the background
+        self.revalidate_on_startup = os.environ.get('A4IM_REVALIDATE_ON_STARTUP', '1') != '0'
 
         # Don't start downloading yet - wait for window to be shown
         # This will be triggered by calling start_loading() after show()
@@ -77,23 +97,24 @@ class GitFileReaderApp(QMainWindow):
 
     def get_cache_file_path(self):
         """Get path to hierarchy cache file"""
+        return os.path.join("Downloaded Repositories", self.repo_folder, "hierarchy_cache.bin")
+
+    def get_legacy_cache_file_path(self):
+        """Path of the JSON cache written by older versions"""
         return os.path.join("Downloaded Repositories", self.repo_folder, "hierarchy_cache.json")
 
     def save_hierarchy_cache(self):
         """Save modules hierarchy to cache file"""
         cache_path = self.get_cache_file_path()
-        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
-
-        cache_data = {
-            "version": 1,
-            "cached_at": datetime.datetime.now().isoformat(),
-            "initial_repo_url": self.initial_repo_url,
-            "modules": self.modules
-        }
-
-        with open(cache_path, 'w') as f:
-            json.dump(cache_data, f, indent=2)
-
+        try:
+            with ProjectLock.for_path(cache_path):
+                save_hierarchy(cache_path, self.modules, {
+                    "cached_at": datetime.datetime.now().isoformat(),
+                    "initial_repo_url": self.initial_repo_url,
+                })
+        except (LockTimeout, OSError) as e:
+            print(f"Failed to save hierarchy cache: {e}")
+            return
         print(f"Saved hierarchy cache to {cache_path}")
 
     def load_hierarchy_cache(self):
@@ -101,102 +122,45 @@ class GitFileReaderApp(QMainWindow):
         cache_path = self.get_cache_file_path()
 
         if not os.path.exists(cache_path):
-            return False
-
-        try:
-            with open(cache_path, 'r') as f:
-                cache_data = json.load(f, object_pairs_hook=OrderedDict)
-
-            # Validate cache
-            if cache_data.get("version") != 1:
-                return False
-
-            self.modules = cache_data.get("modules", OrderedDict())
+            legacy_path = self.get_legacy_cache_file_path()
+            if os.path.exists(legacy_path):
+                with ProjectLock.for_path(cache_path):
+                    migrate_json_cache(legacy_path, cache_path)
+
+        # A torn or corrupt cache falls back to the previous good one before we crawl cold
+        for path in (cache_path, backup_path(cache_path)):
+            if not os.path.exists(path):
+                continue
+            try:
+                # Only the top levels are decoded here; subtrees decode when first used
+                self.modules, meta = load_hierarchy(path)
+            except HierarchyCacheError as e:
+                print(f"Failed to load cache: {e}")
+                continue
 
             # Rebuild module_order from top-level keys
             self.module_order = list(self.modules.keys())
 
-            print(f"Loaded hierarchy from cache ({cache_data.get('cached_at', 'unknown')})")
+            print(f"Loaded hierarchy from cache ({meta.get('cached_at') or 'unknown'})")
             return True
 
-        except (json.JSONDecodeError, KeyError) as e:
-            print(f"Failed to load cache: {e}")
-            return False
+        return False
 
     def fetch_module_info_only(self, repo_url, verbose=False, branch=None):
         """Fetch only ModuleInfo.txt from a Git repository (GitHub or GitLab)"""
         try:
-            repo_url = repo_url.strip()
-            if not repo_url.startswith('http'):
-                repo_url = 'https://' + repo_url
-
-            # Determine if it's GitHub or GitLab
-            is_github = 'github.com' in repo_url
-            is_gitlab = 'gitlab.com' in repo_url
-
-            if is_github:
-                parts = repo_url.replace('https://github.com/', '').replace('.git', '').split('/')
-                if len(parts) >= 2:
-                    owner, repo = parts[0], parts[1]
-                    branches = [branch] if branch else []
-                    branches.extend(['main', 'master'])
-                    filenames = ['ModuleInfo.txt', 'moduleInfo.txt']
-
-                    for b in branches:
-                        for filename in filenames:
-                            raw_url = f"https://raw.githubusercontent.com/{owner}/{repo}/{b}/lib/{filename}"
-                            if verbose:
-                                print(f"Trying GitHub: {raw_url}")
-                            response = requests.get(raw_url, timeout=10)
-                            if response.status_code == 200:
-                                if verbose:
-                                    print(f"✓ Found {filename} in lib/ on {b}")
-                                return response.text
-
-            elif is_gitlab:
-                parts = repo_url.replace('https://gitlab.com/', '').replace('.git', '').split('/')
-                if len(parts) >= 2:
-                    owner = parts[0]
-                    repo_path = '/'.join(parts[1:])
-                    branches = [branch] if branch else []
-                    branches.extend(['main', 'master'])
-                    filenames = ['ModuleInfo.txt', 'moduleInfo.txt']
-
-                    for b in branches:
-                        for filename in filenames:
-                            raw_url = f"https://gitlab.com/{owner}/{repo_path}/-/raw/{b}/lib/{filename}"
-                            if verbose:
-                                print(f"Trying GitLab: {raw_url}")
-                            try:
-                                response = requests.get(raw_url, timeout=30)
-                                if verbose:
-                                    print(f"  Response status: {response.status_code}")
-                                if response.status_code == 200:
-                                    if verbose:
-                                        print(f"✓ Found {filename} in lib/ on {b}")
-                                        print(f"  Content length: {len(response.text)} chars")
-                                    return response.text
-                            except requests.exceptions.Timeout:
-                                if verbose:
-                                    print(f"  Timeout for {raw_url}")
-                            except Exception as e:
-                                if verbose:
-                                    print(f"  Error: {e}")
-
-            if verbose:
-                print(f"Could not find ModuleInfo.txt in repository")
-            return None
-
+            return self.module_fetcher.fetch(repo_url, branch=branch, verbose=verbose)
+        except HostUnavailableError:
+            raise  # The crawler falls back to cached data for this module
         except Exception as e:
             if verbose:
                 print(f"Failed to fetch ModuleInfo.txt: {e}")
                 import traceback
                 traceback.print_exc()
             return None
-        
 
     def download_initial_repository(self):
-        """Only fetch ModuleInfo.txt - no full clone"""
+        """Only fetch ModuleInfo.txt files - no full clone"""
         # Check for cached hierarchy first
         if self.load_hierarchy_cache():
             self.loading_widget.update_message("Loading from cache...")
@@ -204,83 +168,155 @@ class GitFileReaderApp(QMainWindow):
             QCoreApplication.processEvents()
 
             # Skip to main menu
-            print("Loaded from cache - skipping online fetch")
             self.loading_complete = True
             self.main_menu.show()
             self.show_main_menu()
+            if self.revalidate_on_startup:
+                # Let the main menu paint before indexing (and so decoding) the whole cache
+                QTimer.singleShot(0, self.start_revalidation)
+            else:
+                print("Loaded from cache - skipping online fetch")
             return
 
-        repo_name = self.initial_repo_url.rstrip('/').split('/')[-1].replace('.git', '')
-        download_dir = os.path.join(os.getcwd(), "Downloaded Repositories")
-        repo_dir = os.path.join(download_dir, self.repo_folder)
-        metadata_dir = os.path.join(repo_dir, ".metadata")
-
-        os.makedirs(metadata_dir, exist_ok=True)
-
-        print(f"Fetching ModuleInfo.txt from: {self.initial_repo_url}")
+        print(f"Fetching ModuleInfo.txt hierarchy from: {self.initial_repo_url}")
+        self.loading_widget.update_message("Fetching modules...")
+        self.start_crawl()
 
-        # Update loading screen
-        self.loading_widget.update_message("Fetching initial modules...")
-        self.loading_widget.update_status(f"Loading {repo_name}...")
-        QCoreApplication.processEvents()
+    def start_crawl(self, known_modules=None, background=False):
+        """
+        Crawl the hierarchy in the background; results stream back through signals
 
-        # Fetch just the ModuleInfo.txt content
-        module_info_content = self.fetch_module_info_only(self.initial_repo_url)
+        Args:
+            known_modules: index_modules() of the current hierarchy; modules whose
+                           remote SHA is unchanged are reused instead of re-fetched
+            background: Revalidate silently behind the main menu instead of on the loading screen
+        """
+        repo_name = self.initial_repo_url.rstrip('/').split('/')[-1].replace('.git', '')
+        metadata_dir = os.path.join(os.getcwd(), "Downloaded Repositories", self.repo_folder, ".metadata")
+
+        # Workers read the known modules while the GUI may still edit them, so hand over copies
+        if known_modules:
+            known_modules = {key: (name, dict(module)) for key, (name, module) in known_modules.items()}
+
+        self.crawler = HierarchyCrawler(self.initial_repo_url, self.fetch_module_info_only,
+                                        metadata_dir, root_name=repo_name,
+                                        batch_fetcher=self.batch_fetcher,
+                                        known_modules=known_modules)
+        if background:
+            self.crawler.finished.connect(self.on_revalidation_finished)
+        else:
+            self.loading_widget.update_status(f"Loading {repo_name}...")
+            self.crawler.module_loaded.connect(self.on_crawl_module_loaded)
+            self.crawler.progress.connect(self.on_crawl_progress)
+            self.crawler.finished.connect(self.on_crawl_finished)
+        self.crawler.start()
+
+    def start_revalidation(self):
+        """Check the cached hierarchy against the remotes without leaving the main menu"""
+        if self.crawler:
+            return
+        print("Loaded from cache - revalidating in the background")
+        self.main_menu.set_hierarchy_status("Checking for hierarchy updates...")
+        self.start_crawl(known_modules=index_modules(self.modules, self.initial_repo_url), background=True)
+
+    def on_revalidation_finished(self, modules):
+        """Patch whatever changed into the live hierarchy and views"""
+        unavailable = self.crawler.unavailable if self.crawler else []
+        self.crawler = None
+        if modules is None:
+            print("Could not revalidate hierarchy - keeping cached copy")
+            self.main_menu.set_hierarchy_status("Could not check for updates - showing cached hierarchy")
+        else:
+            changes = patch_modules(self.modules, modules)
+            self.module_order = list(self.modules.keys())
+            self.save_hierarchy_cache()
+
+            if changes['updated'] or changes['structure_changed']:
+                print(f"Hierarchy updated: {len(changes['updated'])} modules changed"
+                      f"{', structure changed' if changes['structure_changed'] else ''}")
+                self.main_menu.refresh_project_info()
+                self.main_menu.set_hierarchy_status("● Hierarchy updated", highlight=True)
+                self.system_view.apply_hierarchy_update(changes)
+            elif unavailable:
+                hosts = sorted({host for _, host, _ in unavailable})
+                self.main_menu.set_hierarchy_status(f"{', '.join(hosts)} unavailable - "
+                                                    f"{len(unavailable)} modules shown from cache")
+            else:
+                print("Cached hierarchy is up to date")
+                self.main_menu.set_hierarchy_status("")
+            if unavailable:
+                print(self.describe_unavailable(unavailable))
 
-        if module_info_content:
-            # Save to metadata folder
-            module_info_path = os.path.join(metadata_dir, f"{repo_name}_ModuleInfo.txt")
-            with open(module_info_path, 'w') as f:
-                f.write(module_info_content)
-                timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                f.write(f"\n[Deployed] {timestamp}")
+        if getattr(self, '_pending_sync', False):
+            self._pending_sync = False
+            self.sync_downloaded_repos()
 
-            print(f"✓ Saved ModuleInfo.txt to {module_info_path}")
-            self.parse_initial_module(module_info_path, repo_name)
-        else:
+    def describe_unavailable(self, unavailable):
+        """Summarise the crawler's unavailable list for the user"""
+        lines = []
+        for host in sorted({host for _, host, _ in unavailable}):
+            cached = [name for name, h, used_cache in unavailable if h == host and used_cache]
+            missing = [name for name, h, used_cache in unavailable if h == host and not used_cache]
+            lines.append(f"{host} could not be reached.")
+            if cached:
+                lines.append(f"  Using cached data for: {', '.join(cached)}")
+            if missing:
+                lines.append(f"  Not loaded: {', '.join(missing)}")
+        return "\n".join(lines)
+
+    def on_crawl_module_loaded(self, module_name, depth):
+        """Show the module that was just discovered"""
+        if depth == 0:
+            self.loading_widget.update_message(f"Fetching {module_name} submodules...")
+
+    def on_crawl_progress(self, fetched, discovered, repo_name):
+        """Update the loading screen as ModuleInfo.txt files arrive"""
+        self.loading_widget.update_status(f"Loading module {fetched}/{discovered}: {repo_name}")
+        self.loading_widget.set_progress(fetched, discovered)
+
+    def on_crawl_finished(self, modules):
+        """Store the crawled hierarchy, cache it and show the main menu"""
+        cycles = self.crawler.cycles if self.crawler else []
+        unavailable = self.crawler.unavailable if self.crawler else []
+        self.crawler = None
+        if modules is None:
             QMessageBox.critical(self, "Error",
                             f"Could not fetch ModuleInfo.txt from:\n{self.initial_repo_url}\n\n"
                             "Please check the repository URL and ensure ModuleInfo.txt exists.")
+            if self.modules:
+                # A failed refresh keeps the hierarchy we already had
+                self._pending_sync = False
+                self.loading_complete = True
+                self.show_main_menu()
+            return
 
-    def fetch_submodule_infos(self, module_addresses, parent_module_name=None):
-        """Fetch ModuleInfo.txt for multiple submodules"""
-        metadata_dir = os.path.join("Downloaded Repositories", self.repo_folder, ".metadata")
-
-        total = len(module_addresses)
-
-        # Update main message for submodules
-        if parent_module_name:
-            self.loading_widget.update_message(f"Fetching {parent_module_name} submodules...")
+        if self.modules:
+            # Refresh: patch the existing dicts so views holding references stay valid
+            patch_modules(self.modules, modules)
         else:
-            self.loading_widget.update_message(f"Fetching {total} submodules...")
-        QCoreApplication.processEvents()
-
-        for idx, address in enumerate(module_addresses, 1):
-            # Extract branch from URL and get clean URL
-            clean_address, branch = self.extract_branch_from_url(address)
-            clean_address = clean_address.rstrip('/')
-            repo_name = clean_address.split('/')[-1].replace('.git', '')
-
-            # Update loading screen
-            self.loading_widget.update_status(f"Loading module {idx}/{total}: {repo_name}")
-            self.loading_widget.set_progress(idx, total)
-            QCoreApplication.processEvents()
+            self.modules = modules
+        self.module_order = list(self.modules.keys())
+        print(f"Initial module '{self.module_order[0]}' loaded with all submodules")
 
-            content = self.fetch_module_info_only(clean_address, verbose=True, branch=branch)
-
-            if content:
-                print(f"\n=== Content fetched from {clean_address} (branch: {branch}) ===")
-                print(content)
-                print(f"=== End of content ===\n")
-                # Save to metadata folder
-                module_info_path = os.path.join(metadata_dir, f"{repo_name}_ModuleInfo.txt")
-                timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                with open(module_info_path, 'w') as f:
-                    f.write(content)
-                    f.write(f"\n[Deployed] {timestamp}")
-            else:
-                print(f"Warning: Could not fetch module info for {repo_name}")
+        # Save hierarchy to cache for future runs
+        self.save_hierarchy_cache()
 
+        # Load complete - show main menu
+        print("All module info loaded! Loading main menu...")
+        self.loading_complete = True
+        self.main_menu.show()
+        self.show_main_menu()
+        if cycles:
+            QMessageBox.warning(self, "Module Hierarchy Cycle",
+                                "These module references point back to one of their own parents "
+                                "and were skipped:\n\n" +
+                                "\n".join(f"{parent} -> {child} ({address})"
+                                          for parent, child, address in cycles))
+        if unavailable:
+            QMessageBox.warning(self, "Hosts Unavailable", self.describe_unavailable(unavailable))
+        if getattr(self, '_pending_sync', False):
+            self._pending_sync = False
+            self.sync_downloaded_repos()
 
     def check_if_all_complete(self):
         """Check if all downloads are complete"""
@@ -308,6 +344,31 @@ class GitFileReaderApp(QMainWindow):
         if self.loading_complete:
             self.main_menu.refresh_project_info()
             self.central_widget.setCurrentWidget(self.main_menu)
+            if not getattr(self, '_resume_offered', False):
+                self._resume_offered = True
+                QTimer.singleShot(0, self.offer_download_resume)
+
+    def offer_download_resume(self):
+        """Offer to resume bulk downloads that were cut short when the app last closed."""
+        if getattr(self, '_sync_scheduler', None):
+            return
+        repo_dir = os.path.join("Downloaded Repositories", self.repo_folder)
+        download_queue = get_download_queue(repo_dir)
+        tasks = download_queue.pending_tasks()
+        if not tasks:
+            return
+        reply = QMessageBox.question(
+            self, "Resume Downloads",
+            f"{len(tasks)} module downloads didn't finish last time:\n  • "
+            + "\n  • ".join(task.name for task in tasks[:15])
+            + ("\n  • ..." if len(tasks) > 15 else "")
+            + "\n\nResume them now? Choosing No forgets them.",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self._run_clone_tasks(repo_dir, tasks, "Resumed downloads finished.")
+        else:
+            download_queue.clear()
     
     def show_system_view(self):
         self.system_view.populate_modules(self.modules)
@@ -380,71 +441,122 @@ class GitFileReaderApp(QMainWindow):
             path = os.path.join(repo_dir, name)
             try:
                 shutil.rmtree(path)
+                get_manifest(repo_dir).remove(name)
                 print(f"Deleted legacy repo: {name}")
             except Exception as e:
                 QMessageBox.warning(self, "Delete Error", f"Could not delete {name}:\n{e}")
 
-        # Queue downloads for missing repos
+        # Clone missing repos in parallel, parents before children
         if to_download:
-            self._sync_queue = [(name, info['address'], info.get('branch'))
-                                for name, info in to_download.items()]
-            self._sync_index = 0
-            self._start_next_sync_download(repo_dir)
+            self._start_sync_downloads(repo_dir, set(to_download))
         else:
             QMessageBox.information(self, "Sync Complete", "Legacy repos removed.")
 
-    def _start_next_sync_download(self, repo_dir):
-        """Download the next repo in the sync queue sequentially."""
-        from download_manager import DownloadWorker
-        if self._sync_index >= len(self._sync_queue):
-            QMessageBox.information(self, "Sync Complete", "Hierarchy sync finished.")
-            # Refresh the system view if it was open
-            if self.loading_complete:
-                self.system_view.populate_modules(self.modules)
+    def _start_sync_downloads(self, repo_dir, names):
+        """Clone the missing repos with the parallel clone scheduler."""
+        if getattr(self, '_sync_scheduler', None):
+            return  # A sync download is already running
+        tasks = tasks_from_modules(self.modules, repo_dir, names)
+        root_name = self.initial_repo_url.rstrip('/').split('/')[-1].replace('.git', '')
+        if root_name in names and not any(task.name == root_name for task in tasks):
+            tasks.insert(0, CloneTask(root_name, self.initial_repo_url.rstrip('/'),
+                                      os.path.join(repo_dir, root_name)))
+        self._run_clone_tasks(repo_dir, tasks, "Hierarchy sync finished.")
+
+    def _run_clone_tasks(self, repo_dir, tasks, done_text):
+        """Clone tasks behind the loading screen, journaled so they can resume after a restart."""
+        self.loading_widget.update_message(f"Downloading {len(tasks)} repositories...")
+        self.loading_widget.update_status("")
+        self.loading_widget.set_progress(0, len(tasks))
+        self.central_widget.setCurrentWidget(self.loading_widget)
+
+        scheduler = CloneScheduler(tasks, profile=load_project_profile(repo_dir),
+                                   download_queue=get_download_queue(repo_dir))
+        self._sync_done_text = done_text
+        scheduler.progress.connect(self._on_sync_progress)
+        scheduler.finished.connect(self._on_sync_downloads_done)
+        scheduler.start()
+        self._sync_scheduler = scheduler  # keep reference
+
+    def _on_sync_progress(self, progress):
+        self.loading_widget.set_progress(progress['done'], progress['total'])
+        self.loading_widget.update_status(format_progress(progress))
+        self.loading_widget.update_details(format_repo_progress(progress))
+
+    def _on_sync_downloads_done(self, summary):
+        self.loading_widget.update_details("")
+        self._sync_scheduler.deleteLater()
+        self._sync_scheduler = None
+        self.show_main_menu()
+        if summary['failed']:
+            QMessageBox.warning(self, "Sync Finished With Errors", format_summary(summary))
+        else:
+            QMessageBox.information(self, "Sync Complete",
+                                    self._sync_done_text + "\n\n" + format_summary(summary))
+        # Refresh the system view if it was open
+        if self.loading_complete:
+            self.system_view.populate_modules(self.modules)
+
+    def update_downloaded_repos(self):
+        """Fetch and fast-forward every downloaded repo of the project in parallel."""
+        if getattr(self, '_repo_updater', None):
+            return  # An update is already running
+        repo_dir = os.path.join("Downloaded Repositories", self.repo_folder)
+        clone_tasks = tasks_from_modules(self.modules, repo_dir)
+        root_name = self.initial_repo_url.rstrip('/').split('/')[-1].replace('.git', '')
+        if not any(task.name == root_name for task in clone_tasks):
+            clone_tasks.insert(0, CloneTask(root_name, self.initial_repo_url.rstrip('/'),
+                                            os.path.join(repo_dir, root_name)))
+        tasks = tasks_from_clone_tasks(clone_tasks)
+        if not tasks:
+            QMessageBox.information(self, "Update Modules", "No modules have been downloaded yet.")
             return
 
-        name, address, branch = self._sync_queue[self._sync_index]
-        local_path = os.path.join(repo_dir, name)
-        self.loading_widget.update_message(
-            f"Downloading {name} ({self._sync_index + 1}/{len(self._sync_queue)})..."
-        )
+        self.loading_widget.update_message(f"Updating {len(tasks)} repositories...")
+        self.loading_widget.update_status("")
+        self.loading_widget.set_progress(0, len(tasks))
         self.central_widget.setCurrentWidget(self.loading_widget)
 
-        worker = DownloadWorker(address, local_path, branch)
-        worker.finished.connect(lambda ok, msg, n=name, rd=repo_dir: self._on_sync_download_done(ok, msg, n, rd))
-        worker.start()
-        self._sync_worker = worker  # keep reference
+        updater = RepoUpdater(tasks)
+        updater.progress.connect(self._on_update_progress)
+        updater.finished.connect(self._on_update_done)
+        updater.start()
+        self._repo_updater = updater  # keep reference
 
-    def _on_sync_download_done(self, success, message, name, repo_dir):
-        if not success:
-            QMessageBox.warning(self, "Download Failed", f"Failed to download {name}:\n{message}")
-        else:
-            print(f"Sync downloaded: {name}")
-        self._sync_index += 1
+    def _on_update_progress(self, done, total):
+        self.loading_widget.set_progress(done, total)
+        self.loading_widget.update_status(f"{done}/{total} repositories checked")
+
+    def _on_update_done(self, summary):
+        self._repo_updater.deleteLater()
+        self._repo_updater = None
         self.show_main_menu()
-        self._start_next_sync_download(repo_dir)
+        if summary['failed'] or summary['skipped']:
+            QMessageBox.warning(self, "Update Finished With Warnings", format_update_summary(summary))
+        else:
+            QMessageBox.information(self, "Update Complete", format_update_summary(summary))
+        if self.loading_complete:
+            self.system_view.populate_modules(self.modules)
 
     def refresh_hierarchy(self):
-        """Delete cache, re-fetch hierarchy, then sync downloaded repos."""
-        cache_path = self.get_cache_file_path()
-        if os.path.exists(cache_path):
-            os.remove(cache_path)
-            print(f"Deleted hierarchy cache: {cache_path}")
+        """Re-fetch the modules whose remote branch head changed, then sync downloaded repos."""
+        if self.crawler:
+            # Already crawling (e.g. the startup revalidation); sync once it finishes
+            self._pending_sync = True
+            return
 
-        # Clear current modules
-        self.modules = {}
-        self.module_order = []
+        # Modules with an unchanged commit SHA are reused from the current hierarchy
+        known_modules = index_modules(self.modules, self.initial_repo_url)
 
         # Flag so loading_complete hooks run sync afterwards
         self._pending_sync = True
 
         # Show loading screen
         self.central_widget.setCurrentWidget(self.loading_widget)
-        self.loading_widget.update_message("Refreshing hierarchy...")
+        self.loading_widget.update_message("Checking for hierarchy changes...")
         self.loading_complete = False
 
-        # Re-fetch from online
-        self.download_initial_repository()
+        self.start_crawl(known_modules=known_modules)
 
     def add_timestamp_to_module_info(self, repo_path):
         """Add a deployment timestamp to the ModuleInfo.txt file in lib folder"""
@@ -464,27 +576,28 @@ class GitFileReaderApp(QMainWindow):
             
         if module_info_path:
             try:
-                # Read current content
-                with open(module_info_path, 'r') as f:
-                    content = f.read()
-                
-                # Get current timestamp
-                import datetime
-                timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                
-                # Check if there's already a deployment timestamp
-                if "[Deployed]" in content:
-                    # Replace existing timestamp
-                    import re
-                    content = re.sub(r'\[Deployed\].*', f"[Deployed] {timestamp}", content)
-                else:
-                    # Add timestamp at the end
-                    content += f"\n[Deployed] {timestamp}"
-                
-                # Write back to file
-                with open(module_info_path, 'w') as f:
-                    f.write(content)
-                    
+                # Hold the project lock so another instance can't interleave its own edit
+                with ProjectLock.for_path(module_info_path):
+                    # Read current content
+                    with open(module_info_path, 'r') as f:
+                        content = f.read()
+
+                    # Get current timestamp
+                    import datetime
+                    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+                    # Check if there's already a deployment timestamp
+                    if "[Deployed]" in content:
+                        # Replace existing timestamp
+                        import re
+                        content = re.sub(r'\[Deployed\].*', f"[Deployed] {timestamp}", content)
+                    else:
+                        # Add timestamp at the end
+                        content += f"\n[Deployed] {timestamp}"
+
+                    # Write back to file
+                    atomic_write(module_info_path, content)
+
                 print(f"Added deployment timestamp to {module_info_path}")
             except Exception as e:
                 print(f"Failed to add timestamp to ModuleInfo.txt: {str(e)}")
@@ -506,113 +619,7 @@ class GitFileReaderApp(QMainWindow):
 
     def extract_branch_from_url(self, url):
         """Extract branch name from GitLab/GitHub URL if present"""
-        if '/-/tree/' in url:
-            parts = url.split('/-/tree/')
-            if len(parts) > 1:
-                branch = parts[1].split('?')[0].strip()
-                clean_url = parts[0]
-                return clean_url, branch
-        elif '/tree/' in url:
-            parts = url.split('/tree/')
-            if len(parts) > 1:
-                branch = parts[1].split('?')[0].strip()
-                clean_url = parts[0]
-                return clean_url, branch
-        return url, None
-
-    def parse_initial_module(self, module_info_path, repo_name):
-        """Parse initial ModuleInfo.txt without downloading repos"""
-        with open(module_info_path, 'r') as f:
-            content = f.read()
-
-        module_name = None
-        module_description = ""
-        submodule_addresses = []
-        module_branch = None
-
-        lines = content.split('\n')
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            if line.lower().startswith('[module name]'):
-                module_name = line.split(']', 1)[1].strip()
-                i += 1
-            elif line.lower().startswith('[module info]'):
-                module_description = line.split(']', 1)[1].strip()
-                i += 1
-                while i < len(lines) and not lines[i].startswith('['):
-                    module_description += ' ' + lines[i].strip()
-                    i += 1
-            elif line.lower().startswith('[module branch]'):
-                parts = line.split(']', 1)
-                if len(parts) > 1:
-                    branch = parts[1].strip()
-                    if branch:
-                        module_branch = branch
-                i += 1
-            elif line.lower().startswith('[module address]'):
-                parts = line.split(']', 1)
-                if len(parts) > 1:
-                    address = parts[1].strip()
-                    submodule_addresses.append(address)
-                i += 1
-            else:
-                i += 1
-        
-        if not module_name:
-            module_name = "Root Module"
-        
-        # Clean up addresses
-        cleaned_addresses = []
-        for address in submodule_addresses:
-            if address.count("https://") > 1:
-                address = address.replace("https://", "", address.count("https://") - 1)
-            if address.count("github.com") > 1:
-                address = address.replace("github.com/", "", address.count("github.com") - 1)
-            if address.count("gitlab.com") > 1:
-                address = address.replace("gitlab.com/", "", address.count("gitlab.com") - 1)
-            cleaned_addresses.append(address)
-        
-        # Extract branch from initial repo URL
-        clean_initial_url, url_branch = self.extract_branch_from_url(self.initial_repo_url)
-        clean_initial_url = clean_initial_url.rstrip('/')
-        branch_to_use = url_branch if url_branch else module_branch
-
-        # Initialize modules dictionary
-        self.modules = OrderedDict()
-        self.modules[module_name] = {
-            'description': module_description.strip(),
-            'submodules': OrderedDict(),
-            'submodule_addresses': cleaned_addresses,
-            'repository': {
-                'name': repo_name,
-                'address': clean_initial_url,
-                'branch': branch_to_use,
-                'docs_path': None
-            },
-            'is_downloaded': False
-        }
-        self.module_order.append(module_name)
-        
-        print(f"Initial module '{module_name}' created with {len(cleaned_addresses)} submodule addresses")
-        
-        # Fetch submodule ModuleInfo.txt files (not full repos)
-        if cleaned_addresses:
-            print(f"Fetching info for {len(cleaned_addresses)} submodules...")
-            self.fetch_submodule_infos(cleaned_addresses, module_name)
-            self.parse_submodule_infos([module_name], cleaned_addresses)
-
-        # Save hierarchy to cache for future runs
-        self.save_hierarchy_cache()
-
-        # Load complete - show main menu
-        print("All module info loaded! Loading main menu...")
-        self.loading_complete = True
-        self.main_menu.show()
-        self.show_main_menu()
-        if getattr(self, '_pending_sync', False):
-            self._pending_sync = False
-            self.sync_downloaded_repos()
+        return extract_branch_from_url(url)
 
     def parse_module_info(self, parent_module_path):
         """Parse ModuleInfo.txt files from downloaded submodules"""
@@ -662,56 +669,18 @@ class GitFileReaderApp(QMainWindow):
                             module_info_path = os.path.join(lib_path, filename)
                             break
             
-            if module_info_path and os.path.exists(module_info_path):
-                # Parse the module info
-                with open(module_info_path, 'r') as f:
-                    content = f.read()
-                
-                module_name = None
-                module_description = ""
-                module_addresses = []
-                
-                lines = content.split('\n')
-                i = 0
-                while i < len(lines):
-                    line = lines[i].strip()
-                    if line.lower().startswith('[module name]'):
-                        module_name = line.split(']', 1)[1].strip()
-                        i += 1
-                    elif line.lower().startswith('[module info]'):
-                        module_description = line.split(']', 1)[1].strip()
-                        i += 1
-                        while i < len(lines) and not lines[i].startswith('['):
-                            module_description += ' ' + lines[i].strip()
-                            i += 1
-                    elif line.lower().startswith('[module address]'):
-                        parts = line.split(']', 1)
-                        if len(parts) > 1:
-                            addr = parts[1].strip()
-                            module_addresses.append(addr)
-                        i += 1
-                    else:
-                        i += 1
-                
-                if not module_name:
-                    module_name = repo_name
-                
-                # Clean up addresses
-                cleaned_addresses = []
-                for addr in module_addresses:
-                    if addr.count("https://") > 1:
-                        addr = addr.replace("https://", "", addr.count("https://") - 1)
-                    if addr.count("github.com") > 1:
-                        addr = addr.replace("github.com/", "", addr.count("github.com") - 1)
-                    cleaned_addresses.append(addr)
-                
+            info = read_module_info(module_info_path) if module_info_path else None
+            if info:
+                module_name = info.name or repo_name
+                cleaned_addresses = list(info.addresses)
+
                 # Check for documentation
                 docs_path = os.path.join(repo_path, "orshards", "index.html")
                 has_docs = os.path.exists(docs_path)
                 
                 # Add the module
                 parent_module['submodules'][module_name] = {
-                    'description': module_description.strip(),
+                    'description': info.description,
                     'submodules': OrderedDict(),
                     'submodule_addresses': cleaned_addresses,
                     'repository': {
@@ -729,114 +698,6 @@ class GitFileReaderApp(QMainWindow):
                     new_path.append(module_name)
                     self.download_modules(new_path, cleaned_addresses)
 
-    def parse_submodule_infos(self, parent_module_path, addresses):
-        """Parse fetched ModuleInfo.txt files without downloading full repos"""
-        metadata_dir = os.path.join("Downloaded Repositories", self.repo_folder, ".metadata")
-        
-        # Navigate to parent module
-        current = self.modules
-        for name in parent_module_path[:-1]:
-            if name in current and 'submodules' in current[name]:
-                current = current[name]['submodules']
-        
-        parent_name = parent_module_path[-1]
-        if parent_name not in current:
-            return
-        
-        parent_module = current[parent_name]
-        if 'submodules' not in parent_module:
-            parent_module['submodules'] = OrderedDict()
-        
-        for address in addresses:
-            # Extract branch from URL and get clean address
-            clean_address, branch = self.extract_branch_from_url(address)
-            clean_address = clean_address.rstrip('/')
-            repo_name = clean_address.split('/')[-1].replace('.git', '')
-            module_info_path = os.path.join(metadata_dir, f"{repo_name}_ModuleInfo.txt")
-
-            print(f"Looking for: {module_info_path}")
-            if os.path.exists(module_info_path):
-                print(f"  Found! Parsing {repo_name}")
-                with open(module_info_path, 'r') as f:
-                    content = f.read()
-                
-                # Parse module info
-                module_name = None
-                module_description = ""
-                module_addresses = []
-                module_branch = None
-
-                lines = content.split('\n')
-                i = 0
-                while i < len(lines):
-                    line = lines[i].strip()
-                    if line.lower().startswith('[module name]'):
-                        module_name = line.split(']', 1)[1].strip()
-                        i += 1
-                    elif line.lower().startswith('[module info]'):
-                        module_description = line.split(']', 1)[1].strip()
-                        i += 1
-                        while i < len(lines) and not lines[i].startswith('['):
-                            module_description += ' ' + lines[i].strip()
-                            i += 1
-                    elif line.lower().startswith('[module branch]'):
-                        parts = line.split(']', 1)
-                        if len(parts) > 1:
-                            branch = parts[1].strip()
-                            if branch:
-                                module_branch = branch
-                        i += 1
-                    elif line.lower().startswith('[module address]'):
-                        parts = line.split(']', 1)
-                        if len(parts) > 1:
-                            addr = parts[1].strip()
-                            module_addresses.append(addr)
-                        i += 1
-                    else:
-                        i += 1
-                
-                if not module_name:
-                    module_name = repo_name
-                
-                # Clean addresses
-                cleaned_addresses = []
-                for addr in module_addresses:
-                    if addr.count("https://") > 1:
-                        addr = addr.replace("https://", "", addr.count("https://") - 1)
-                    if addr.count("github.com") > 1:
-                        addr = addr.replace("github.com/", "", addr.count("github.com") - 1)
-                    if addr.count("gitlab.com") > 1:
-                        addr = addr.replace("gitlab.com/", "", addr.count("gitlab.com") - 1)
-                    cleaned_addresses.append(addr)
-                
-                # Extract branch from URL
-                clean_addr, url_branch = self.extract_branch_from_url(address)
-                clean_addr = clean_addr.rstrip('/')
-                branch_to_use = url_branch if url_branch else module_branch
-
-                # Add module without downloading
-                parent_module['submodules'][module_name] = {
-                    'description': module_description.strip(),
-                    'submodules': OrderedDict(),
-                    'submodule_addresses': cleaned_addresses,
-                    'repository': {
-                        'name': repo_name,
-                        'address': clean_addr,
-                        'branch': branch_to_use,
-                        'docs_path': None
-                    },
-                    'is_downloaded': False
-                }
-                
-                print(f"Added module info: {module_name}")
-
-                # Recursively fetch child module infos
-                if cleaned_addresses:
-                    self.fetch_submodule_infos(cleaned_addresses, module_name)
-                    new_path = parent_module_path.copy()
-                    new_path.append(module_name)
-                    self.parse_submodule_infos(new_path, cleaned_addresses)
-
     def update_progress(self, value):
         """Update the progress bar with the current value"""
         if self.progress_bar:
@@ -873,7 +734,12 @@ def main():
     from startup_menu import StartupMenu
     startup = StartupMenu()
     startup.show()
-    return app.exec_()
+    exit_code = app.exec_()
+
+    # Let queued status edits and .metadata writes reach the disk before the process exits
+    flush_status_writer(timeout=10)
+    get_metadata_writer().flush(timeout=10)
+    return exit_code
 
 def closeEvent(self, event):
     """Called when the application is closing"""
@@ -119,6 +119,13 @@ class MainMenuWidget(QWidget):
         info_layout.addWidget(self.proj_desc_label)
 
         info_layout.addStretch()
+
+        # Background revalidation status ("Checking for updates..." / "Hierarchy updated")
+        self.hierarchy_status_label = QLabel("")
+        self.hierarchy_status_label.setFont(QFont('Arial', 10))
+        self.hierarchy_status_label.setStyleSheet("color: #808080; background: transparent;")
+        self.hierarchy_status_label.hide()
+        info_layout.addWidget(self.hierarchy_status_label)
         body_layout_h.addWidget(info_widget, 2)
 
         # Right: buttons
@@ -134,6 +141,7 @@ class MainMenuWidget(QWidget):
         buttons.extend([
             ("System View", self.parent.show_system_view),
             ("Refresh Hierarchy", self.parent.refresh_hierarchy),
+            ("Update Downloaded Modules", self.parent.update_downloaded_repos),
             ("Exit", self.parent.close)
         ])
 
@@ -161,6 +169,13 @@ class MainMenuWidget(QWidget):
         self.proj_desc_label.setText(desc if desc else "No description available.")
         self.about_button.setVisible(self.find_root_readme() is not None)
 
+    def set_hierarchy_status(self, text, highlight=False):
+        """Show a short hierarchy revalidation status under the project info; empty text hides it"""
+        color = "#32CD32" if highlight else "#808080"
+        self.hierarchy_status_label.setStyleSheet(f"color: {color}; background: transparent;")
+        self.hierarchy_status_label.setText(text)
+        self.hierarchy_status_label.setVisible(bool(text))
+
     def find_root_readme(self):
         """Return path to README.md at the root repo, or None."""
         try:
@@ -0,0 +1,113 @@
+"""
+Metadata Writer Module
+Write-behind stage for the .metadata mirror of fetched ModuleInfo.txt files.
+
+The crawler hands parsed results straight to the tree builder and only
+queues the mirror copy here. A background thread drains the queue in
+batches, keeps the last write per path and replaces each file atomically
+under the project folder's lock, so disk I/O stays off the critical path of
+a cold load and never races another app instance.
+"""
+
+import queue
+import threading
+
+from atomic_storage import atomic_write, project_dir_for, ProjectLock, LockTimeout
+
+
+class MetadataWriter:
+    """Background thread that writes queued files in batches with atomic renames"""
+
+    def __init__(self, batch_delay=0.2, max_batch=256):
+        """
+        Args:
+            batch_delay: Seconds to wait for more writes after the first one of a batch
+            max_batch: Maximum number of queued writes taken into one batch
+        """
+        self.batch_delay = batch_delay
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def _ensure_thread(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="MetadataWriter", daemon=True)
+                self._thread.start()
+
+    def write(self, path, content):
+        """Queue content to be written to path; returns immediately"""
+        self._ensure_thread()
+        self._queue.put((path, content))
+
+    def flush(self, timeout=None):
+        """
+        Block until every queued write has hit the disk
+
+        Returns:
+            True if the queue drained, False if the timeout expired first
+        """
+        if self._thread is None:
+            return True
+        done = threading.Event()
+
+        def wait_for_queue():
+            self._queue.join()
+            done.set()
+
+        threading.Thread(target=wait_for_queue, daemon=True).start()
+        return done.wait(timeout)
+
+    def _take_batch(self):
+        """Block for the first write, then gather whatever arrives within batch_delay"""
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get(timeout=self.batch_delay))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            # Later writes to the same path supersede earlier ones
+            latest = {}
+            for path, content in batch:
+                latest[path] = content
+            by_project = {}
+            for path, content in latest.items():
+                by_project.setdefault(project_dir_for(path), []).append((path, content))
+            for project_dir, writes in by_project.items():
+                self._write_project(project_dir, writes)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write_project(self, project_dir, writes):
+        """Write one batch's files for a project folder under a single acquisition of its lock"""
+        try:
+            with ProjectLock(project_dir):
+                for path, content in writes:
+                    self._write_file(path, content)
+        except LockTimeout as e:
+            print(f"Skipped {len(writes)} metadata writes: {e}")
+
+    def _write_file(self, path, content):
+        try:
+            atomic_write(path, content)
+        except OSError as e:
+            print(f"Could not write {path}: {e}")
+
+
+_default_writer = None
+_default_writer_lock = threading.Lock()
+
+
+def get_metadata_writer():
+    """Return the shared MetadataWriter"""
+    global _default_writer
+    with _default_writer_lock:
+        if _default_writer is None:
+            _default_writer = MetadataWriter()
+        return _default_writer
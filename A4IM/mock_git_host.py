@@ -0,0 +1,513 @@
+"""
+Mock Git Host Module
+Local stand-in for GitHub/GitLab so the crawler, DownloadWorker and
+sync_downloaded_repos can be exercised and benchmarked without a network.
+
+A synthetic architect hierarchy of configurable breadth/depth is generated
+as bare repositories and served over:
+    - GitLab raw URLs:  /<group>/<repo>/-/raw/<branch>/<path>
+    - GitHub raw URLs:  /<owner>/<repo>/<branch>/<path>  (raw.githubusercontent.com layout)
+    - git smart-HTTP:   /<group>/<repo>[.git]/info/refs and /git-upload-pack (via git http-backend)
+    - GraphQL:          POST /graphql, answering the blob queries graphql_batch sends
+                        (GitHub repository/object and GitLab project/blobs shapes)
+The same repositories can be cloned through file:// URLs. Every request can
+be delayed and failed at configurable rates.
+
+Run standalone:
+    python mock_git_host.py --breadth 3 --depth 2 --latency 0.05 --failure-rate 0.1
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pygit2
+
+GIT_SERVICE_MARKERS = ('/info/refs', '/git-upload-pack', '/git-receive-pack')
+
+# Just enough of the two GraphQL dialects to answer graphql_batch's queries
+STRING_LITERAL = r'"(?:[^"\\]|\\.)*"'
+GITHUB_REPOSITORY_FIELD = re.compile(rf'(\w+): repository\(owner: ({STRING_LITERAL}), name: ({STRING_LITERAL})\)')
+GITHUB_OBJECT_FIELD = re.compile(rf'(\w+): object\(expression: ({STRING_LITERAL})\)')
+GITLAB_PROJECT_FIELD = re.compile(rf'(\w+): project\(fullPath: ({STRING_LITERAL})\)')
+GITLAB_BLOBS_FIELD = re.compile(rf'(\w+): blobs\(ref: ({STRING_LITERAL}), paths: (\[.*?\])\)')
+
+# Fixed author and timestamp so generated repositories have reproducible SHAs
+MOCK_SIGNATURE_TIME = 1700000000
+
+WORDS = ['bracket', 'motor', 'sensor', 'frame', 'board', 'housing', 'driver', 'mount',
+         'power', 'supply', 'gear', 'shaft', 'panel', 'cable', 'enclosure', 'controller']
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """Hands every request to the owning MockGitHost"""
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.mock_host._track_connection(self.connection, True)
+
+    def finish(self):
+        self.server.mock_host._track_connection(self.connection, False)
+        super().finish()
+
+    def do_GET(self):
+        self.server.mock_host.handle_request(self)
+
+    def do_POST(self):
+        self.server.mock_host.handle_request(self)
+
+    def log_message(self, format, *args):
+        if self.server.mock_host.verbose:
+            super().log_message(format, *args)
+
+    def send_body(self, status, body, content_type='text/plain; charset=utf-8', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def read_body(self):
+        """Request body, decoding chunked transfer encoding (libgit2 streams POSTs)"""
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            body = b''
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return body
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+
+class MockGitHost:
+    """
+    Synthetic module hierarchy of bare repositories behind a local HTTP server
+
+    Usage:
+        with MockGitHost(breadth=3, depth=2) as host:
+            crawl(host.root_address)
+    """
+
+    def __init__(self, breadth=3, depth=2, branch='main', group='mock', payload_kb=0,
+                 latency=0.0, jitter=0.0, failure_rate=0.0, failure_status=503,
+                 seed=0, root_dir=None, bind='127.0.0.1', port=0, verbose=False):
+        """
+        Args:
+            breadth: Number of submodules under every non-leaf module
+            depth: Levels below the architect module
+            branch: Branch every repository is committed to
+            group: First path component of every repository address
+            payload_kb: Size of a random binary file added to each repository (for clone benchmarks)
+            latency: Seconds added to every request
+            jitter: Extra random delay of up to this many seconds per request
+            failure_rate: Fraction of requests answered with failure_status instead
+            seed: Seed for generated text, payloads and injected failures
+            root_dir: Where to create the bare repositories (a temp dir by default)
+            bind, port: Address the HTTP server listens on (port 0 picks a free port)
+        """
+        self.breadth = breadth
+        self.depth = depth
+        self.branch = branch
+        self.group = group
+        self.payload_kb = payload_kb
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.seed = seed
+        self.bind = bind
+        self.port = port
+        self.verbose = verbose
+        self._owns_root_dir = root_dir is None
+        self.root_dir = root_dir
+        self.modules = {}  # repo name -> {'name', 'path', 'children', 'files'}
+        self.request_count = 0
+        self.failure_count = 0
+        self.graphql_count = 0  # GraphQL queries answered
+        self._stats_lock = threading.Lock()
+        self._fault_random = random.Random(seed)
+        self._connections = set()  # Open client sockets, closed by stop() like a host going away
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """Bind the server, generate the repositories and start serving in a daemon thread"""
+        if self.root_dir is None:
+            self.root_dir = tempfile.mkdtemp(prefix="a4im_mock_git_")
+        self._server = ThreadingHTTPServer((self.bind, self.port), MockRequestHandler)
+        self._server.daemon_threads = True
+        self._server.mock_host = self
+        self.port = self._server.server_address[1]
+
+        self._generate()
+
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MockGitHost", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving, drop open connections and remove generated repositories we created"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            with self._stats_lock:
+                connections, self._connections = self._connections, set()
+            for connection in connections:
+                try:
+                    connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        if self._owns_root_dir and self.root_dir and os.path.exists(self.root_dir):
+            shutil.rmtree(self.root_dir, ignore_errors=True)
+
+    def _track_connection(self, connection, is_open):
+        with self._stats_lock:
+            if is_open:
+                self._connections.add(connection)
+            else:
+                self._connections.discard(connection)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    @property
+    def base_url(self):
+        return f"http://{self.bind}:{self.port}"
+
+    @property
+    def root_address(self):
+        """[Module Address] of the architect repository"""
+        return self.address_for('architect')
+
+    def address_for(self, name):
+        return f"{self.base_url}/{self.group}/{name}"
+
+    def file_url_for(self, name):
+        """file:// URL of a repository, for clones that bypass HTTP"""
+        return 'file://' + self._bare_path(name).replace(os.sep, '/')
+
+    def _bare_path(self, name):
+        return os.path.join(self.root_dir, self.group, f"{name}.git")
+
+    def _generate(self):
+        rng = random.Random(self.seed)
+
+        def build(name, title, level):
+            children = []
+            if level < self.depth:
+                for i in range(1, self.breadth + 1):
+                    suffix = f"{name[len('module-'):]}-{i}" if name.startswith('module-') else str(i)
+                    child_title = f"{title}.{i}" if name.startswith('module-') else str(i)
+                    children.append(build(f"module-{suffix}", child_title, level + 1))
+            self.modules[name] = {'name': name, 'title': title, 'children': children}
+            return name
+
+        build('architect', 'Architect', 0)
+
+        for name, module in self.modules.items():
+            display_name = "Architect" if name == 'architect' else f"Module {module['title']}"
+            description = ' '.join(rng.choice(WORDS) for _ in range(12))
+            files = {
+                'lib/ModuleInfo.txt': self._module_info(display_name, description, module['children']),
+                'README.md': f"# {display_name}\n\n{description}\n".encode('utf-8'),
+                'docs/index.md': f"# {display_name}\n\nSynthetic documentation page.\n".encode('utf-8'),
+            }
+            if self.payload_kb:
+                files['data/payload.bin'] = bytes(rng.getrandbits(8) for _ in range(self.payload_kb * 1024))
+            module['files'] = files
+            module['path'] = self._bare_path(name)
+            self._commit(name, "Initial commit")
+
+    def _module_info(self, display_name, description, children):
+        lines = [f"[Module Name] {display_name}", f"[Module Info] {description}"]
+        lines.extend(f"[Module Address] {self.address_for(child)}" for child in children)
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+    def _write_tree(self, repo, files):
+        """Build nested tree objects from a {'dir/file': bytes} mapping"""
+        entries = {}
+        for path, content in files.items():
+            head, _, rest = path.partition('/')
+            if rest:
+                entries.setdefault(head, {})[rest] = content
+            else:
+                entries[head] = content
+
+        builder = repo.TreeBuilder()
+        for name in sorted(entries):
+            content = entries[name]
+            if isinstance(content, dict):
+                builder.insert(name, self._write_tree(repo, content), pygit2.GIT_FILEMODE_TREE)
+            else:
+                builder.insert(name, repo.create_blob(content), pygit2.GIT_FILEMODE_BLOB)
+        return builder.write()
+
+    def _commit(self, name, message):
+        module = self.modules[name]
+        if os.path.exists(module['path']):
+            repo = pygit2.Repository(module['path'])
+        else:
+            repo = pygit2.init_repository(module['path'], bare=True, initial_head=self.branch)
+
+        ref_name = f"refs/heads/{self.branch}"
+        parents = [repo.references[ref_name].target] if ref_name in repo.references else []
+        signature = pygit2.Signature('Mock Git Host', 'mock@localhost',
+                                     MOCK_SIGNATURE_TIME + len(parents), 0)
+        tree = self._write_tree(repo, module['files'])
+        return str(repo.create_commit(ref_name, signature, signature, message, tree, parents))
+
+    def update_module(self, name, description=None, files=None, message="Update module"):
+        """
+        Commit a change to one repository (e.g. to benchmark incremental refresh)
+
+        Returns:
+            The new commit SHA
+        """
+        module = self.modules[name]
+        if description is not None:
+            display_name = "Architect" if name == 'architect' else f"Module {module['title']}"
+            module['files']['lib/ModuleInfo.txt'] = self._module_info(display_name, description,
+                                                                      module['children'])
+        if files:
+            module['files'].update(files)
+        return self._commit(name, message)
+
+    def _inject_faults(self):
+        """Apply latency; returns True if the request should fail"""
+        with self._stats_lock:
+            self.request_count += 1
+            delay = self.latency + (self._fault_random.uniform(0, self.jitter) if self.jitter else 0)
+            fail = self.failure_rate and self._fault_random.random() < self.failure_rate
+            if fail:
+                self.failure_count += 1
+        if delay:
+            time.sleep(delay)
+        return fail
+
+    def _split_repo_path(self, path):
+        """'/group/name[.git]/rest' -> (name, '/rest'), or (None, None)"""
+        parts = path.strip('/').split('/', 2)
+        if len(parts) < 2 or parts[0] != self.group:
+            return None, None
+        name = parts[1][:-4] if parts[1].endswith('.git') else parts[1]
+        if name not in self.modules:
+            return None, None
+        return name, '/' + parts[2] if len(parts) > 2 else ''
+
+    def handle_request(self, handler):
+        if self._inject_faults():
+            if handler.command == 'POST':
+                handler.read_body()
+            handler.send_body(self.failure_status, b"Injected failure\n")
+            return
+
+        url = urlsplit(handler.path)
+        path = url.path
+        if path == '/graphql' and handler.command == 'POST':
+            self._serve_graphql(handler)
+            return
+
+        name, rest = self._split_repo_path(path)
+        if name is None:
+            if handler.command == 'POST':
+                handler.read_body()  # Leave the keep-alive connection at the next request
+            handler.send_body(404, b"Not found\n")
+            return
+
+        if any(rest.startswith(marker) for marker in GIT_SERVICE_MARKERS):
+            self._serve_git(handler, name, rest, url.query)
+        elif rest.startswith('/-/raw/'):
+            branch, _, file_path = rest[len('/-/raw/'):].partition('/')
+            self._serve_blob(handler, name, branch, file_path)
+        elif rest:
+            branch, _, file_path = rest.lstrip('/').partition('/')
+            self._serve_blob(handler, name, branch, file_path)
+        else:
+            handler.send_body(200, f"{self.modules[name]['title']}\n".encode('utf-8'))
+
+    def _lookup_blob(self, name, branch, file_path):
+        """Blob at file_path on branch of repository name, or None"""
+        repo = pygit2.Repository(self.modules[name]['path'])
+        try:
+            commit = repo.references[f"refs/heads/{branch}"].peel(pygit2.Commit)
+            return commit.tree[file_path]
+        except (KeyError, ValueError):
+            return None
+
+    def _serve_blob(self, handler, name, branch, file_path):
+        blob = self._lookup_blob(name, branch, file_path)
+        if blob is None:
+            handler.send_body(404, b"Not found\n")
+            return
+
+        etag = f'"{blob.id}"'
+        if handler.headers.get('If-None-Match') == etag:
+            handler.send_response(304)
+            handler.send_header('ETag', etag)
+            handler.send_header('Content-Length', '0')
+            handler.end_headers()
+            return
+        handler.send_body(200, blob.data, headers={'ETag': etag})
+
+    def _graphql_blob_text(self, name, branch, file_path):
+        if name not in self.modules:
+            return None
+        blob = self._lookup_blob(name, branch, file_path)
+        return blob.data.decode('utf-8') if blob is not None else None
+
+    def _github_graphql(self, query):
+        """GitHub shape: r0: repository(owner, name) { b0_0: object(expression: "branch:path") { ... on Blob { text } } }"""
+        data = {}
+        fields = list(GITHUB_REPOSITORY_FIELD.finditer(query))
+        for i, field in enumerate(fields):
+            owner, name = json.loads(field.group(2)), json.loads(field.group(3))
+            if owner != self.group or name not in self.modules:
+                data[field.group(1)] = None  # GitHub answers null (plus an error) for unknown repositories
+                continue
+            end = fields[i + 1].start() if i + 1 < len(fields) else len(query)
+            repository = {}
+            for blob_field in GITHUB_OBJECT_FIELD.finditer(query, field.end(), end):
+                branch, _, file_path = json.loads(blob_field.group(2)).partition(':')
+                text = self._graphql_blob_text(name, branch, file_path)
+                repository[blob_field.group(1)] = {'text': text} if text is not None else None
+            data[field.group(1)] = repository
+        return data
+
+    def _gitlab_graphql(self, query):
+        """GitLab shape: p0: project(fullPath) { repository { b0: blobs(ref, paths) { nodes { path rawTextBlob } } } }"""
+        data = {}
+        fields = list(GITLAB_PROJECT_FIELD.finditer(query))
+        for i, field in enumerate(fields):
+            group, _, name = json.loads(field.group(2)).partition('/')
+            if group != self.group or name not in self.modules:
+                data[field.group(1)] = None
+                continue
+            end = fields[i + 1].start() if i + 1 < len(fields) else len(query)
+            repository = {}
+            for blobs_field in GITLAB_BLOBS_FIELD.finditer(query, field.end(), end):
+                branch = json.loads(blobs_field.group(2))
+                nodes = []
+                for file_path in json.loads(blobs_field.group(3)):
+                    text = self._graphql_blob_text(name, branch, file_path)
+                    if text is not None:
+                        nodes.append({'path': file_path, 'rawTextBlob': text})
+                repository[blobs_field.group(1)] = {'nodes': nodes}
+            data[field.group(1)] = {'repository': repository}
+        return data
+
+    def _serve_graphql(self, handler):
+        """Answer a graphql_batch query from the generated repositories"""
+        body = handler.read_body()
+        if not handler.headers.get('Authorization', '').startswith('Bearer '):
+            handler.send_body(401, b'{"message": "Bad credentials"}', content_type='application/json')
+            return
+        try:
+            query = json.loads(body.decode('utf-8'))['query']
+        except (ValueError, KeyError, TypeError):
+            handler.send_body(400, b'{"errors": [{"message": "Invalid request"}]}',
+                              content_type='application/json')
+            return
+
+        with self._stats_lock:
+            self.graphql_count += 1
+        if GITLAB_PROJECT_FIELD.search(query):
+            data = self._gitlab_graphql(query)
+        else:
+            data = self._github_graphql(query)
+        handler.send_body(200, json.dumps({'data': data}).encode('utf-8'), content_type='application/json')
+
+    def _serve_git(self, handler, name, rest, query):
+        """Run git http-backend as a CGI for the smart-HTTP protocol"""
+        body = handler.read_body() if handler.command == 'POST' else b''
+        env = {
+            'PATH': os.environ.get('PATH', ''),
+            'GIT_PROJECT_ROOT': self.root_dir,
+            'GIT_HTTP_EXPORT_ALL': '1',
+            'PATH_INFO': f"/{self.group}/{name}.git{rest}",
+            'REQUEST_METHOD': handler.command,
+            'QUERY_STRING': query,
+            'CONTENT_TYPE': handler.headers.get('Content-Type', ''),
+            'CONTENT_LENGTH': str(len(body)),
+            'REMOTE_ADDR': handler.client_address[0],
+        }
+        for header in ('Content-Encoding', 'Git-Protocol'):
+            if handler.headers.get(header):
+                env['HTTP_' + header.upper().replace('-', '_')] = handler.headers[header]
+
+        try:
+            result = subprocess.run(['git', 'http-backend'], input=body, env=env,
+                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as e:
+            handler.send_body(500, f"git http-backend unavailable: {e}\n".encode('utf-8'))
+            return
+
+        separator = b'\r\n\r\n' if b'\r\n\r\n' in result.stdout else b'\n\n'
+        raw_headers, _, payload = result.stdout.partition(separator)
+        status = 200
+        headers = {}
+        for line in raw_headers.decode('latin-1').splitlines():
+            key, _, value = line.partition(':')
+            if key.lower() == 'status':
+                status = int(value.strip().split()[0])
+            elif key:
+                headers[key.strip()] = value.strip()
+        content_type = headers.pop('Content-Type', 'application/octet-stream')
+        handler.send_body(status, payload, content_type=content_type, headers=headers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic A4IM module hierarchy locally")
+    parser.add_argument('--breadth', type=int, default=3, help="Submodules per module")
+    parser.add_argument('--depth', type=int, default=2, help="Levels below the architect module")
+    parser.add_argument('--branch', default='main')
+    parser.add_argument('--payload-kb', type=int, default=0, help="Random payload size per repository")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Random extra delay per request")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--root-dir', default=None, help="Where to create the bare repositories")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    args = parser.parse_args()
+
+    host = MockGitHost(breadth=args.breadth, depth=args.depth, branch=args.branch,
+                       payload_kb=args.payload_kb, latency=args.latency, jitter=args.jitter,
+                       failure_rate=args.failure_rate, seed=args.seed, root_dir=args.root_dir,
+                       port=args.port, verbose=args.verbose)
+    host.start()
+    print(f"Serving {len(host.modules)} modules at {host.base_url}")
+    print(f"Architect repository: {host.root_address}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        host.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
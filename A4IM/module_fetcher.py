@@ -0,0 +1,309 @@
+"""
+Module Fetcher Module
+Fetches lib/ModuleInfo.txt from GitHub/GitLab repositories without cloning
+them. Loopback addresses use the GitLab raw URL layout, which is what
+mock_git_host serves.
+
+Which branch and filename spelling a repository uses is remembered in a
+persisted probe table, so warm fetches go straight to the right raw URL.
+Cold fetches race every candidate URL in parallel instead of trying them
+one round trip at a time. Only the highest-priority candidate is a normal
+cached request under the host's connection cap; the rest are short,
+streamed probes outside it, closed unread once a higher-priority one wins.
+
+Timeouts, retries and circuit breaking come from fetch_policy. A repository
+whose host is unavailable raises HostUnavailableError rather than returning
+None, so callers can tell "no ModuleInfo.txt" apart from "couldn't ask";
+the error carries the HTTP-cached copy in .cached when there is one.
+"""
+
+import os
+import json
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+from http_cache import CACHE_ROOT, http_get, get_session
+from fetch_policy import HostUnavailableError, get_policy
+
+MODULE_INFO_FILENAMES = ['ModuleInfo.txt', 'moduleInfo.txt']
+DEFAULT_BRANCHES = ['main', 'master']
+LOOPBACK_HOSTS = ('localhost', '127.0.0.1', '::1')
+PROBE_READ_TIMEOUT = 5  # Seconds a lower-priority race probe may wait for the server
+
+
+def normalize_repo_address(address):
+    """Normalize a repository address so equivalent spellings compare equal"""
+    address = address.strip()
+    if '://' in address:
+        address = address.split('://', 1)[1]
+    address = address.rstrip('/')
+    if address.endswith('.git'):
+        address = address[:-4]
+    host, _, path = address.partition('/')
+    return f"{host.lower()}/{path}"
+
+
+def raw_url_candidates(repo_url, branch=None):
+    """
+    List the raw URLs that may hold a repository's ModuleInfo.txt, in priority order
+
+    Returns:
+        List of (branch, filename, raw_url), empty for hosts other than GitHub,
+        GitLab and loopback; timeouts come from the host's fetch policy
+    """
+    repo_url = repo_url.strip()
+    if not repo_url.startswith('http'):
+        repo_url = 'https://' + repo_url
+
+    branches = [branch] if branch else []
+    branches.extend(b for b in DEFAULT_BRANCHES if b != branch)
+
+    candidates = []
+    if 'github.com' in repo_url:
+        parts = repo_url.replace('https://github.com/', '').replace('.git', '').split('/')
+        if len(parts) >= 2:
+            owner, repo = parts[0], parts[1]
+            for b in branches:
+                for filename in MODULE_INFO_FILENAMES:
+                    candidates.append((b, filename,
+                                       f"https://raw.githubusercontent.com/{owner}/{repo}/{b}/lib/{filename}"))
+        return candidates
+
+    if 'gitlab.com' in repo_url:
+        parts = repo_url.replace('https://gitlab.com/', '').replace('.git', '').split('/')
+        if len(parts) >= 2:
+            owner = parts[0]
+            repo_path = '/'.join(parts[1:])
+            for b in branches:
+                for filename in MODULE_INFO_FILENAMES:
+                    candidates.append((b, filename,
+                                       f"https://gitlab.com/{owner}/{repo_path}/-/raw/{b}/lib/{filename}"))
+        return candidates
+
+    # A local host (mock_git_host) serves the GitLab raw layout; any other host is unsupported
+    parsed = urlparse(repo_url)
+    if parsed.hostname not in LOOPBACK_HOSTS:
+        return candidates
+    repo_path = parsed.path.strip('/')
+    if repo_path.endswith('.git'):
+        repo_path = repo_path[:-4]
+    if '/' in repo_path:
+        for b in branches:
+            for filename in MODULE_INFO_FILENAMES:
+                candidates.append((b, filename,
+                                   f"{parsed.scheme}://{parsed.netloc}/{repo_path}/-/raw/{b}/lib/{filename}"))
+    return candidates
+
+
+def is_supported_address(repo_url):
+    """True if ModuleInfo.txt can be fetched from this repository's host"""
+    return bool(raw_url_candidates(repo_url))
+
+
+class ProbeTable:
+    """Persisted map of repository -> (branch, filename) that last resolved its ModuleInfo.txt"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(CACHE_ROOT, "probe_table.json")
+        self._lock = threading.Lock()
+        self._entries = None
+
+    @staticmethod
+    def make_key(repo_url, branch=None):
+        return f"{normalize_repo_address(repo_url)}@{branch or ''}"
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        try:
+            directory = os.path.dirname(self.path)
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save probe table: {e}")
+
+    def get(self, key):
+        with self._lock:
+            entry = self._load().get(key)
+        return tuple(entry) if entry else None
+
+    def record(self, key, branch, filename):
+        with self._lock:
+            entries = self._load()
+            if entries.get(key) != [branch, filename]:
+                entries[key] = [branch, filename]
+                self._save()
+
+    def forget(self, key):
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._save()
+
+
+class ModuleInfoFetcher:
+    """Fetches ModuleInfo.txt text, trying the learned raw URL first"""
+
+    def __init__(self, probe_table=None, max_parallel_probes=16):
+        self.probe_table = probe_table or ProbeTable()
+        self._executor = ThreadPoolExecutor(max_workers=max_parallel_probes)
+
+    def _probe(self, raw_url, cancelled, verbose=False):
+        """
+        Returns the body if raw_url answered 200, otherwise None
+
+        Raises:
+            HostUnavailableError: the host is down or its circuit breaker is open
+        """
+        if cancelled.is_set():
+            return None
+        try:
+            response = http_get(raw_url)
+            if verbose:
+                print(f"  {raw_url} -> {response.status_code}")
+            if response.stale:
+                raise HostUnavailableError(urlparse(raw_url).netloc, f"Serving cached {raw_url}",
+                                           cached=response.text)
+            if response.status_code == 200:
+                return response.text
+        except HostUnavailableError:
+            raise
+        except Exception as e:
+            if verbose:
+                print(f"  Error for {raw_url}: {e}")
+        return None
+
+    def _probe_speculative(self, raw_url, cancelled, verbose=False):
+        """
+        _probe for a lower-priority race candidate: a streamed GET with a short
+        read timeout, outside the host's connection cap and the HTTP cache,
+        whose body is only read if no higher-priority candidate has won yet
+
+        Raises:
+            HostUnavailableError: the host is down or its circuit breaker is open
+        """
+        if cancelled.is_set():
+            return None
+        try:
+            response = get_policy().request(get_session(), 'GET', raw_url, timeout=PROBE_READ_TIMEOUT,
+                                            capped=False, stream=True)
+            try:
+                if verbose:
+                    print(f"  {raw_url} -> {response.status_code}")
+                if response.status_code == 200 and not cancelled.is_set():
+                    return response.text
+            finally:
+                response.close()
+        except HostUnavailableError:
+            raise
+        except Exception as e:
+            if verbose:
+                print(f"  Error for {raw_url}: {e}")
+        return None
+
+    def _race(self, candidates, verbose=False):
+        """
+        Probe all candidates in parallel
+
+        The winner is the highest-priority candidate that returned 200, so a
+        repository that has both the requested branch and main still resolves
+        to the requested branch, as the old sequential loop did. The first
+        candidate is probed with _probe, the others with _probe_speculative;
+        once the race is decided, probes still waiting for headers close
+        their response as soon as the headers arrive.
+
+        Raises:
+            HostUnavailableError: nothing was found and at least one probe couldn't reach the host
+        """
+        cancelled = threading.Event()
+        futures = [self._executor.submit(self._probe if i == 0 else self._probe_speculative,
+                                         url, cancelled, verbose)
+                   for i, (_, _, url) in enumerate(candidates)]
+        results = [None] * len(futures)
+        resolved = [False] * len(futures)
+        index_of = {future: i for i, future in enumerate(futures)}
+        pending = set(futures)
+        unavailable = None
+        unavailable_index = None
+
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = index_of[future]
+                    resolved[i] = True
+                    try:
+                        results[i] = future.result()
+                    except HostUnavailableError as e:
+                        # Keep the highest-priority error that still has a cached copy
+                        if unavailable is None or (e.cached is not None and
+                                                   (unavailable.cached is None or i < unavailable_index)):
+                            unavailable, unavailable_index = e, i
+
+                # Winner once everything ahead of it in priority order has missed
+                for i in range(len(futures)):
+                    if not resolved[i]:
+                        break
+                    if results[i] is not None:
+                        return i, results[i]
+            if unavailable is not None:
+                raise unavailable
+            return None, None
+        finally:
+            cancelled.set()
+            for future in pending:
+                future.cancel()
+
+    def fetch(self, repo_url, branch=None, verbose=False):
+        """
+        Fetch ModuleInfo.txt content for a repository, or None if it can't be found
+
+        Raises:
+            HostUnavailableError: the repository's host couldn't be reached
+        """
+        candidates = raw_url_candidates(repo_url, branch)
+        if not candidates:
+            if verbose:
+                print(f"Unsupported repository address: {repo_url}")
+            return None
+
+        key = ProbeTable.make_key(repo_url, branch)
+        learned = self.probe_table.get(key)
+        if learned:
+            for i, (b, filename, raw_url) in enumerate(candidates):
+                if (b, filename) == learned:
+                    if verbose:
+                        print(f"Trying learned location: {raw_url}")
+                    # A host outage propagates here without forgetting the learned location
+                    content = self._probe(raw_url, threading.Event(), verbose)
+                    if content is not None:
+                        return content
+                    # The repository moved its file or branch; relearn below
+                    self.probe_table.forget(key)
+                    candidates = candidates[:i] + candidates[i + 1:]
+                    break
+
+        if verbose:
+            print(f"Probing {len(candidates)} locations for {repo_url}")
+        winner, content = self._race(candidates, verbose)
+        if winner is None:
+            if verbose:
+                print("Could not find ModuleInfo.txt in repository")
+            return None
+
+        b, filename, _ = candidates[winner]
+        if verbose:
+            print(f"✓ Found {filename} in lib/ on {b}")
+        self.probe_table.record(key, b, filename)
+        return content
@@ -0,0 +1,203 @@
+"""
+Module Info Module
+Single-pass parser for ModuleInfo.txt and a parse cache keyed by file identity.
+
+Every part of the app (the hierarchy crawler, SystemView's status panel and
+GitBuilding's task list) reads the same ModuleInfo record, and
+read_module_info only re-reads a file whose mtime, size or inode changed, so
+repeated layouts and clicks never touch unchanged files.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+
+# "[Tag] value" with the tag matched case-insensitively by the parser
+TAG_LINE = re.compile(r'\s*\[([^\]]*)\](.*)')
+TASK_LINE = re.compile(r'\s*\[([^\]]+)\]\s*Completed\s+(Yes|No)', re.IGNORECASE)
+
+COMPLETED_VALUES = ('yes', 'true', '1')
+IN_PROGRESS_VALUE = 'in progress'
+
+
+def clean_module_addresses(addresses):
+    """Fix addresses where the host was pasted twice (https://github.com/https://github.com/...)"""
+    cleaned_addresses = []
+    for address in addresses:
+        if address.count("https://") > 1:
+            address = address.replace("https://", "", address.count("https://") - 1)
+        if address.count("github.com") > 1:
+            address = address.replace("github.com/", "", address.count("github.com") - 1)
+        if address.count("gitlab.com") > 1:
+            address = address.replace("gitlab.com/", "", address.count("gitlab.com") - 1)
+        cleaned_addresses.append(address)
+    return cleaned_addresses
+
+
+class ModuleInfo:
+    """
+    Parsed ModuleInfo.txt. Records are shared through the parse cache, so treat them as read-only.
+
+    Attributes:
+        name: [Module Name], or None
+        description: [Module Info] including its continuation lines
+        branch: [Module Branch], or None
+        addresses: Cleaned [Module Address] entries (tuple)
+        assigned: [Team/Assigned] value, or None if the tag is absent
+        completed: Raw [Completed] value, or None if the tag is absent
+        tasks: ([Task Name], completed) pairs from the [Tasks] section (tuple)
+        deployed: [Deployed] timestamp string, or None
+    """
+
+    def __init__(self, name=None, description="", branch=None, addresses=(), assigned=None,
+                 completed=None, tasks=(), deployed=None):
+        self.name = name
+        self.description = description
+        self.branch = branch
+        self.addresses = tuple(addresses)
+        self.assigned = assigned
+        self.completed = completed
+        self.tasks = tuple(tasks)
+        self.deployed = deployed
+
+    @property
+    def completion_status(self):
+        """'completed', 'in_progress' or 'not_started', as SystemView shows it"""
+        value = (self.completed or '').strip().lower()
+        if value in COMPLETED_VALUES:
+            return 'completed'
+        if value == IN_PROGRESS_VALUE:
+            return 'in_progress'
+        return 'not_started'
+
+    def __repr__(self):
+        return f"ModuleInfo(name={self.name!r}, branch={self.branch!r}, addresses={len(self.addresses)})"
+
+
+def parse_module_info_text(content):
+    """Parse every field of ModuleInfo.txt content in one pass over its lines"""
+    name = None
+    description = None
+    branch = None
+    addresses = []
+    assigned = None
+    completed = None
+    tasks = []
+    deployed = None
+
+    in_description = False
+    in_tasks = False
+    for raw_line in content.split('\n'):
+        if in_description:
+            if not raw_line.startswith('['):
+                description += ' ' + raw_line.strip()
+                continue
+            in_description = False
+
+        match = TAG_LINE.match(raw_line)
+        if not match:
+            continue
+        tag = match.group(1).strip().lower()
+        value = match.group(2).strip()
+
+        if in_tasks:
+            task = TASK_LINE.match(raw_line)
+            if task:
+                tasks.append((task.group(1).strip(), task.group(2).lower() == 'yes'))
+                continue
+            if not value and 'completed' not in tag:
+                in_tasks = False  # A bare [Section] header ends the task list
+
+        if tag == 'module name':
+            name = value
+        elif tag == 'module info':
+            description = value
+            in_description = True
+        elif tag == 'module branch':
+            if value:
+                branch = value
+        elif tag == 'module address':
+            addresses.append(value)
+        elif tag == 'team/assigned':
+            if assigned is None:
+                assigned = value
+        elif tag == 'completed':
+            if completed is None:
+                completed = value
+        elif tag == 'tasks':
+            in_tasks = True
+        elif tag == 'deployed':
+            deployed = value or None
+
+    return ModuleInfo(
+        name=name,
+        description=(description or "").strip(),
+        branch=branch,
+        addresses=clean_module_addresses(addresses),
+        assigned=assigned,
+        completed=completed,
+        tasks=tasks,
+        deployed=deployed,
+    )
+
+
+class ModuleInfoCache:
+    """Parsed ModuleInfo records keyed by path and validated by (mtime, size, inode)"""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # abspath -> (identity, ModuleInfo)
+        self._lock = threading.Lock()
+
+    def read(self, path):
+        """
+        Parse the file at path, reusing the previous result if the file is unchanged
+
+        Returns:
+            ModuleInfo, or None if the file can't be read
+        """
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.forget(path)
+            return None
+        # The inode catches atomic replacements that keep the same size within one mtime tick
+        identity = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == identity:
+                self._entries.move_to_end(path)
+                return entry[1]
+
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                info = parse_module_info_text(f.read())
+        except OSError as e:
+            print(f"Could not read {path}: {e}")
+            return None
+
+        with self._lock:
+            self._entries[path] = (identity, info)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return info
+
+    def forget(self, path):
+        with self._lock:
+            self._entries.pop(os.path.abspath(path), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_default_cache = ModuleInfoCache()
+
+
+def read_module_info(path):
+    """Parse a ModuleInfo.txt file through the shared parse cache; None if unreadable"""
+    return _default_cache.read(path)
@@ -0,0 +1,394 @@
+"""
+Object Store Module
+Shared bare mirrors of module repositories, reused by every project.
+
+Each remote gets one bare mirror under "Downloaded Repositories/.cache/objects",
+keyed by the SHA-1 of its normalized address, so https://host/a/b and
+host/a/b.git share a mirror. A project checkout is a normal repository whose
+.git/objects/info/alternates points at the mirror: it borrows the mirror's
+objects instead of downloading its own copy, so a module already fetched for
+one project checks out for another without touching the network.
+
+Mirrors outlive the checkouts made from them, so a module deleted by a
+hierarchy sync, or removed and downloaded again, checks out at disk speed.
+Each mirror records its size and when it was last used (entry.json); once
+the store grows past its quota the least recently used mirrors are evicted,
+except those a checkout still borrows objects from.
+
+The alternates path is relative, so moving the whole "Downloaded Repositories"
+folder keeps the checkouts working.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+from contextlib import contextmanager
+
+import pygit2
+
+from http_cache import CACHE_ROOT
+from module_fetcher import normalize_repo_address
+from atomic_storage import ProjectLock, LockTimeout, atomic_write
+from transfer_progress import CloneCancelled
+
+OBJECT_STORE_ROOT = os.environ.get('A4IM_MIRROR_CACHE') or os.path.join(CACHE_ROOT, "objects")
+DOWNLOADS_ROOT = "Downloaded Repositories"  # Searched for checkouts that borrow from a mirror
+MIRROR_DIRNAME = "repo.git"
+ENTRY_FILENAME = "entry.json"
+REMOTE_PREFIX = "refs/remotes/origin/"
+DEFAULT_QUOTA_MB = 5 * 1024
+EVICT_MIN_AGE = 600  # Seconds; a mirror used this recently may be backing a checkout in progress
+
+
+def _directory_size(path):
+    total = 0
+    for directory, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(directory, name))
+            except OSError:
+                pass
+    return total
+
+
+def _alternate_targets(checkout):
+    """Absolute object directories a checkout's alternates file points at"""
+    objects_dir = os.path.join(checkout, '.git', 'objects')
+    try:
+        with open(os.path.join(objects_dir, 'info', 'alternates'), 'r') as f:
+            lines = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    except OSError:
+        return []
+    return [os.path.normcase(os.path.abspath(os.path.join(objects_dir, line))) for line in lines]
+
+
+def referenced_object_dirs(downloads_root=DOWNLOADS_ROOT):
+    """Mirror object directories borrowed by any checkout under downloads_root/<project>/<repo>"""
+    referenced = set()
+    try:
+        projects = [os.path.join(downloads_root, p) for p in os.listdir(downloads_root) if p != '.cache']
+    except OSError:
+        return referenced
+    for project in projects:
+        try:
+            repos = os.listdir(project)
+        except OSError:
+            continue
+        for repo in repos:
+            referenced.update(_alternate_targets(os.path.join(project, repo)))
+    return referenced
+
+
+def shared_objects_enabled():
+    """Set A4IM_SHARED_OBJECTS=0 to clone every project checkout independently"""
+    return os.environ.get('A4IM_SHARED_OBJECTS', '1') != '0'
+
+
+class ObjectStore:
+    """Bare mirrors keyed by normalized remote address, plus alternates-backed checkouts"""
+
+    def __init__(self, root=None, fetch_ttl=300, quota_bytes=None, downloads_root=DOWNLOADS_ROOT):
+        """
+        Args:
+            root: Store directory (defaults to OBJECT_STORE_ROOT)
+            fetch_ttl: Seconds a mirror fetch stays fresh; checkouts within it skip the network
+            quota_bytes: Size above which unused mirrors are evicted
+                (defaults to A4IM_MIRROR_CACHE_QUOTA_MB, or DEFAULT_QUOTA_MB)
+            downloads_root: Where the checkouts that may borrow from mirrors live
+        """
+        self.root = root or OBJECT_STORE_ROOT
+        self.fetch_ttl = fetch_ttl
+        if quota_bytes is None:
+            quota_bytes = int(os.environ.get('A4IM_MIRROR_CACHE_QUOTA_MB', DEFAULT_QUOTA_MB)) * 1024 * 1024
+        self.quota_bytes = quota_bytes
+        self.downloads_root = downloads_root
+
+    def key_for(self, url):
+        return hashlib.sha1(normalize_repo_address(url).encode('utf-8')).hexdigest()
+
+    def entry_dir(self, url):
+        """Directory holding the mirror and its lock file"""
+        key = self.key_for(url)
+        return os.path.join(self.root, key[:2], key)
+
+    def mirror_path(self, url):
+        return os.path.join(self.entry_dir(url), MIRROR_DIRNAME)
+
+    def has_mirror(self, url):
+        return os.path.exists(os.path.join(self.mirror_path(url), 'HEAD'))
+
+    def _record_use(self, url, measure=False):
+        """Update the entry's last-used time, and its size if measure (call with the entry locked)"""
+        path = os.path.join(self.entry_dir(url), ENTRY_FILENAME)
+        entry = self._read_entry(path) or {'url': url}
+        if measure or 'size' not in entry:
+            entry['size'] = _directory_size(self.mirror_path(url))
+        entry['last_used'] = time.time()
+        try:
+            atomic_write(path, json.dumps(entry))
+        except OSError as e:
+            print(f"Could not record mirror use for {url}: {e}")
+
+    @staticmethod
+    def _read_entry(path):
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+            return entry if isinstance(entry, dict) else None
+        except (OSError, ValueError):
+            return None
+
+    def entries(self):
+        """(entry_dir, entry dict) for every mirror in the store"""
+        result = []
+        try:
+            prefixes = os.listdir(self.root)
+        except OSError:
+            return result
+        for prefix in prefixes:
+            try:
+                keys = os.listdir(os.path.join(self.root, prefix))
+            except OSError:
+                continue
+            for key in keys:
+                entry_dir = os.path.join(self.root, prefix, key)
+                mirror_path = os.path.join(entry_dir, MIRROR_DIRNAME)
+                if not os.path.exists(os.path.join(mirror_path, 'HEAD')):
+                    continue
+                entry = self._read_entry(os.path.join(entry_dir, ENTRY_FILENAME))
+                if entry is None:
+                    # Mirror from before entries were recorded
+                    entry = {'size': _directory_size(mirror_path), 'last_used': os.path.getmtime(mirror_path)}
+                result.append((entry_dir, entry))
+        return result
+
+    def prune(self, quota_bytes=None):
+        """
+        Evict least recently used mirrors until the store fits in quota_bytes
+
+        Mirrors still borrowed from by a checkout, used in the last
+        EVICT_MIN_AGE seconds, or locked by a clone are kept. Returns the
+        number of bytes freed.
+        """
+        quota_bytes = self.quota_bytes if quota_bytes is None else quota_bytes
+        try:
+            # One prune at a time; a concurrent one is doing the same work
+            with ProjectLock(self.root, timeout=0):
+                entries = self.entries()
+                total = sum(entry.get('size', 0) for _dir, entry in entries)
+                if total <= quota_bytes:
+                    return 0
+                referenced = referenced_object_dirs(self.downloads_root)
+                freed = 0
+                for entry_dir, entry in sorted(entries, key=lambda item: item[1].get('last_used', 0)):
+                    if total - freed <= quota_bytes:
+                        break
+                    objects_dir = os.path.join(entry_dir, MIRROR_DIRNAME, 'objects')
+                    if os.path.normcase(os.path.abspath(objects_dir)) in referenced:
+                        continue
+                    if time.time() - entry.get('last_used', 0) < EVICT_MIN_AGE:
+                        continue
+                    try:
+                        with ProjectLock(entry_dir, timeout=0):
+                            shutil.rmtree(os.path.join(entry_dir, MIRROR_DIRNAME))
+                            os.remove(os.path.join(entry_dir, ENTRY_FILENAME))
+                    except LockTimeout:
+                        continue  # A clone is using it right now
+                    except OSError as e:
+                        print(f"Could not evict mirror {entry_dir}: {e}")
+                        continue
+                    freed += entry.get('size', 0)
+                    print(f"Evicted shared mirror of {entry.get('url', entry_dir)}")
+                return freed
+        except LockTimeout:
+            return 0
+
+    def _is_fresh(self, mirror_path):
+        fetch_head = os.path.join(mirror_path, 'FETCH_HEAD')
+        try:
+            return time.time() - os.path.getmtime(fetch_head) < self.fetch_ttl
+        except OSError:
+            return False
+
+    @contextmanager
+    def _mirror_lock(self, url, callbacks=None, timeout=600):
+        """
+        Hold a mirror's lock, polling so a cancelled download stops waiting for it
+
+        Raises:
+            CloneCancelled: callbacks was cancelled while another clone held the lock
+            LockTimeout: the lock was held for longer than timeout seconds
+        """
+        deadline = time.monotonic() + timeout
+        lock = ProjectLock(self.entry_dir(url), timeout=0.5)
+        while True:
+            try:
+                lock.acquire()
+                break
+            except LockTimeout:
+                if getattr(callbacks, 'cancelled', False):
+                    raise CloneCancelled("Download cancelled")
+                if time.monotonic() >= deadline:
+                    raise
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def ensure_mirror(self, url, callbacks=None, force_fetch=False):
+        """
+        Create or update the bare mirror for url
+
+        Returns:
+            The opened mirror pygit2.Repository
+
+        Raises:
+            pygit2.GitError: the clone or fetch failed
+            CloneCancelled: callbacks was cancelled
+        """
+        mirror_path = self.mirror_path(url)
+        with self._mirror_lock(url, callbacks):
+            if os.path.exists(os.path.join(mirror_path, 'HEAD')):
+                mirror = pygit2.Repository(mirror_path)
+                if not force_fetch and self._is_fresh(mirror_path):
+                    self._record_use(url)
+                    return mirror
+                print(f"Updating shared mirror of {url}")
+                try:
+                    mirror.remotes['origin'].fetch(callbacks=callbacks)
+                except pygit2.GitError as e:
+                    if force_fetch:
+                        raise
+                    # Offline or host down: the last fetched state still makes a valid checkout
+                    print(f"Could not update mirror of {url}, using it as is: {e}")
+            else:
+                # Clone beside the final path so a failed clone never leaves a half-written mirror
+                staging_path = mirror_path + ".part"
+                shutil.rmtree(staging_path, ignore_errors=True)
+                print(f"Creating shared mirror of {url}")
+                try:
+                    pygit2.clone_repository(url, staging_path, bare=True, callbacks=callbacks)
+                except BaseException:
+                    shutil.rmtree(staging_path, ignore_errors=True)
+                    raise
+                os.replace(staging_path, mirror_path)
+                mirror = pygit2.Repository(mirror_path)
+            self._record_use(url, measure=True)
+
+        # The mirror grew (or is new), which may have pushed the store over its quota
+        try:
+            self.prune()
+        except Exception as e:
+            print(f"Could not prune shared mirrors: {e}")
+        return mirror
+
+    def checkout(self, url, local_path, branch=None, callbacks=None, checkout_files=True):
+        """
+        Create a working copy of url at local_path that borrows objects from the shared mirror
+
+        The checkout has origin set to url and a local branch tracking origin/<branch>,
+        exactly like a direct clone. With checkout_files=False HEAD is set up but
+        nothing is written to the working tree, for callers that apply a sparse
+        checkout first.
+
+        Raises:
+            pygit2.GitError: the mirror could not be created
+            FileExistsError: local_path is a non-empty directory
+            KeyError: branch does not exist on the remote
+        """
+        if os.path.isdir(local_path) and os.listdir(local_path):
+            raise FileExistsError(f"'{local_path}' exists and is not an empty directory")
+
+        mirror = self.ensure_mirror(url, callbacks=callbacks)
+        if branch is None:
+            branch = mirror.head.shorthand if not mirror.head_is_unborn else None
+        remote_heads = {ref[len(REMOTE_PREFIX):]: mirror.references[ref].target
+                        for ref in mirror.references if ref.startswith(REMOTE_PREFIX)}
+        if branch not in remote_heads:
+            # The mirror may predate the branch; refetch once before giving up
+            mirror = self.ensure_mirror(url, callbacks=callbacks, force_fetch=True)
+            remote_heads = {ref[len(REMOTE_PREFIX):]: mirror.references[ref].target
+                            for ref in mirror.references if ref.startswith(REMOTE_PREFIX)}
+            if branch not in remote_heads:
+                raise KeyError(f"Branch {branch!r} not found on {url}")
+
+        try:
+            repo = pygit2.init_repository(local_path, initial_head=branch)
+            objects_dir = os.path.join(repo.path, 'objects')
+            try:
+                alternate = os.path.relpath(os.path.join(mirror.path, 'objects'), objects_dir)
+            except ValueError:
+                alternate = os.path.abspath(os.path.join(mirror.path, 'objects'))  # Another drive
+            os.makedirs(os.path.join(objects_dir, 'info'), exist_ok=True)
+            with open(os.path.join(objects_dir, 'info', 'alternates'), 'w') as f:
+                f.write(alternate.replace(os.sep, '/') + '\n')
+
+            repo = pygit2.Repository(local_path)  # Reopen so the alternate is picked up
+            repo.remotes.create('origin', url)
+            for name, target in remote_heads.items():
+                if name != 'HEAD':
+                    repo.references.create(REMOTE_PREFIX + name, target, force=True)
+
+            commit = repo[remote_heads[branch]].peel(pygit2.Commit)
+            local_branch = repo.branches.local.create(branch, commit)
+            local_branch.upstream = repo.branches.remote['origin/' + branch]
+            repo.set_head(local_branch.name)
+            if checkout_files:
+                repo.checkout_head(strategy=pygit2.GIT_CHECKOUT_FORCE)
+            return repo
+        except BaseException:
+            shutil.rmtree(local_path, ignore_errors=True)
+            raise
+
+
+_default_store = None
+
+
+def get_object_store():
+    """Return the shared ObjectStore"""
+    global _default_store
+    if _default_store is None:
+        _default_store = ObjectStore()
+    return _default_store
+
+
+def checkout_shared(url, local_path, branch=None, callbacks=None, checkout_files=True):
+    """
+    Check url out at local_path through the shared object store (see ObjectStore.checkout)
+
+    Returns:
+        The pygit2.Repository, or None if the store can't be used (disabled,
+        unwritable, its mirror locked for too long, or the checkout failed)
+        and the caller should clone directly
+
+    Raises:
+        KeyError: branch does not exist on the remote
+        CloneCancelled: callbacks was cancelled
+    """
+    if not shared_objects_enabled():
+        return None
+    try:
+        return get_object_store().checkout(url, local_path, branch=branch, callbacks=callbacks,
+                                           checkout_files=checkout_files)
+    except KeyError:
+        raise
+    except (pygit2.GitError, OSError, LockTimeout) as e:
+        print(f"Shared object store unavailable for {url} ({e}); cloning directly")
+        return None
+
+
+def clone_repository(url, local_path, branch=None, callbacks=None, depth=0):
+    """
+    Clone url into local_path through the shared object store
+
+    Falls back to a direct pygit2 clone, depth commits deep (0 for all), if
+    the shared store can't be used.
+    """
+    repo = checkout_shared(url, local_path, branch=branch, callbacks=callbacks)
+    if repo is not None:
+        return repo
+    if branch:
+        return pygit2.clone_repository(url, local_path, checkout_branch=branch, callbacks=callbacks, depth=depth)
+    return pygit2.clone_repository(url, local_path, callbacks=callbacks, depth=depth)
@@ -0,0 +1,100 @@
+"""
+Remote Heads Module
+Resolves the commit SHA a remote branch points at without cloning or
+fetching any objects - the HTTP equivalent of `git ls-remote`.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from http_cache import get_session
+from fetch_policy import get_policy, CircuitOpenError
+
+
+def parse_ref_advertisement(data):
+    """
+    Parse a smart-HTTP ref advertisement (pkt-line format)
+
+    Returns:
+        (refs, head_target): refs maps ref name -> SHA, head_target is the
+        ref HEAD points at (from the symref capability), or None
+    """
+    refs = {}
+    head_target = None
+    pos = 0
+    while pos + 4 <= len(data):
+        try:
+            length = int(data[pos:pos + 4], 16)
+        except ValueError:
+            break
+        if length == 0:  # flush-pkt
+            pos += 4
+            continue
+        line = data[pos + 4:pos + length].rstrip(b'\n')
+        pos += length
+        if line.startswith(b'#'):
+            continue
+
+        line, _, capabilities = line.partition(b'\0')
+        for capability in capabilities.split(b' '):
+            if capability.startswith(b'symref=HEAD:'):
+                head_target = capability[len(b'symref=HEAD:'):].decode('utf-8', errors='replace')
+
+        sha, _, name = line.partition(b' ')
+        if len(sha) == 40 and name:
+            refs[name.decode('utf-8', errors='replace')] = sha.decode('ascii')
+    return refs, head_target
+
+
+def list_remote_refs(address, timeout=None):
+    """Return (refs, head_target) advertised by a remote repository"""
+    url = address.strip().rstrip('/')
+    if '://' not in url:
+        url = 'https://' + url
+    if not url.endswith('.git'):
+        url += '.git'
+
+    response = get_policy().request(
+        get_session(), 'GET', f"{url}/info/refs?service=git-upload-pack",
+        headers={'User-Agent': 'git/2.0 (A4IM)'},
+        timeout=timeout,
+    )
+    if response.status_code != 200:
+        raise IOError(f"ls-remote of {address} failed with HTTP {response.status_code}")
+    return parse_ref_advertisement(response.content)
+
+
+def resolve_remote_head(address, branch=None, timeout=None):
+    """
+    Return the SHA of a remote branch (or of HEAD when no branch is given)
+
+    Returns None if the remote or branch can't be resolved.
+    """
+    try:
+        refs, _ = list_remote_refs(address, timeout=timeout)
+    except CircuitOpenError:
+        return None  # Already reported when the breaker opened
+    except Exception as e:
+        print(f"Could not resolve remote head for {address}: {e}")
+        return None
+
+    if branch:
+        return refs.get(f"refs/heads/{branch}")
+    return refs.get('HEAD')
+
+
+def resolve_remote_heads(items, max_workers=8, timeout=None):
+    """
+    Resolve many remote heads in parallel
+
+    Args:
+        items: Iterable of (address, branch) pairs
+
+    Returns:
+        Dict of (address, branch) -> SHA (or None)
+    """
+    items = list(dict.fromkeys(items))
+    if not items:
+        return {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        shas = executor.map(lambda item: resolve_remote_head(item[0], item[1], timeout), items)
+        return dict(zip(items, shas))
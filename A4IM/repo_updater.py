@@ -0,0 +1,228 @@
+"""
+Repo Updater Module
+Updates every downloaded module repository of a project in parallel.
+
+Each repository is fetched from origin and fast-forwarded to its configured
+[Module Branch] (or the branch it is on). Nothing is ever reset: a repository
+on another branch, with local commits (diverged), or with local edits that
+the update would overwrite is skipped and reported instead. Local edits the
+update doesn't touch, like the status lines in lib/ModuleInfo.txt, are kept.
+
+Fetches run in a worker pool, so updating a project takes about as long as
+its slowest fetch rather than the sum of all of them. Repositories whose
+remote head hasn't moved (see update_checker) aren't fetched at all.
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError, wait, FIRST_COMPLETED
+
+import pygit2
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from download_profiles import git_executable, run_git
+from transfer_progress import TransferMonitor, CloneCancelled
+from update_checker import check_repository
+from download_manifest import record_download
+
+UPDATED = 'updated'
+UP_TO_DATE = 'up_to_date'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+
+
+def _short(oid):
+    return str(oid)[:7]
+
+
+def _is_partial_checkout(repo):
+    """Docs-only downloads (partial clone + sparse checkout) need the git command line"""
+    config = repo.config
+    return 'remote.origin.promisor' in config or 'core.sparsecheckout' in config
+
+
+def _update_with_git(git, path, branch, callbacks=None):
+    """Fetch and fast-forward a docs-only checkout with git, which keeps its sparse patterns"""
+    run_git(git, ['fetch', '--quiet', 'origin', branch], cwd=path, callbacks=callbacks)
+    old = run_git(git, ['rev-parse', 'HEAD'], cwd=path)
+    new = run_git(git, ['rev-parse', 'FETCH_HEAD'], cwd=path)
+    if old == new:
+        return UP_TO_DATE, "Up to date"
+    ahead, behind = (int(n) for n in run_git(
+        git, ['rev-list', '--left-right', '--count', f'HEAD...{new}'], cwd=path).split())
+    if not behind:
+        return UP_TO_DATE, f"{ahead} local commit(s) not on origin"
+    if ahead:
+        return SKIPPED, f"Diverged from origin/{branch} ({ahead} local, {behind} new commits)"
+    try:
+        run_git(git, ['merge', '--quiet', '--ff-only', new], cwd=path, callbacks=callbacks)
+    except pygit2.GitError as e:
+        return SKIPPED, f"Local changes would be overwritten ({e})"
+    return UPDATED, f"{_short(old)}..{_short(new)} ({behind} new commit(s))"
+
+
+def update_repository(path, branch=None, callbacks=None):
+    """
+    Fetch origin and fast-forward the checked out branch
+
+    Args:
+        path: Working copy to update
+        branch: Branch the module should be on; None means whatever is checked out
+        callbacks: Optional TransferMonitor for the fetch
+
+    Returns:
+        (status, message), status being UPDATED, UP_TO_DATE or SKIPPED
+
+    Raises:
+        pygit2.GitError: the repository couldn't be opened or fetched
+        CloneCancelled: callbacks was cancelled
+    """
+    repo = pygit2.Repository(path)
+    if repo.head_is_unborn or repo.head_is_detached:
+        return SKIPPED, "No branch checked out"
+    current = repo.head.shorthand
+    branch = branch or current
+    if branch != current:
+        return SKIPPED, f"On branch {current}, expected {branch}"
+    if 'origin' not in [remote.name for remote in repo.remotes]:
+        return SKIPPED, "No origin remote"
+
+    if _is_partial_checkout(repo):
+        git = git_executable()
+        if not git:
+            return SKIPPED, "Docs-only download needs git to update"
+        return _update_with_git(git, path, branch, callbacks)
+
+    repo.remotes['origin'].fetch(callbacks=callbacks)
+    remote_ref = repo.references.get(f"refs/remotes/origin/{branch}")
+    if remote_ref is None:
+        return SKIPPED, f"Branch {branch} no longer exists on origin"
+
+    local, remote = repo.head.target, remote_ref.target
+    if local == remote:
+        return UP_TO_DATE, "Up to date"
+    ahead, behind = repo.ahead_behind(local, remote)
+    if not behind:
+        return UP_TO_DATE, f"{ahead} local commit(s) not on origin"
+    if ahead:
+        return SKIPPED, f"Diverged from origin/{branch} ({ahead} local, {behind} new commits)"
+
+    try:
+        # SAFE checkout refuses, before writing anything, to overwrite files changed locally
+        repo.checkout_tree(repo[remote], strategy=pygit2.GIT_CHECKOUT_SAFE)
+    except pygit2.GitError as e:
+        return SKIPPED, f"Local changes would be overwritten ({e})"
+    repo.head.set_target(remote, f"fast-forward: origin/{branch}")
+    return UPDATED, f"{_short(local)}..{_short(remote)} ({behind} new commit(s))"
+
+
+class UpdateTask:
+    """One downloaded repository to update"""
+
+    def __init__(self, name, local_path, branch=None):
+        self.name = name
+        self.local_path = local_path
+        self.branch = branch
+
+
+def tasks_from_clone_tasks(clone_tasks):
+    """UpdateTasks for the CloneTasks (see clone_scheduler) whose repository is downloaded"""
+    return [UpdateTask(task.name, task.local_path, task.branch) for task in clone_tasks
+            if os.path.isdir(os.path.join(task.local_path, '.git'))]
+
+
+class RepoUpdater(QThread):
+    """
+    Background thread that updates UpdateTasks in a worker pool
+
+    finished carries a summary dict: updated, up_to_date, skipped and failed
+    (lists of (name, message) pairs), cancelled and elapsed (seconds).
+    """
+    task_finished = pyqtSignal(str, str, str)  # name, status, message
+    progress = pyqtSignal(int, int)  # done, total
+    finished = pyqtSignal(object)  # summary dict
+
+    def __init__(self, tasks, max_workers=16):
+        """
+        Args:
+            tasks: UpdateTasks
+            max_workers: Fetches running at once
+        """
+        super().__init__()
+        self.tasks = list(tasks)
+        self.max_workers = max_workers
+        self.results = {UPDATED: [], UP_TO_DATE: [], SKIPPED: [], FAILED: []}
+        self._is_running = True
+        self._cancel = threading.Event()  # Shared by every fetch's TransferMonitor
+
+    def stop(self):
+        """Start no further updates and abort the running fetches"""
+        self._is_running = False
+        self._cancel.set()
+
+    def _update(self, task):
+        """Runs in the worker pool"""
+        try:
+            # Asked for explicitly, so don't trust a head cached by the background check
+            available, _local, _remote = check_repository(task.local_path, task.branch, timeout=15,
+                                                          fresh=True)
+        except Exception:
+            available = None  # Let the fetch report what's wrong
+        if available is False:
+            return UP_TO_DATE, "Up to date"
+        monitor = TransferMonitor(task.name, cancel_event=self._cancel)
+        status, message = update_repository(task.local_path, task.branch, callbacks=monitor)
+        if status == UPDATED:
+            record_download(task.local_path)
+        return status, message
+
+    def run(self):
+        started_at = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        running = {}
+        done_count = 0
+        try:
+            for task in self.tasks:
+                running[executor.submit(self._update, task)] = task
+            self.progress.emit(0, len(self.tasks))
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    try:
+                        status, message = future.result()
+                    except (CloneCancelled, CancelledError):
+                        continue
+                    except Exception as e:
+                        status, message = FAILED, str(e)
+                        print(f"Failed to update {task.name}: {message}")
+                    self.results[status].append((task.name, message))
+                    self.task_finished.emit(task.name, status, message)
+                    done_count += 1
+                self.progress.emit(done_count, len(self.tasks))
+                if not self._is_running:
+                    for future in running:
+                        future.cancel()  # Not started yet
+        finally:
+            executor.shutdown(wait=True)
+
+        summary = {status: list(items) for status, items in self.results.items()}
+        summary['cancelled'] = not self._is_running
+        summary['elapsed'] = time.monotonic() - started_at
+        self.finished.emit(summary)
+
+
+def format_update_summary(summary):
+    """Message text for a RepoUpdater summary dict"""
+    total = sum(len(summary[status]) for status in (UPDATED, UP_TO_DATE, SKIPPED, FAILED))
+    lines = [f"Checked {total} repositories in {summary['elapsed']:.0f}s: "
+             f"{len(summary[UPDATED])} updated, {len(summary[UP_TO_DATE])} up to date, "
+             f"{len(summary[SKIPPED])} skipped, {len(summary[FAILED])} failed."]
+    if summary['cancelled']:
+        lines.append("The update was cancelled before every repository was checked.")
+    for status, heading in ((UPDATED, "Updated"), (SKIPPED, "Skipped"), (FAILED, "Failed")):
+        if summary[status]:
+            lines.append(f"\n{heading}:")
+            lines.extend(f"  • {name}: {message}" for name, message in summary[status])
+    return "\n".join(lines)
@@ -0,0 +1,139 @@
+"""
+Status Writer Module
+Debounced write-behind for the [Team/Assigned] / [Completed] lines of ModuleInfo.txt.
+
+SystemView queues status edits here instead of rewriting ModuleInfo.txt on
+every click. Edits to the same file are merged, and once no edit has arrived
+for the debounce interval the batch is written on a worker thread: one
+locked, atomic read-modify-write per file. Layouts run on the GUI thread, so
+the debounce timer can never fire in the middle of one.
+
+Until an edit reaches the disk, pending_edits() returns it so reads can
+overlay it on what the file still says.
+"""
+
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, QTimer
+
+from atomic_storage import atomic_write, ProjectLock
+
+COMPLETED_TEXT = {
+    'completed': 'Yes',
+    'in_progress': 'In progress',
+    'not_started': 'No',
+}
+
+
+def apply_status_edits(content, edits):
+    """
+    Return ModuleInfo.txt content with the [Team/Assigned] and [Completed] lines set
+
+    Args:
+        edits: May hold 'assigned_to' and/or 'completion_status'
+    """
+    lines = []
+    if 'assigned_to' in edits:
+        lines.append(('Team/Assigned', edits['assigned_to']))
+    if 'completion_status' in edits:
+        lines.append(('Completed', COMPLETED_TEXT.get(edits['completion_status'], 'No')))
+
+    for tag, value in lines:
+        pattern = r'\[' + re.escape(tag) + r'\]'
+        if re.search(pattern, content, re.IGNORECASE):
+            content = re.sub(pattern + r'.*', lambda m: f"[{tag}] {value}", content, flags=re.IGNORECASE)
+        else:
+            content += f"\n[{tag}] {value}"
+    return content
+
+
+class ModuleStatusWriter(QObject):
+    """Coalesces status edits per ModuleInfo.txt and writes them after a quiet period"""
+
+    def __init__(self, debounce_ms=750, parent=None):
+        super().__init__(parent)
+        self._pending = {}   # abspath -> edits not yet handed to the worker
+        self._inflight = {}  # abspath -> edits being written
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="StatusWriter")
+        self._last_batch = None
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(debounce_ms)
+        self._timer.timeout.connect(self.flush)
+
+    def queue(self, path, **edits):
+        """Merge edits (assigned_to=..., completion_status=...) into path's pending write"""
+        path = os.path.abspath(path)
+        with self._lock:
+            self._pending.setdefault(path, {}).update(edits)
+        self._timer.start()  # Restarting the timer extends the debounce
+
+    def pending_edits(self, path):
+        """Edits for path that haven't reached the disk yet (read-your-writes overlay)"""
+        path = os.path.abspath(path)
+        with self._lock:
+            edits = dict(self._inflight.get(path, {}))
+            edits.update(self._pending.get(path, {}))
+        return edits
+
+    def flush(self, wait=False, timeout=None):
+        """
+        Hand every pending edit to the worker thread
+
+        Args:
+            wait: Block until the batch (and any earlier one) is on disk
+        """
+        self._timer.stop()
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            for path, edits in batch.items():
+                self._inflight.setdefault(path, {}).update(edits)
+        if batch:
+            self._last_batch = self._executor.submit(self._write_batch, batch)
+        if wait and self._last_batch is not None:
+            try:
+                self._last_batch.result(timeout)
+            except Exception as e:
+                print(f"Status write did not finish: {e}")
+
+    def _write_batch(self, batch):
+        for path, edits in batch.items():
+            try:
+                with ProjectLock.for_path(path):
+                    with open(path, 'r', encoding='utf-8') as f:
+                        content = f.read()
+                    atomic_write(path, apply_status_edits(content, edits))
+                print(f"Saved status edits to {path}")
+            except Exception as e:
+                print(f"Error saving module data to {path}: {str(e)}")
+            with self._lock:
+                inflight = self._inflight.get(path)
+                if inflight is not None:
+                    # Keep anything a later flush merged in while this write ran
+                    for key, value in edits.items():
+                        if inflight.get(key) == value:
+                            del inflight[key]
+                    if not inflight:
+                        del self._inflight[path]
+
+
+_default_writer = None
+
+
+def get_status_writer():
+    """Return the shared ModuleStatusWriter (create it on the GUI thread)"""
+    global _default_writer
+    if _default_writer is None:
+        _default_writer = ModuleStatusWriter()
+    return _default_writer
+
+
+def flush_status_writer(timeout=None):
+    """Write out pending status edits before the app exits"""
+    if _default_writer is not None:
+        _default_writer.flush(wait=True, timeout=timeout)
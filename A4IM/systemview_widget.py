@@ -6,18 +6,24 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt, QPointF, QRectF, QLineF
 from PyQt5.QtGui import QFont, QColor, QPen, QBrush, QPainter, QPixmap
-from PyQt5.QtCore import QUrl, QThread, pyqtSignal
+from PyQt5.QtCore import QUrl, QThread, QTimer, pyqtSignal
 import math
 import os
 import sys
 import tempfile
 import re
 import datetime
+import time
 import pygit2
 import subprocess
 import platform
 from collections import OrderedDict
 from download_manager import DownloadManager , DownloadWorker
+from module_info import read_module_info
+from status_writer import get_status_writer
+from download_profiles import PROFILES, load_project_profile, save_project_profile
+from update_checker import UpdateChecker
+from download_manifest import get_manifest, ManifestReconcileThread
 
 
 class BrowserOpenerThread(QThread):
@@ -202,6 +208,35 @@ class NodeItem(QGraphicsRectItem):
             width/2 - indicator_width - 3,  # Right edge with small padding
             height/2 - indicator_height - 3  # Bottom edge with small padding
         )
+
+        # "Update available" marker left of the download indicator, shown by the update checker
+        self.update_available = False
+        self.update_indicator = QGraphicsTextItem(self)
+        self.update_indicator.setDefaultTextColor(QColor("#F0AD4E"))  # Orange
+        self.update_indicator.setFont(download_font)
+        self.update_indicator.setPlainText("↻")
+        self.update_indicator.setToolTip("Update available")
+        self.update_indicator.setPos(
+            width/2 - indicator_width - self.update_indicator.boundingRect().width() - 3,
+            height/2 - indicator_height - 3
+        )
+        self.update_indicator.hide()
+
+    def set_downloaded(self, downloaded):
+        """Set is_downloaded and show it on the download indicator"""
+        self.is_downloaded = downloaded
+        if downloaded:
+            self.download_indicator.setPlainText("✓")
+            self.download_indicator.setDefaultTextColor(QColor("#32CD32"))  # Green
+        else:
+            self.download_indicator.setPlainText("☁")  # Cloud icon
+            self.download_indicator.setDefaultTextColor(QColor("#FFD700"))  # Gold color
+
+    def set_update_available(self, available):
+        """Show or hide the "update available" marker"""
+        self.update_available = available
+        self.update_indicator.setVisible(available)
+
     # Handle mouse press event
     def mousePressEvent(self, event):
         self.scene().clearSelection()
@@ -319,6 +354,11 @@ class SystemView(QWidget):
         self.modules_data = {}  # Store modules data
         self.project_name = None  # Store the project name dynamically
         self.download_manager = DownloadManager(self)
+        # Marks downloaded modules whose remote branch has moved on
+        self.update_checker = UpdateChecker(self.update_check_targets, parent=self)
+        self.update_checker.checked.connect(self.apply_update_check)
+        self.reconcile_thread = None  # Background check of the download manifest against the disk
+        self.reconciled_at = {}  # project dir -> time of the last reconcile
         self.browser_thread = None  # Keep reference to browser thread
         self.folder_thread = None  # Keep reference to folder thread
         self.layout_orientation = 'horizontal'
@@ -349,7 +389,18 @@ class SystemView(QWidget):
         modules_label = QLabel("Modules Graph")
         modules_label.setFont(QFont('Arial', 16, QFont.Bold))
         modules_label.setStyleSheet("color: #465775;")
-        graphics_layout.addWidget(modules_label)
+
+        # Shown briefly when a background revalidation patched the hierarchy
+        self.hierarchy_updated_label = QLabel("● Hierarchy updated")
+        self.hierarchy_updated_label.setFont(QFont('Arial', 10))
+        self.hierarchy_updated_label.setStyleSheet("color: #32CD32;")
+        self.hierarchy_updated_label.hide()
+
+        modules_header = QHBoxLayout()
+        modules_header.addWidget(modules_label)
+        modules_header.addStretch()
+        modules_header.addWidget(self.hierarchy_updated_label)
+        graphics_layout.addLayout(modules_header)
 
         # Create custom graphics view with zoom functionality
         self.graphics_view = ZoomableGraphicsView()
@@ -585,6 +636,13 @@ class SystemView(QWidget):
         self.download_module_button.hide()
         right_layout.addWidget(self.download_module_button)
 
+        # Per-repository transfer lines while a module tree downloads
+        self.download_details_label = QLabel("")
+        self.download_details_label.setStyleSheet("color: #666666; font-size: 11px;")
+        self.download_details_label.setWordWrap(True)
+        self.download_details_label.hide()
+        right_layout.addWidget(self.download_details_label)
+
         # Placeholder shown when no node is selected
         self.no_selection_label = QLabel("Select a module from the graph to view details.")
         self.no_selection_label.setStyleSheet("color: #aaaaaa; font-size: 13px;")
@@ -661,6 +719,101 @@ class SystemView(QWidget):
         # Auto-fit view to show all content, centered and zoomed out
         self.recenter_view()
 
+        self.start_manifest_reconcile()
+
+        # Remote heads are cached, so repopulating doesn't ask the hosts again
+        self.update_checker.start()
+
+    def manifest(self):
+        """The open project's DownloadManifest"""
+        return get_manifest(self.project_dir())
+
+    def start_manifest_reconcile(self):
+        """Compare the download manifest with the disk in the background"""
+        if self.reconcile_thread and self.reconcile_thread.isRunning():
+            return
+        project_dir = self.project_dir()
+        last = self.reconciled_at.get(project_dir)
+        if last is not None and time.monotonic() - last < 30:
+            return  # Flipping the layout repopulates; the disk hasn't changed since
+        self.reconciled_at[project_dir] = time.monotonic()
+        self.reconcile_thread = ManifestReconcileThread(project_dir)
+        self.reconcile_thread.finished.connect(self.apply_manifest_changes)
+        self.reconcile_thread.start()
+
+    def apply_manifest_changes(self, changed):
+        """Update the nodes of repositories whose downloaded state changed on disk"""
+        if not changed:
+            return
+        manifest = self.manifest()
+        for node in getattr(self, 'all_nodes', []):
+            name = node.data.get('repository', {}).get('name')
+            if name in changed:
+                node.set_downloaded(manifest.is_downloaded(name))
+        if self.selected_node is not None and self.selected_node in self.node_items:
+            self.node_clicked(self.selected_node)
+
+    def node_repo_path(self, node):
+        """Local clone path of a node's repository, or None"""
+        repo_info = node.data.get('repository', {})
+        if not repo_info or not repo_info.get('name'):
+            return None
+        return os.path.join(self.project_dir(), repo_info['name'])
+
+    def update_check_targets(self):
+        """(path, branch) of every downloaded module, for the update checker"""
+        targets = []
+        for node in getattr(self, 'all_nodes', []):
+            path = self.node_repo_path(node)
+            if node.is_downloaded and path and os.path.isdir(os.path.join(path, '.git')):
+                targets.append((path, node.data['repository'].get('branch')))
+        return targets
+
+    def apply_update_check(self, results):
+        """Put the "update available" marker on nodes whose remote branch moved on"""
+        for node in getattr(self, 'all_nodes', []):
+            result = results.get(self.node_repo_path(node))
+            if result is not None and result[0] is not None:
+                node.set_update_available(result[0])
+
+    def apply_hierarchy_update(self, changes):
+        """
+        Patch the graph after a background revalidation changed self.modules_data in place
+
+        Only the nodes whose module changed are refreshed; the graph is laid out
+        again only when modules were added, removed or reordered.
+        """
+        if not getattr(self, 'all_nodes', None):
+            return  # Not populated yet; the next populate_modules picks up the new data
+
+        if changes['structure_changed']:
+            self.populate_modules(self.modules_data, self.project_name)
+        else:
+            updated = {id(module) for module in changes['updated']}
+
+            def patch(modules, nodes):
+                for (name, module), node in zip(modules.items(), nodes):
+                    rebound = node.data is not module
+                    node.data = module
+                    self.node_items[node] = {'name': name, 'data': module}
+                    if rebound or id(module) in updated:
+                        self.refresh_node(node)
+                    patch(module.get('submodules', {}), node.child_nodes)
+
+            root_nodes = [node for node in self.all_nodes if node.parent_node is None]
+            patch(self.modules_data, root_nodes)
+
+        self.hierarchy_updated_label.show()
+        QTimer.singleShot(5000, self.hierarchy_updated_label.hide)
+
+    def refresh_node(self, node):
+        """Re-read a node's module data and redraw its indicators and details"""
+        self.load_module_data_from_file(node.data)
+        node.completed = node.data.get('completed', False)
+        node.completion_status = node.data.get('completion_status', node.completion_status)
+        node.update_node_color()
+        if node is self.selected_node:
+            self.node_clicked(node)
 
     # Initialize nodes recursively
     def initialize_nodes(self):
@@ -743,41 +896,10 @@ class SystemView(QWidget):
         else:
             node.completion_status = 'not_started'
         
-        # Check if repository is actually downloaded on disk
-        if data and 'repository' in data:
-            repo_info = data.get('repository', {})
-            if repo_info and repo_info.get('name'):
-                repo_dir = os.path.join("Downloaded Repositories", self.parent.repo_folder)
-                repo_path = os.path.join(repo_dir, repo_info.get('name'))
-                
-                # Check if directory exists and has content (not just metadata)
-                if os.path.exists(repo_path) and os.path.isdir(repo_path):
-                    # Check if it has actual repo content (not just in .metadata folder)
-                    has_content = False
-                    try:
-                        # Look for common repo files/folders besides just ModuleInfo.txt
-                        contents = os.listdir(repo_path)
-                        # Filter out just metadata files
-                        real_contents = [f for f in contents if f.lower() not in ['moduleinfo.txt', 'moduleinfor.txt']]
-                        if real_contents:
-                            has_content = True
-                    except:
-                        pass
-                    
-                    if has_content:
-                        node.is_downloaded = True
-                        if hasattr(node, 'download_indicator'):
-                            node.download_indicator.setPlainText("✓")
-                            node.download_indicator.setDefaultTextColor(QColor("#32CD32"))  # Green
-                        print(f"Node {name}: Repository found on disk - marked as downloaded")
-                    else:
-                        node.is_downloaded = False
-                        print(f"Node {name}: Repository folder exists but is empty")
-                else:
-                    node.is_downloaded = False
-                    print(f"Node {name}: Repository not found on disk")
-            else:
-                node.is_downloaded = False
+        # Downloaded state comes from the project's manifest; a background reconcile keeps it honest
+        repo_info = data.get('repository', {}) if data else {}
+        if repo_info and repo_info.get('name'):
+            node.set_downloaded(self.manifest().is_downloaded(repo_info['name']))
         else:
             node.is_downloaded = False
         
@@ -823,43 +945,25 @@ class SystemView(QWidget):
         if not module_info_path:
             return
             
-        try:
-            with open(module_info_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Parse for assigned_to
-            assigned_match = re.search(r'\[Team/Assigned\]\s*(.+)', content, re.IGNORECASE)
-            if assigned_match:
-                assigned_value = assigned_match.group(1).strip()
-                module_data['assigned_to'] = assigned_value if assigned_value else 'None'
-            else:
-                module_data['assigned_to'] = 'None'
-            
-            # Parse for completed status
-            completed_match = re.search(r'\[Completed\]\s*(.+)', content, re.IGNORECASE)
-            if completed_match:
-                completed_value = completed_match.group(1).strip().lower()
-                if completed_value in ['yes', 'true', '1']:
-                    module_data['completed'] = True
-                    module_data['completion_status'] = 'completed'
-                elif completed_value == 'in progress':
-                    module_data['completed'] = False
-                    module_data['completion_status'] = 'in_progress'
-                else:
-                    module_data['completed'] = False
-                    module_data['completion_status'] = 'not_started'
-            else:
-                module_data['completed'] = False
-                module_data['completion_status'] = 'not_started'
-                
-        except Exception as e:
-            print(f"Error loading module data from {module_info_path}: {str(e)}")
+        # Unchanged files come straight from the parse cache
+        info = read_module_info(module_info_path)
+        if info is None:
+            print(f"Error loading module data from {module_info_path}")
             module_data['assigned_to'] = 'None'
             module_data['completed'] = False
             module_data['completion_status'] = 'not_started'
+            return
+
+        module_data['assigned_to'] = info.assigned if info.assigned else 'None'
+        module_data['completion_status'] = info.completion_status
+
+        # Edits still waiting in the write-behind queue win over the file
+        pending = get_status_writer().pending_edits(module_info_path)
+        module_data.update(pending)
+        module_data['completed'] = module_data['completion_status'] == 'completed'
 
     def save_module_data_to_file(self, module_data):
-        """Save assigned_to and completed status to ModuleInfo.txt"""
+        """Queue assigned_to and completed status for ModuleInfo.txt (see status_writer)"""
         if not module_data or not isinstance(module_data, dict):
             return False
 
@@ -880,43 +984,13 @@ class SystemView(QWidget):
         if not module_info_path:
             return False
             
-        try:
-            # Read current content
-            with open(module_info_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            assigned_to = module_data.get('assigned_to', 'None')
-            
-            # Determine completion status text
-            completion_status = module_data.get('completion_status', 'not_started')
-            if completion_status == 'completed':
-                completed_text = 'Yes'
-            elif completion_status == 'in_progress':
-                completed_text = 'In progress'
-            else:
-                completed_text = 'No'
-            
-            # Update or add [Team/Assigned] line
-            if re.search(r'\[Team/Assigned\]', content, re.IGNORECASE):
-                content = re.sub(r'\[Team/Assigned\].*', f"[Team/Assigned] {assigned_to}", content, flags=re.IGNORECASE)
-            else:
-                content += f"\n[Team/Assigned] {assigned_to}"
-            
-            # Update or add [Completed] line
-            if re.search(r'\[Completed\]', content, re.IGNORECASE):
-                content = re.sub(r'\[Completed\].*', f"[Completed] {completed_text}", content, flags=re.IGNORECASE)
-            else:
-                content += f"\n[Completed] {completed_text}"
-            
-            # Write back to file
-            with open(module_info_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-                
-            return True
-            
-        except Exception as e:
-            print(f"Error saving module data to {module_info_path}: {str(e)}")
-            return False
+        # Queued and coalesced with other edits to this file; written after a short quiet period
+        get_status_writer().queue(
+            module_info_path,
+            assigned_to=module_data.get('assigned_to', 'None'),
+            completion_status=module_data.get('completion_status', 'not_started'),
+        )
+        return True
 
     def update_parent_module_info(self, parent_name, new_module_address):
         """Update the parent module's moduleInfo.txt with the new module address"""
@@ -1285,7 +1359,7 @@ class SystemView(QWidget):
             self.selected_node.data['assigned_to'] = new_text
             # Save to ModuleInfo.txt
             if self.save_module_data_to_file(self.selected_node.data):
-                print(f"Saved assigned_to: {new_text} to ModuleInfo.txt")
+                print(f"Queued assigned_to: {new_text} for ModuleInfo.txt")
             else:
                 print("Failed to save assigned_to to ModuleInfo.txt")
 
@@ -1311,7 +1385,7 @@ class SystemView(QWidget):
             
             # Save to ModuleInfo.txt
             if self.save_module_data_to_file(self.selected_node.data):
-                print(f"Saved completed: {self.selected_node.completion_status} to ModuleInfo.txt")
+                print(f"Queued completed: {self.selected_node.completion_status} for ModuleInfo.txt")
             else:
                 print("Failed to save completed status to ModuleInfo.txt")
             
@@ -2422,17 +2496,36 @@ class SystemView(QWidget):
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Could not run test: {str(e)}")
 
-    def download_single_module(self, node):
+    def set_download_details(self, details):
+        """Show per-repository download progress under the download button; empty hides it"""
+        self.download_details_label.setText(details)
+        self.download_details_label.setVisible(bool(details))
+
+    def project_dir(self):
+        """Folder of the open project under Downloaded Repositories"""
+        return os.path.join("Downloaded Repositories", self.parent.repo_folder)
+
+    def download_single_module(self, node, profile=None):
         """Download a single module - delegates to download manager"""
-        self.download_manager.download_single_module(node)
+        if profile is None:
+            profile = load_project_profile(self.project_dir())
+        self.download_manager.download_single_module(node, profile)
     
-    def download_node_tree(self, node):
+    def download_node_tree(self, node, profile=None):
         """Download module tree - delegates to download manager"""
-        self.download_manager.download_node_tree(node)
+        if profile is None:
+            profile = load_project_profile(self.project_dir())
+        self.download_manager.download_node_tree(node, profile)
     
     def closeEvent(self, event):
         """Handle widget close event - cleanup download threads"""
         self.download_manager.shutdown()
+        self.update_checker.stop()
+        if self.reconcile_thread:
+            self.reconcile_thread.wait()
+
+        # Don't leave status edits waiting on the debounce timer
+        get_status_writer().flush(wait=True, timeout=10)
         
         # Also cleanup temp CSV files
         self.cleanup_temp_files()
@@ -2511,6 +2604,21 @@ class SystemView(QWidget):
         radio_group.addButton(single_radio, 0)
         layout.addWidget(single_radio)
         
+        layout.addSpacing(20)
+
+        # Download profile, defaulting to the project's
+        profile_layout = QFormLayout()
+        profile_combo = QComboBox()
+        for profile, label in PROFILES.items():
+            profile_combo.addItem(label, profile)
+        project_profile = load_project_profile(self.project_dir())
+        profile_combo.setCurrentIndex(list(PROFILES).index(project_profile))
+        profile_layout.addRow("Download:", profile_combo)
+        layout.addLayout(profile_layout)
+
+        remember_checkbox = QCheckBox("Use this for every download in this project")
+        layout.addWidget(remember_checkbox)
+
         layout.addSpacing(20)
         
         # Buttons
@@ -2531,13 +2639,16 @@ class SystemView(QWidget):
         dialog.setLayout(layout)
         
         if dialog.exec_() == QDialog.Accepted:
+            profile = profile_combo.currentData()
+            if remember_checkbox.isChecked() and profile != project_profile:
+                save_project_profile(self.project_dir(), profile)
             choice = radio_group.checkedId()
             if choice == 1:
                 # Download with children
-                self.download_node_tree(self.selected_node)
+                self.download_node_tree(self.selected_node, profile)
             else:
                 # Download single module
-                self.download_single_module(self.selected_node)
+                self.download_single_module(self.selected_node, profile)
 
 
 
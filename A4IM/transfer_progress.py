@@ -0,0 +1,144 @@
+"""
+Transfer Progress Module
+Structured, throttled progress for pygit2 clones and fetches.
+
+TransferMonitor is the RemoteCallbacks passed to a clone. libgit2 calls
+transfer_progress for every few KB received; the monitor keeps a snapshot
+(objects received/indexed, bytes, smoothed rate, ETA) and hands it to
+on_progress at most every min_interval seconds, which is as often as a
+widget needs repainting. The snapshot's age tells a slow host (bytes still
+trickling in) from a hung clone (no callback for a long time).
+
+Cancelling a monitor makes its next callback raise CloneCancelled, which
+libgit2 treats as an error and aborts the transfer. Callbacks arrive several
+times a second while data flows, so a clone stops well within a second.
+"""
+
+import time
+import threading
+
+import pygit2
+
+STALLED_AFTER = 10.0  # Seconds without any transfer callback before a clone counts as stalled
+
+
+class CloneCancelled(Exception):
+    """Raised from a transfer callback to abort a cancelled clone"""
+    pass
+
+
+def format_bytes(count):
+    """Human-readable byte count"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if count < 1024 or unit == 'GB':
+            return f"{count:.0f} {unit}" if unit == 'B' else f"{count:.1f} {unit}"
+        count /= 1024.0
+
+
+def format_eta(seconds):
+    return f"{int(seconds // 60)}:{int(seconds % 60):02d}"
+
+
+class TransferMonitor(pygit2.RemoteCallbacks):
+    """RemoteCallbacks that keeps a progress snapshot and reports it throttled"""
+
+    def __init__(self, name=None, on_progress=None, min_interval=0.25, cancel_event=None):
+        """
+        Args:
+            name: Repository name carried in every snapshot
+            on_progress: Optional callable(snapshot dict); runs on the cloning thread
+            min_interval: Minimum seconds between on_progress calls
+            cancel_event: Optional threading.Event shared by several monitors; setting it cancels them all
+        """
+        super().__init__()
+        self.name = name
+        self.on_progress = on_progress
+        self.min_interval = min_interval
+        self.cancel_event = cancel_event if cancel_event is not None else threading.Event()
+        self.started_at = time.monotonic()
+        self.updated_at = self.started_at
+        self._reported_at = 0.0
+        self._rate = 0.0
+        self._last_bytes = 0
+        self.snapshot = self._snapshot(0, 0, 0, 0)
+
+    def _snapshot(self, received_objects, indexed_objects, total_objects, received_bytes):
+        elapsed = time.monotonic() - self.started_at
+        eta = None
+        if total_objects and received_objects and received_objects < total_objects:
+            eta = elapsed * (total_objects - received_objects) / received_objects
+        return {
+            'name': self.name,
+            'received_objects': received_objects,
+            'indexed_objects': indexed_objects,
+            'total_objects': total_objects,
+            'received_bytes': received_bytes,
+            'fraction': (indexed_objects + received_objects) / (2.0 * total_objects) if total_objects else 0.0,
+            'rate': self._rate,
+            'eta': eta,
+            'elapsed': elapsed,
+        }
+
+    def cancel(self):
+        """Abort the clone at its next callback"""
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        """Raise CloneCancelled if the clone has been cancelled"""
+        if self.cancel_event.is_set():
+            raise CloneCancelled(f"Download of {self.name} cancelled" if self.name else "Download cancelled")
+
+    def sideband_progress(self, string):
+        # Server messages ("Counting objects...") arrive before any data does
+        self.check_cancelled()
+
+    def transfer_progress(self, stats):
+        self.check_cancelled()
+        now = time.monotonic()
+        interval = now - self.updated_at
+        if interval > 0 and stats.received_bytes >= self._last_bytes:
+            # Exponentially smoothed bytes/s so the display doesn't flicker
+            instant = (stats.received_bytes - self._last_bytes) / interval
+            self._rate = instant if self._rate == 0 else 0.7 * self._rate + 0.3 * instant
+        self._last_bytes = stats.received_bytes
+        self.updated_at = now
+        self.snapshot = self._snapshot(stats.received_objects, stats.indexed_objects,
+                                       stats.total_objects, stats.received_bytes)
+
+        finished = stats.total_objects and stats.indexed_objects == stats.total_objects
+        if self.on_progress and (finished or now - self._reported_at >= self.min_interval):
+            self._reported_at = now
+            self.on_progress(dict(self.snapshot))
+
+    @property
+    def idle(self):
+        """Seconds since libgit2 last reported progress"""
+        return time.monotonic() - self.updated_at
+
+    def current(self):
+        """The latest snapshot, with rate and idle time brought up to date"""
+        snapshot = dict(self.snapshot)
+        snapshot['idle'] = self.idle
+        if snapshot['idle'] > 2 * self.min_interval:
+            snapshot['rate'] = 0.0  # Nothing arrived recently
+        return snapshot
+
+
+def format_transfer(snapshot):
+    """One line for a single repository, e.g. 'module-1: 45% · 1.2 MB · 300.0 KB/s · ETA 0:12'"""
+    parts = []
+    if snapshot.get('total_objects'):
+        parts.append(f"{int(snapshot['fraction'] * 100)}%")
+    parts.append(format_bytes(snapshot.get('received_bytes', 0)))
+    if snapshot.get('idle', 0) >= STALLED_AFTER:
+        parts.append(f"no data for {int(snapshot['idle'])}s")
+    elif snapshot.get('rate'):
+        parts.append(f"{format_bytes(snapshot['rate'])}/s")
+    if snapshot.get('eta') is not None:
+        parts.append(f"ETA {format_eta(snapshot['eta'])}")
+    text = " · ".join(parts)
+    return f"{snapshot['name']}: {text}" if snapshot.get('name') else text
@@ -0,0 +1,183 @@
+"""
+Update Checker Module
+Finds downloaded module repositories that are behind their remote, without fetching.
+
+The remote branch head is resolved with a ref advertisement request (the
+HTTP equivalent of `git ls-remote`, see remote_heads) and compared with the
+local HEAD. Resolved heads are cached for a TTL, so repopulating SystemView
+doesn't ask the hosts again. Only repositories whose remote head actually
+moved need a fetch; repo_updater uses the same check to skip the others.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pygit2
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal
+
+from remote_heads import resolve_remote_head
+
+DEFAULT_TTL = 300  # Seconds a resolved remote head is trusted
+DEFAULT_INTERVAL = 15 * 60  # Seconds between background checks
+
+
+class RemoteHeadCache:
+    """Thread-safe (address, branch) -> remote SHA cache with a TTL"""
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, address, branch):
+        """The cached SHA, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get((address, branch))
+        if entry and time.monotonic() - entry[1] < self.ttl:
+            return entry[0]
+        return None
+
+    def put(self, address, branch, sha):
+        with self._lock:
+            self._entries[(address, branch)] = (sha, time.monotonic())
+
+    def resolve(self, address, branch, timeout=None, fresh=False):
+        """
+        Cached or freshly resolved remote SHA; None if the remote can't be reached
+
+        Args:
+            fresh: Ignore the cached SHA (the new one is still cached)
+        """
+        sha = None if fresh else self.get(address, branch)
+        if sha is None:
+            sha = resolve_remote_head(address, branch, timeout=timeout)
+            if sha:
+                self.put(address, branch, sha)
+        return sha
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_default_cache = None
+
+
+def get_remote_head_cache():
+    """Return the shared RemoteHeadCache"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = RemoteHeadCache()
+    return _default_cache
+
+
+def check_repository(path, branch=None, cache=None, timeout=None, fresh=False):
+    """
+    Compare a working copy's HEAD with its remote branch head
+
+    Args:
+        path: Working copy with an origin remote
+        branch: Configured branch; None means the checked out branch
+        cache: RemoteHeadCache (the shared one by default)
+        fresh: Resolve the remote head even if it is cached
+
+    Returns:
+        (update_available, local_sha, remote_sha); update_available is None
+        when the remote head couldn't be resolved
+    """
+    cache = cache or get_remote_head_cache()
+    repo = pygit2.Repository(path)
+    if repo.head_is_unborn or repo.head_is_detached:
+        return None, None, None
+    local = repo.head.target
+    branch = branch or repo.head.shorthand
+    try:
+        address = repo.remotes['origin'].url
+    except KeyError:
+        return None, str(local), None
+
+    remote_sha = cache.resolve(address, branch, timeout=timeout, fresh=fresh)
+    if not remote_sha:
+        return None, str(local), None
+    if remote_sha == str(local):
+        return False, str(local), remote_sha
+    # A remote head we already have and that HEAD descends from means only local commits are ahead
+    remote = pygit2.Oid(hex=remote_sha)
+    behind = remote not in repo or not repo.descendant_of(local, remote)
+    return behind, str(local), remote_sha
+
+
+class UpdateCheckThread(QThread):
+    """
+    Background thread that runs check_repository over many working copies
+
+    finished carries {path: (update_available, local_sha, remote_sha)}.
+    """
+    finished = pyqtSignal(object)
+
+    def __init__(self, targets, max_workers=8, cache=None):
+        """
+        Args:
+            targets: Iterable of (path, branch) pairs
+            max_workers: Remote heads resolved at once
+        """
+        super().__init__()
+        self.targets = list(dict.fromkeys(targets))
+        self.max_workers = max_workers
+        self.cache = cache
+
+    def _check(self, target):
+        path, branch = target
+        try:
+            return check_repository(path, branch, cache=self.cache, timeout=15)
+        except Exception as e:
+            print(f"Update check of {path} failed: {e}")
+            return None, None, None
+
+    def run(self):
+        results = {}
+        if self.targets:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for target, result in zip(self.targets, executor.map(self._check, self.targets)):
+                    results[target[0]] = result
+        self.finished.emit(results)
+
+
+class UpdateChecker(QObject):
+    """Runs an UpdateCheckThread now and then every interval seconds"""
+    checked = pyqtSignal(object)  # UpdateCheckThread results
+
+    def __init__(self, targets_func, interval=DEFAULT_INTERVAL, parent=None):
+        """
+        Args:
+            targets_func: Called on the GUI thread for the (path, branch) pairs to check
+            interval: Seconds between checks
+        """
+        super().__init__(parent)
+        self.targets_func = targets_func
+        self.check_thread = None
+        self._timer = QTimer(self)
+        self._timer.setInterval(int(interval * 1000))
+        self._timer.timeout.connect(self.check_now)
+
+    def start(self):
+        """Check now and keep checking every interval"""
+        self._timer.start()
+        self.check_now()
+
+    def stop(self):
+        self._timer.stop()
+        if self.check_thread:
+            self.check_thread.wait()
+
+    def check_now(self):
+        """Start a check unless one is still running"""
+        if self.check_thread and self.check_thread.isRunning():
+            return
+        targets = self.targets_func()
+        if not targets:
+            return
+        self.check_thread = UpdateCheckThread(targets)
+        self.check_thread.finished.connect(self.checked.emit)
+        self.check_thread.start()
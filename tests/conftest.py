@@ -0,0 +1,62 @@
+"""
+Shared fixtures: the app's flat modules on sys.path, a scratch working
+directory and a MockGitHost serving a small hierarchy
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'A4IM'))
+
+from mock_git_host import MockGitHost  # noqa: E402
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in a scratch directory, so "Downloaded Repositories" and its caches land there"""
+    import object_store
+
+    monkeypatch.chdir(tmp_path)
+    # The shared store keeps a relative root; a fresh one puts its mirrors in this directory
+    monkeypatch.setattr(object_store, '_default_store', None)
+    return tmp_path
+
+
+@pytest.fixture
+def mock_host(tmp_path):
+    """Architect repository with two submodules of two submodules each"""
+    with MockGitHost(breadth=2, depth=2, root_dir=str(tmp_path / "mock_host")) as host:
+        yield host
+
+
+@pytest.fixture
+def project_dir(workdir):
+    path = workdir / "Downloaded Repositories" / "proj"
+    path.mkdir(parents=True)
+    return str(path)
+
+
+@pytest.fixture
+def crawl(mock_host, workdir):
+    """
+    Crawl the mock host's hierarchy on the calling thread
+
+    Returns a function(known_modules=None) -> (modules, crawler).
+    """
+    from hierarchy_crawler import HierarchyCrawler
+    from module_fetcher import ModuleInfoFetcher, ProbeTable
+
+    fetcher = ModuleInfoFetcher(ProbeTable(str(workdir / "probe_table.json")))
+
+    def run(known_modules=None):
+        crawler = HierarchyCrawler(mock_host.root_address,
+                                   lambda address, branch=None: fetcher.fetch(address, branch),
+                                   str(workdir / ".metadata"), known_modules=known_modules)
+        result = []
+        crawler.finished.connect(result.append)
+        crawler.run()
+        return result[0], crawler
+
+    return run
@@ -0,0 +1,90 @@
+"""Download manifest: seeding, recording, persistence and reconcile against the disk"""
+
+import os
+import shutil
+
+import pygit2
+
+from download_manifest import DownloadManifest, get_manifest, record_download, manifest_path
+
+
+def clone(mock_host, project_dir, name):
+    path = os.path.join(project_dir, name)
+    pygit2.clone_repository(mock_host.file_url_for(name), path)
+    return path
+
+
+def head_of(path):
+    return str(pygit2.Repository(path).head.target)
+
+
+def test_missing_manifest_is_seeded_from_folder_listing(mock_host, project_dir):
+    clone(mock_host, project_dir, 'module-1')
+    os.makedirs(os.path.join(project_dir, 'module-2', 'lib'))  # Placeholder without a clone
+    os.makedirs(os.path.join(project_dir, 'only-info'))
+    with open(os.path.join(project_dir, 'only-info', 'ModuleInfo.txt'), 'w') as f:
+        f.write("[Module Name] Only info\n")
+
+    manifest = get_manifest(project_dir)
+
+    # Names only: nothing opened with pygit2 and nothing written yet
+    assert manifest.names() == {'module-1', 'module-2'}
+    assert manifest.get('module-1')['sha'] is None
+    assert not manifest.exists
+    assert not os.path.exists(manifest_path(project_dir))
+
+
+def test_reconcile_fills_in_seeded_entries(mock_host, project_dir):
+    path = clone(mock_host, project_dir, 'module-1')
+    manifest = get_manifest(project_dir)
+
+    changed = manifest.reconcile()
+
+    assert changed == set()  # Already shown as downloaded by the seed
+    entry = manifest.get('module-1')
+    assert entry['sha'] == head_of(path)
+    assert entry['branch'] == 'main'
+    assert entry['size'] > 0
+    assert os.path.exists(manifest_path(project_dir))
+
+
+def test_recorded_download_persists(mock_host, project_dir):
+    path = clone(mock_host, project_dir, 'module-1')
+
+    record_download(path, profile='shallow')
+
+    reloaded = DownloadManifest(project_dir)
+    assert reloaded.exists
+    assert reloaded.is_downloaded('module-1')
+    assert reloaded.get('module-1')['sha'] == head_of(path)
+    assert reloaded.get('module-1')['profile'] == 'shallow'
+
+
+def test_reconcile_picks_up_changes_made_outside_the_app(mock_host, project_dir):
+    kept = clone(mock_host, project_dir, 'module-1')
+    deleted = clone(mock_host, project_dir, 'module-2')
+    manifest = get_manifest(project_dir)
+    manifest.reconcile()
+
+    shutil.rmtree(deleted)
+    copied_in = clone(mock_host, project_dir, 'module-1-1')
+    repo = pygit2.Repository(kept)
+    signature = pygit2.Signature('Someone', 'someone@example.com')
+    repo.create_commit('HEAD', signature, signature, "Local commit", repo.head.peel().tree.id,
+                       [repo.head.target])
+
+    changed = manifest.reconcile()
+
+    assert changed == {'module-1', 'module-2', 'module-1-1'}
+    assert not manifest.is_downloaded('module-2')
+    assert manifest.get('module-1-1')['sha'] == head_of(copied_in)
+    assert manifest.get('module-1')['sha'] == head_of(kept)
+    assert DownloadManifest(project_dir).names() == {'module-1', 'module-1-1'}
+
+
+def test_unchanged_reconcile_reports_nothing(mock_host, project_dir):
+    clone(mock_host, project_dir, 'module-1')
+    manifest = get_manifest(project_dir)
+    manifest.reconcile()
+
+    assert manifest.reconcile() == set()
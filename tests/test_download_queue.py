@@ -0,0 +1,119 @@
+"""Download queue: journaling, resume after a restart and the scheduler driving it"""
+
+import os
+
+import pygit2
+
+from clone_scheduler import CloneTask, CloneScheduler
+from download_manifest import get_manifest, record_download
+from download_queue import DownloadQueue, queue_path
+
+
+def make_tasks(mock_host, project_dir):
+    """module-1 with its two children, parents linked as tasks_from_modules does"""
+    def task(name, parent=None, depth=0):
+        return CloneTask(name, mock_host.address_for(name), os.path.join(project_dir, name),
+                         'main', parent=parent.key if parent else None, depth=depth)
+
+    parent = task('module-1')
+    return [task('module-1-2', parent, 1), parent, task('module-1-1', parent, 1)]
+
+
+def test_jobs_survive_a_restart(mock_host, project_dir):
+    queue = DownloadQueue(project_dir)
+    tasks = make_tasks(mock_host, project_dir)
+    queue.add(tasks, 'shallow')
+    queue.mark_running(tasks[1])
+
+    resumed = DownloadQueue(project_dir).pending_tasks()
+
+    assert [task.name for task in resumed] == ['module-1', 'module-1-2', 'module-1-1']
+    assert all(task.profile == 'shallow' for task in resumed)
+    assert resumed[1].parent == resumed[0].key
+    assert resumed[0].url == mock_host.address_for('module-1')
+
+
+def test_finished_jobs_are_forgotten(mock_host, project_dir):
+    queue = DownloadQueue(project_dir)
+    tasks = make_tasks(mock_host, project_dir)
+    queue.add(tasks, 'full')
+
+    for task in tasks:
+        queue.remove(task)
+
+    assert len(queue) == 0
+    assert not os.path.exists(queue_path(project_dir))
+
+
+def test_pending_tasks_skip_repositories_already_downloaded(mock_host, project_dir):
+    queue = DownloadQueue(project_dir)
+    tasks = make_tasks(mock_host, project_dir)
+    queue.add(tasks, 'full')
+    # Finished just before the app closed, so the journal still lists it
+    os.makedirs(os.path.join(project_dir, 'module-1', 'lib'))
+    record_download(os.path.join(project_dir, 'module-1'))
+
+    resumed = DownloadQueue(project_dir).pending_tasks()
+
+    assert [task.name for task in resumed] == ['module-1-2', 'module-1-1']
+    assert 'module-1' not in [task.name for task in DownloadQueue(project_dir).pending_tasks()]
+
+
+def test_scheduler_resumes_and_empties_the_queue(mock_host, project_dir):
+    DownloadQueue(project_dir).add(make_tasks(mock_host, project_dir), 'full')
+
+    queue = DownloadQueue(project_dir)  # Next launch
+    scheduler = CloneScheduler(queue.pending_tasks(), download_queue=queue)
+    summaries = []
+    scheduler.finished.connect(summaries.append)
+    scheduler.run()
+
+    summary = summaries[0]
+    assert sorted(summary['succeeded']) == ['module-1', 'module-1-1', 'module-1-2']
+    assert summary['failed'] == [] and summary['unfinished'] == []
+    assert not os.path.exists(queue_path(project_dir))
+    manifest = get_manifest(project_dir)
+    for name in summary['succeeded']:
+        assert os.path.isdir(os.path.join(project_dir, name, '.git'))
+        assert manifest.get(name)['sha']
+
+
+def test_cancelled_run_stays_queued(mock_host, project_dir):
+    queue = DownloadQueue(project_dir)
+    scheduler = CloneScheduler(make_tasks(mock_host, project_dir), download_queue=queue)
+    summaries = []
+    scheduler.finished.connect(summaries.append)
+    scheduler.stop()  # Closed before any clone could start
+    scheduler.run()
+
+    assert summaries[0]['cancelled']
+    assert sorted(summaries[0]['unfinished']) == ['module-1', 'module-1-1', 'module-1-2']
+    assert len(DownloadQueue(project_dir).pending_tasks()) == 3
+
+
+def test_folder_with_only_module_info_is_still_cloned(mock_host, project_dir):
+    placeholder = os.path.join(project_dir, 'module-1')
+    os.makedirs(placeholder)
+    with open(os.path.join(placeholder, 'ModuleInfo.txt'), 'w') as f:
+        f.write("[Module Name] Module 1\n")
+    scheduler = CloneScheduler([CloneTask('module-1', mock_host.address_for('module-1'), placeholder, 'main')])
+    summaries = []
+    scheduler.finished.connect(summaries.append)
+    scheduler.run()
+
+    assert summaries[0]['succeeded'] == ['module-1']
+    assert os.path.isdir(os.path.join(placeholder, '.git'))
+    assert os.path.exists(os.path.join(placeholder, 'lib', 'ModuleInfo.txt'))
+    assert get_manifest(project_dir).get('module-1')['sha']
+
+
+def test_skipped_download_is_recorded_in_the_manifest(mock_host, project_dir):
+    existing = os.path.join(project_dir, 'module-1')
+    pygit2.clone_repository(mock_host.file_url_for('module-1'), existing)
+    scheduler = CloneScheduler([CloneTask('module-1', mock_host.address_for('module-1'), existing, 'main')])
+    messages = []
+    scheduler.task_finished.connect(lambda key, ok, message: messages.append(message))
+    scheduler.run()
+
+    assert messages == ["Already downloaded"]
+    assert get_manifest(project_dir).get('module-1')['sha'] == str(pygit2.Repository(existing).head.target)
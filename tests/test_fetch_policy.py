@@ -0,0 +1,135 @@
+"""Fetch policy: per-host connection cap, retries with backoff and the circuit breaker"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import pytest
+import requests
+
+from fetch_policy import FetchPolicy, HostPolicy, CircuitBreaker, HostUnavailableError, CircuitOpenError
+
+
+def track_concurrency(mock_host, monkeypatch):
+    """Wrap the mock host's request handler; returns a dict whose 'peak' is the most requests in flight"""
+    stats = {'active': 0, 'peak': 0}
+    lock = threading.Lock()
+    handle_request = mock_host.handle_request
+
+    def tracked(handler):
+        with lock:
+            stats['active'] += 1
+            stats['peak'] = max(stats['peak'], stats['active'])
+        try:
+            handle_request(handler)
+        finally:
+            with lock:
+                stats['active'] -= 1
+
+    monkeypatch.setattr(mock_host, 'handle_request', tracked)
+    return stats
+
+
+def test_requests_to_one_host_are_capped(mock_host, monkeypatch):
+    stats = track_concurrency(mock_host, monkeypatch)
+    mock_host.latency = 0.05
+    policy = FetchPolicy(default_policy=HostPolicy(max_connections=3))
+    session = requests.Session()
+    url = f"{mock_host.address_for('architect')}/-/raw/main/lib/ModuleInfo.txt"
+
+    with ThreadPoolExecutor(max_workers=12) as executor:
+        responses = list(executor.map(lambda _: policy.request(session, 'GET', url), range(12)))
+
+    assert all(response.status_code == 200 for response in responses)
+    assert stats['peak'] == 3
+
+
+def fail_first(mock_host, monkeypatch, count, status=503, headers=None):
+    """Answer the next count requests with status instead of serving them"""
+    remaining = [count]
+    handle_request = mock_host.handle_request
+
+    def failing(handler):
+        if remaining[0] > 0:
+            remaining[0] -= 1
+            handler.send_body(status, b"Injected failure\n", headers=headers)
+            return
+        handle_request(handler)
+
+    monkeypatch.setattr(mock_host, 'handle_request', failing)
+
+
+def raw_url(mock_host):
+    return f"{mock_host.address_for('architect')}/-/raw/main/lib/ModuleInfo.txt"
+
+
+def test_transient_failures_are_retried(mock_host, monkeypatch):
+    fail_first(mock_host, monkeypatch, 2)
+    policy = FetchPolicy(default_policy=HostPolicy(max_attempts=3, base_delay=0.01))
+
+    response = policy.request(requests.Session(), 'GET', raw_url(mock_host))
+
+    assert response.status_code == 200
+    assert not policy.breaker_for(urlparse(mock_host.base_url).netloc).failures
+
+
+def test_client_errors_are_returned_without_retrying(mock_host):
+    policy = FetchPolicy(default_policy=HostPolicy(max_attempts=3, base_delay=0.01))
+    before = mock_host.request_count
+
+    response = policy.request(requests.Session(), 'GET', f"{mock_host.base_url}/mock/architect/-/raw/main/none")
+
+    assert response.status_code == 404
+    assert mock_host.request_count - before == 1
+
+
+def test_retry_after_is_honoured(mock_host, monkeypatch):
+    fail_first(mock_host, monkeypatch, 1, status=429, headers={'Retry-After': '0.3'})
+    policy = FetchPolicy(default_policy=HostPolicy(max_attempts=2, base_delay=0.01))
+    started = time.monotonic()
+
+    assert policy.request(requests.Session(), 'GET', raw_url(mock_host)).status_code == 200
+    assert time.monotonic() - started >= 0.3
+
+
+def test_breaker_opens_then_lets_one_trial_through(mock_host, monkeypatch):
+    fail_first(mock_host, monkeypatch, 4)
+    policy = FetchPolicy(default_policy=HostPolicy(max_attempts=2, base_delay=0.01),
+                         failure_threshold=4, reset_after=0.3)
+    session = requests.Session()
+    host = urlparse(mock_host.base_url).netloc
+
+    for _ in range(2):
+        with pytest.raises(HostUnavailableError):
+            policy.request(session, 'GET', raw_url(mock_host))
+    assert policy.open_hosts() == [host]
+
+    # Open: fails without touching the network
+    before = mock_host.request_count
+    with pytest.raises(CircuitOpenError):
+        policy.request(session, 'GET', raw_url(mock_host))
+    assert mock_host.request_count == before
+
+    # Half-open after reset_after: one trial, which closes the breaker when it succeeds
+    time.sleep(0.35)
+    assert policy.request(session, 'GET', raw_url(mock_host)).status_code == 200
+    assert policy.open_hosts() == []
+
+
+def test_half_open_breaker_allows_a_single_trial():
+    breaker = CircuitBreaker(failure_threshold=2, reset_after=0.1)
+    assert breaker.record_failure() is False
+    assert breaker.record_failure() is True
+    assert not breaker.allow()
+
+    time.sleep(0.15)
+    assert breaker.allow()
+    assert not breaker.allow()  # The trial is still in flight
+
+    assert breaker.record_failure() is False  # Failed trial: open again, for another reset_after
+    assert not breaker.allow()
+    time.sleep(0.15)
+    assert breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open and breaker.allow()
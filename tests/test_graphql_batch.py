@@ -0,0 +1,131 @@
+"""GraphQL batch fetches against the mock host's /graphql endpoint, and the crawler's fallback"""
+
+import pytest
+
+from graphql_batch import GraphQLBatchFetcher, GraphQLBatchError
+from module_fetcher import ModuleInfoFetcher, ProbeTable
+
+
+def batch_fetcher(mock_host, **kwargs):
+    endpoint = f"{mock_host.base_url}/graphql"
+    options = dict(github_token='token', gitlab_token='token', github_url=endpoint, gitlab_url=endpoint)
+    options.update(kwargs)
+    return GraphQLBatchFetcher(**options)
+
+
+def module_info_text(mock_host, name, filename='ModuleInfo.txt'):
+    return mock_host.modules[name]['files'][f'lib/{filename}'].decode('utf-8')
+
+
+@pytest.mark.parametrize('host', ['github.com', 'gitlab.com'])
+def test_siblings_are_fetched_in_one_query(mock_host, host):
+    fetcher = batch_fetcher(mock_host)
+    names = ['module-1', 'module-2', 'module-1-1', 'module-2-2']
+    items = [(f"https://{host}/mock/{name}", None) for name in names]
+
+    contents = fetcher.fetch_batch(items)
+
+    assert mock_host.graphql_count == 1
+    assert [contents[item] for item in items] == [module_info_text(mock_host, name) for name in names]
+
+
+def test_large_batches_are_split(mock_host):
+    fetcher = batch_fetcher(mock_host, batch_size=2)
+    items = [(f"https://github.com/mock/{name}", None) for name in sorted(mock_host.modules)[:5]]
+
+    contents = fetcher.fetch_batch(items)
+
+    assert mock_host.graphql_count == 3
+    assert all(contents[item] for item in items)
+
+
+@pytest.mark.parametrize('host', ['github.com', 'gitlab.com'])
+def test_missing_blobs_are_none_and_other_spellings_are_learned(mock_host, workdir, host):
+    files = mock_host.modules['module-2']['files']
+    files['lib/moduleInfo.txt'] = files.pop('lib/ModuleInfo.txt')
+    mock_host.update_module('module-2')
+    probe_table = ProbeTable(str(workdir / "probe_table.json"))
+    fetcher = batch_fetcher(mock_host, probe_table=probe_table)
+    missing = (f"https://{host}/mock/no-such-module", None)
+    moved = (f"https://{host}/mock/module-2", None)
+    other_branch = (f"https://{host}/mock/module-1", 'release')
+
+    contents = fetcher.fetch_batch([missing, moved, other_branch])
+
+    assert contents[missing] is None
+    assert contents[moved] == module_info_text(mock_host, 'module-2', 'moduleInfo.txt')
+    assert probe_table.get(ProbeTable.make_key(*moved)) == ('main', 'moduleInfo.txt')
+    # A branch the repository doesn't have falls back to main, as the raw path does
+    assert contents[other_branch] == module_info_text(mock_host, 'module-1')
+
+
+def test_failed_query_raises_batch_error(mock_host):
+    fetcher = batch_fetcher(mock_host, github_url=f"{mock_host.base_url}/no-graphql-here")
+
+    with pytest.raises(GraphQLBatchError):
+        fetcher.fetch_batch([("https://github.com/mock/module-1", None)])
+
+
+def test_addresses_without_a_token_are_not_batched(mock_host):
+    fetcher = GraphQLBatchFetcher()
+
+    assert fetcher.host_for("https://github.com/mock/module-1") is None
+    assert batch_fetcher(mock_host).host_for("https://github.com/mock/module-1") == 'github.com'
+    assert batch_fetcher(mock_host).host_for(mock_host.address_for('module-1')) is None
+
+
+@pytest.fixture
+def github_crawl(mock_host, workdir):
+    """
+    Crawl the mock hierarchy under github.com addresses
+
+    The raw path maps github.com back onto the mock host, and batched queries go
+    to its /graphql endpoint; the mock's own ModuleInfo.txt files list loopback
+    addresses, so only the architect's children are batchable.
+    """
+    from hierarchy_crawler import HierarchyCrawler
+
+    raw_fetcher = ModuleInfoFetcher(ProbeTable(str(workdir / "probe_table.json")))
+    raw_fetches = []
+
+    def fetch_module_info_only(address, branch=None):
+        raw_fetches.append(address)
+        content = raw_fetcher.fetch(address.replace("https://github.com", mock_host.base_url), branch)
+        return content.replace(mock_host.base_url, "https://github.com") if content else content
+
+    def run(batch_fetcher):
+        crawler = HierarchyCrawler("https://github.com/mock/architect", fetch_module_info_only,
+                                   str(workdir / ".metadata"), batch_fetcher=batch_fetcher)
+        result = []
+        crawler.finished.connect(result.append)
+        crawler.run()
+        return result[0], raw_fetches
+
+    return run
+
+
+def count_modules(modules):
+    return sum(1 + count_modules(module['submodules']) for module in modules.values())
+
+
+def test_crawler_batches_siblings(mock_host, github_crawl):
+    modules, raw_fetches = github_crawl(batch_fetcher(mock_host))
+
+    assert count_modules(modules) == len(mock_host.modules)
+    assert mock_host.graphql_count == 1
+    assert "https://github.com/mock/module-1" not in raw_fetches
+
+
+@pytest.mark.parametrize('fetcher_options', [
+    {'github_token': None},
+    {'github_url': '/no-graphql-here'},
+], ids=['no token', 'endpoint error'])
+def test_crawler_falls_back_to_raw_fetches(mock_host, github_crawl, fetcher_options):
+    if fetcher_options.get('github_url'):
+        fetcher_options = dict(fetcher_options, github_url=mock_host.base_url + fetcher_options['github_url'])
+
+    modules, raw_fetches = github_crawl(batch_fetcher(mock_host, **fetcher_options))
+
+    assert count_modules(modules) == len(mock_host.modules)
+    assert "https://github.com/mock/module-1" in raw_fetches
+    assert "https://github.com/mock/module-2" in raw_fetches
@@ -0,0 +1,101 @@
+"""Crawler against the mock host: cold crawl and incremental reuse by branch SHA"""
+
+from hierarchy_crawler import index_modules
+
+
+def test_cold_crawl_records_every_module_and_sha(mock_host, crawl):
+    modules, crawler = crawl()
+
+    known = index_modules(modules, mock_host.root_address)
+    assert len(known) == len(mock_host.modules)
+    assert crawler.fetched_count == len(mock_host.modules)
+    assert crawler.reused_count == 0
+    assert all(module['repository']['commit_sha'] for _, module in known.values())
+
+
+def test_hierarchy_follows_module_address_order(mock_host, crawl):
+    modules, _ = crawl()
+
+    root = modules['Architect']
+    assert root['repository']['address'] == mock_host.root_address
+    assert list(root['submodules']) == ['Module 1', 'Module 2']
+    assert list(root['submodules']['Module 2']['submodules']) == ['Module 2.1', 'Module 2.2']
+    assert root['submodules']['Module 2']['submodules']['Module 2.1']['submodules'] == {}
+
+
+def test_stopped_crawl_finishes_without_modules(mock_host, workdir):
+    from hierarchy_crawler import HierarchyCrawler
+
+    crawler = HierarchyCrawler(mock_host.root_address, lambda address, branch=None: None,
+                               str(workdir / ".metadata"))
+    result = []
+    crawler.finished.connect(result.append)
+    crawler.stop()
+    crawler.run()
+
+    assert result == [None]
+
+
+def test_refresh_only_refetches_changed_modules(mock_host, crawl):
+    modules, _ = crawl()
+    new_sha = mock_host.update_module('module-1', description="changed description")
+
+    refreshed, crawler = crawl(known_modules=index_modules(modules, mock_host.root_address))
+
+    assert crawler.fetched_count == 1
+    assert crawler.reused_count == len(mock_host.modules) - 1
+    changed = refreshed['Architect']['submodules']['Module 1']
+    assert changed['description'] == "changed description"
+    assert changed['repository']['commit_sha'] == new_sha
+    # Children of a changed module are still checked, and reused when unchanged
+    assert list(changed['submodules']) == ['Module 1.1', 'Module 1.2']
+
+
+def test_unchanged_refresh_fetches_nothing(mock_host, crawl):
+    modules, _ = crawl()
+    fetches_before = mock_host.request_count
+
+    refreshed, crawler = crawl(known_modules=index_modules(modules, mock_host.root_address))
+
+    assert crawler.fetched_count == 0
+    assert crawler.reused_count == len(mock_host.modules)
+    # One ref advertisement per module and no raw file requests
+    assert mock_host.request_count - fetches_before == len(mock_host.modules)
+    assert list(index_modules(refreshed, mock_host.root_address)) == \
+        list(index_modules(modules, mock_host.root_address))
+
+
+def test_push_during_fetch_is_refetched_next_refresh(mock_host, crawl, monkeypatch):
+    import time
+    from module_fetcher import ModuleInfoFetcher
+
+    handle_request = mock_host.handle_request
+
+    def slow_ref_advertisement(handler):
+        if '/info/refs' in handler.path:
+            time.sleep(0.3)  # Answered after the fetch and the push below, if sent alongside them
+        handle_request(handler)
+
+    monkeypatch.setattr(mock_host, 'handle_request', slow_ref_advertisement)
+    fetch = ModuleInfoFetcher.fetch
+    pushed = []
+
+    def fetch_then_push(self, repo_url, branch=None, verbose=False):
+        content = fetch(self, repo_url, branch, verbose)
+        if repo_url == mock_host.address_for('module-1') and not pushed:
+            pushed.append(mock_host.update_module('module-1', description="pushed mid-crawl"))
+        return content
+
+    monkeypatch.setattr(ModuleInfoFetcher, 'fetch', fetch_then_push)
+    modules, _ = crawl()
+    first = modules['Architect']['submodules']['Module 1']
+    # The recorded SHA must be the one the fetched content came from, never the later push
+    assert first['description'] != "pushed mid-crawl"
+    assert first['repository']['commit_sha'] != pushed[0]
+
+    refreshed, crawler = crawl(known_modules=index_modules(modules, mock_host.root_address))
+
+    assert crawler.fetched_count == 1
+    second = refreshed['Architect']['submodules']['Module 1']
+    assert second['description'] == "pushed mid-crawl"
+    assert second['repository']['commit_sha'] == pushed[0]
@@ -0,0 +1,127 @@
+"""Binary hierarchy cache: round trip, lazy subtrees, checksum and .bak fallback"""
+
+import os
+from collections import OrderedDict
+
+import pytest
+
+from hierarchy_store import (save_hierarchy, load_hierarchy, backup_path, HierarchyCacheError,
+                             LazyModules)
+
+
+def make_module(name, submodules=None):
+    return {
+        'description': f"{name} description",
+        'submodules': OrderedDict(submodules or []),
+        'submodule_addresses': [],
+        'repository': {'name': name.lower(), 'address': f"https://gitlab.com/a/{name.lower()}",
+                       'branch': 'main', 'docs_path': None, 'commit_sha': '0' * 40},
+        'is_downloaded': False,
+    }
+
+
+def make_hierarchy():
+    """Root with children A and B that both reference the shared module S"""
+    shared = make_module('S')
+    a = make_module('A', [('S', shared), ('A1', make_module('A1'))])
+    b = make_module('B', [('S', shared)])
+    return OrderedDict([('Root', make_module('Root', [('A', a), ('B', b)]))])
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "hierarchy_cache.bin")
+    save_hierarchy(path, make_hierarchy(), {'cached_at': 'then', 'initial_repo_url': 'https://x'})
+
+    modules, meta = load_hierarchy(path)
+    assert meta == {'cached_at': 'then', 'initial_repo_url': 'https://x'}
+    root = modules['Root']
+    assert list(root['submodules']) == ['A', 'B']
+    assert list(root['submodules']['A']['submodules']) == ['S', 'A1']
+    assert root['submodules']['A']['repository']['name'] == 'a'
+    # Shared modules decode to one dict, so edits show up under every parent
+    assert root['submodules']['A']['submodules']['S'] is root['submodules']['B']['submodules']['S']
+
+
+def test_subtrees_decode_on_first_access(tmp_path):
+    path = str(tmp_path / "hierarchy_cache.bin")
+    save_hierarchy(path, make_hierarchy())
+
+    modules, _ = load_hierarchy(path)
+    a_children = modules['Root']['submodules']['A']['submodules']
+    assert isinstance(a_children, LazyModules)
+    assert a_children._entries is not None  # Not decoded yet
+    assert 'A1' in a_children
+    assert a_children._entries is None
+
+
+def test_file_can_be_replaced_while_subtrees_are_undecoded(tmp_path):
+    path = str(tmp_path / "hierarchy_cache.bin")
+    save_hierarchy(path, make_hierarchy())
+    modules, _ = load_hierarchy(path)
+
+    updated = make_hierarchy()
+    updated['Root']['description'] = 'changed'
+    save_hierarchy(path, updated)
+
+    # The reader holds its own copy: the old tree still decodes, the new file loads
+    assert list(modules['Root']['submodules']['A']['submodules']) == ['S', 'A1']
+    assert load_hierarchy(path)[0]['Root']['description'] == 'changed'
+
+
+def test_corrupt_file_fails_checksum(tmp_path):
+    path = str(tmp_path / "hierarchy_cache.bin")
+    save_hierarchy(path, make_hierarchy())
+    with open(path, 'r+b') as f:
+        f.seek(-20, os.SEEK_END)
+        byte = f.read(1)
+        f.seek(-20, os.SEEK_END)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+    with pytest.raises(HierarchyCacheError):
+        load_hierarchy(path)
+
+
+def test_truncated_file_is_rejected(tmp_path):
+    path = str(tmp_path / "hierarchy_cache.bin")
+    save_hierarchy(path, make_hierarchy())
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 8)
+
+    with pytest.raises(HierarchyCacheError):
+        load_hierarchy(path)
+
+
+def test_save_keeps_previous_good_file_as_backup(tmp_path):
+    path = str(tmp_path / "hierarchy_cache.bin")
+    first = make_hierarchy()
+    first['Root']['description'] = 'first'
+    save_hierarchy(path, first)
+    second = make_hierarchy()
+    second['Root']['description'] = 'second'
+    save_hierarchy(path, second)
+
+    assert load_hierarchy(backup_path(path))[0]['Root']['description'] == 'first'
+
+    # A corrupt current file must not overwrite the last good backup
+    with open(path, 'wb') as f:
+        f.write(b'garbage')
+    third = make_hierarchy()
+    third['Root']['description'] = 'third'
+    save_hierarchy(path, third)
+    assert load_hierarchy(backup_path(path))[0]['Root']['description'] == 'first'
+    assert load_hierarchy(path)[0]['Root']['description'] == 'third'
+
+
+def test_round_trip_of_crawled_mock_hierarchy(tmp_path, mock_host, crawl):
+    from hierarchy_crawler import index_modules
+
+    crawled, _ = crawl()
+    path = str(tmp_path / "hierarchy_cache.bin")
+    save_hierarchy(path, crawled)
+    loaded, _ = load_hierarchy(path)
+
+    expected = index_modules(crawled, mock_host.root_address)
+    actual = index_modules(loaded, mock_host.root_address)
+    assert len(actual) == len(mock_host.modules)
+    assert {key: module['repository'] for key, (_, module) in actual.items()} == \
+        {key: module['repository'] for key, (_, module) in expected.items()}
@@ -0,0 +1,79 @@
+"""HTTP cache: conditional revalidation against the mock host and stale copies while it is down"""
+
+import pytest
+
+import fetch_policy
+from fetch_policy import FetchPolicy, HostPolicy, HostUnavailableError
+from http_cache import HttpCache
+
+
+@pytest.fixture
+def cache(workdir, monkeypatch):
+    # One attempt per request, so a stopped host fails fast
+    monkeypatch.setattr(fetch_policy, '_default_policy', FetchPolicy(default_policy=HostPolicy(max_attempts=1)))
+    return HttpCache(cache_dir=str(workdir / "http"))
+
+
+def raw_url(mock_host, name):
+    return f"{mock_host.address_for(name)}/-/raw/main/lib/ModuleInfo.txt"
+
+
+def test_revalidation_answers_from_the_cache(mock_host, cache, monkeypatch):
+    conditional = []
+    handle_request = mock_host.handle_request
+
+    def record_conditional(handler):
+        conditional.append(handler.headers.get('If-None-Match'))
+        handle_request(handler)
+
+    monkeypatch.setattr(mock_host, 'handle_request', record_conditional)
+    url = raw_url(mock_host, 'module-1')
+
+    first = cache.get(url)
+    second = cache.get(url)
+
+    assert first.status_code == 200 and not first.from_cache
+    assert conditional[0] is None
+    # The second request carried the ETag, got a 304 and was answered with the stored body
+    assert conditional[1] is not None
+    assert second.status_code == 200 and second.from_cache and not second.stale
+    assert second.content == first.content
+
+
+def test_changed_file_replaces_the_cached_copy(mock_host, cache):
+    url = raw_url(mock_host, 'module-1')
+    cache.get(url)
+    mock_host.update_module('module-1', description="new description")
+
+    changed = cache.get(url)
+
+    assert not changed.from_cache
+    assert "new description" in changed.text
+    assert "new description" in cache.get(url).text
+
+
+def test_cached_copy_is_served_stale_while_the_host_is_down(mock_host, cache):
+    url = raw_url(mock_host, 'module-1')
+    body = cache.get(url).content
+    mock_host.stop()
+
+    response = cache.get(url)
+
+    assert response.status_code == 200
+    assert response.stale and response.from_cache
+    assert response.content == body
+
+    with pytest.raises(HostUnavailableError):
+        cache.get(raw_url(mock_host, 'module-2'))  # Never cached
+
+
+def test_cache_persists_across_instances(mock_host, cache, workdir):
+    url = raw_url(mock_host, 'module-1')
+    cache.get(url)
+    requests_before = mock_host.request_count
+
+    reopened = HttpCache(cache_dir=str(workdir / "http"))
+    response = reopened.get(url)
+
+    assert response.from_cache  # Revalidated with the ETag stored on disk
+    assert mock_host.request_count == requests_before + 1
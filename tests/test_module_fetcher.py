@@ -0,0 +1,110 @@
+"""ModuleInfo fetcher: learned probe table, race priority and probes outside the host cap"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import pytest
+
+from fetch_policy import get_policy
+from module_fetcher import ModuleInfoFetcher, ProbeTable, raw_url_candidates
+
+
+@pytest.fixture
+def fetcher(workdir):
+    return ModuleInfoFetcher(ProbeTable(str(workdir / "probe_table.json")))
+
+
+def rename_module_info(mock_host, name, new_filename):
+    files = mock_host.modules[name]['files']
+    content = files.pop('lib/ModuleInfo.txt')
+    mock_host.update_module(name, files={f'lib/{new_filename}': content})
+
+
+def test_learned_location_is_fetched_with_one_request(mock_host, fetcher):
+    address = mock_host.address_for('module-1')
+    assert "[Module Name] Module 1" in fetcher.fetch(address)
+    key = ProbeTable.make_key(address)
+    assert fetcher.probe_table.get(key) == ('main', 'ModuleInfo.txt')
+    fetcher._executor.shutdown(wait=True)  # Let the cold race's losing probes finish
+
+    before = mock_host.request_count
+    assert "[Module Name] Module 1" in fetcher.fetch(address)
+    assert mock_host.request_count - before == 1
+
+
+def test_moved_file_is_relearned(mock_host, fetcher):
+    address = mock_host.address_for('module-1')
+    fetcher.fetch(address)
+    rename_module_info(mock_host, 'module-1', 'moduleInfo.txt')
+
+    assert "[Module Name] Module 1" in fetcher.fetch(address)
+    assert fetcher.probe_table.get(ProbeTable.make_key(address)) == ('main', 'moduleInfo.txt')
+    # And persisted for the next launch
+    reloaded = ProbeTable(fetcher.probe_table.path)
+    assert reloaded.get(ProbeTable.make_key(address)) == ('main', 'moduleInfo.txt')
+
+
+def test_race_prefers_priority_over_speed(mock_host, fetcher, monkeypatch):
+    files = mock_host.modules['module-1']['files']
+    mock_host.update_module('module-1', files={'lib/moduleInfo.txt': "[Module Name] Lower case\n"})
+    assert 'lib/ModuleInfo.txt' in files
+    handle_request = mock_host.handle_request
+
+    def slow_primary(handler):
+        if handler.path.endswith('/main/lib/ModuleInfo.txt'):
+            time.sleep(0.3)  # The lower-priority spelling answers first
+        handle_request(handler)
+
+    monkeypatch.setattr(mock_host, 'handle_request', slow_primary)
+
+    content = fetcher.fetch(mock_host.address_for('module-1'))
+
+    assert "[Module Name] Module 1" in content
+    assert fetcher.probe_table.get(ProbeTable.make_key(mock_host.address_for('module-1'))) == \
+        ('main', 'ModuleInfo.txt')
+
+
+def test_speculative_probes_bypass_the_host_cap(mock_host, fetcher):
+    address = mock_host.address_for('module-1')
+    rename_module_info(mock_host, 'module-1', 'moduleInfo.txt')
+    candidates = raw_url_candidates(address)
+    host = urlparse(mock_host.base_url).netloc
+    policy = get_policy()
+    slot = policy.slot_for(host)
+    limit = policy.policy_for(host).max_connections
+    for _ in range(limit):
+        slot.acquire()  # Every connection slot busy with other work
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        before = mock_host.request_count
+        future = executor.submit(fetcher.fetch, address)
+        deadline = time.monotonic() + 5
+        while mock_host.request_count - before < len(candidates) - 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        # Every lower-priority probe reached the host; the primary waits for a slot
+        assert mock_host.request_count - before == len(candidates) - 1
+        assert not future.done()
+    finally:
+        for _ in range(limit):
+            slot.release()
+    assert "[Module Name] Module 1" in future.result(timeout=5)
+    executor.shutdown()
+
+
+def test_losing_probe_is_closed_unread(mock_host, fetcher, monkeypatch):
+    cancelled = threading.Event()
+    handle_request = mock_host.handle_request
+
+    def won_meanwhile(handler):
+        cancelled.set()  # A higher-priority candidate wins while this probe waits for headers
+        handle_request(handler)
+
+    monkeypatch.setattr(mock_host, 'handle_request', won_meanwhile)
+    url = raw_url_candidates(mock_host.address_for('module-1'))[0][2]
+
+    assert fetcher._probe_speculative(url, cancelled) is None
+    assert mock_host.request_count == 1
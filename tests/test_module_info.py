@@ -0,0 +1,95 @@
+"""ModuleInfo parser and its (mtime, size, inode) keyed parse cache"""
+
+import os
+
+from module_info import parse_module_info_text, ModuleInfoCache
+from atomic_storage import atomic_write
+
+SAMPLE = """[Module Name] Frame Assembly
+[Module Info] Welded steel frame
+that carries the motor mount.
+[Module Branch] develop
+[Module Address] https://github.com/https://github.com/acme/frame-left
+[module address] https://gitlab.com/acme/frame-right
+[Team/Assigned] Alice
+[Completed] In progress
+[Tasks]
+[Cut tubes] Completed Yes
+[Weld joints] Completed No
+[Notes]
+[Deployed] 2024-05-01 12:00:00
+"""
+
+
+def test_every_field_is_parsed_in_one_pass():
+    info = parse_module_info_text(SAMPLE)
+
+    assert info.name == "Frame Assembly"
+    assert info.description == "Welded steel frame that carries the motor mount."
+    assert info.branch == "develop"
+    assert info.addresses == ("https://github.com/acme/frame-left", "https://gitlab.com/acme/frame-right")
+    assert info.assigned == "Alice"
+    assert info.completion_status == 'in_progress'
+    assert info.tasks == (("Cut tubes", True), ("Weld joints", False))
+    assert info.deployed == "2024-05-01 12:00:00"
+
+
+def test_missing_tags_have_defaults():
+    info = parse_module_info_text("[Module Name] Bare\n")
+
+    assert info.description == ""
+    assert info.branch is None and info.assigned is None and info.completed is None
+    assert info.addresses == () and info.tasks == ()
+    assert info.completion_status == 'not_started'
+
+
+def test_generated_mock_module_info(mock_host):
+    content = mock_host.modules['module-1']['files']['lib/ModuleInfo.txt'].decode('utf-8')
+
+    info = parse_module_info_text(content)
+
+    assert info.name == "Module 1"
+    assert info.addresses == (mock_host.address_for('module-1-1'), mock_host.address_for('module-1-2'))
+
+
+def test_cache_reparses_only_changed_files(tmp_path):
+    path = str(tmp_path / "ModuleInfo.txt")
+    with open(path, 'w') as f:
+        f.write(SAMPLE)
+    cache = ModuleInfoCache()
+
+    first = cache.read(path)
+    assert cache.read(path) is first
+
+    # Same size and mtime, replaced atomically: the inode still tells them apart
+    stat = os.stat(path)
+    atomic_write(path, SAMPLE.replace("Alice", "Bobby"))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    second = cache.read(path)
+    assert second is not first
+    assert second.assigned == "Bobby"
+
+    with open(path, 'a') as f:
+        f.write("[Completed] Yes\n")  # In-place edit: size changes
+    assert cache.read(path) is not second
+
+    os.remove(path)
+    assert cache.read(path) is None
+
+
+def test_cache_evicts_least_recently_read(tmp_path):
+    paths = []
+    for i in range(3):
+        path = str(tmp_path / f"ModuleInfo{i}.txt")
+        with open(path, 'w') as f:
+            f.write(f"[Module Name] Module {i}\n")
+        paths.append(path)
+    cache = ModuleInfoCache(max_entries=2)
+
+    first = cache.read(paths[0])
+    cache.read(paths[1])
+    cache.read(paths[0])  # Most recently used again
+    cache.read(paths[2])
+
+    assert cache.read(paths[0]) is first
+    assert len(cache._entries) == 2 and os.path.abspath(paths[1]) not in cache._entries
@@ -0,0 +1,160 @@
+"""Shared object store: mirror-backed checkouts, offline re-checkouts and LRU eviction"""
+
+import os
+import json
+import shutil
+
+import pygit2
+import pytest
+
+from object_store import (ObjectStore, get_object_store, clone_repository, EVICT_MIN_AGE,
+                          ENTRY_FILENAME)
+
+
+def head_of(path):
+    return str(pygit2.Repository(path).head.target)
+
+
+def remote_head(mock_host, name):
+    return str(pygit2.Repository(mock_host.modules[name]['path']).references['refs/heads/main'].target)
+
+
+def test_checkout_borrows_objects_from_the_mirror(mock_host, project_dir):
+    address = mock_host.address_for('module-1')
+    path = os.path.join(project_dir, 'module-1')
+
+    clone_repository(address, path)
+
+    store = get_object_store()
+    assert store.has_mirror(address)
+    assert head_of(path) == remote_head(mock_host, 'module-1')
+    with open(os.path.join(path, '.git', 'objects', 'info', 'alternates')) as f:
+        alternate = f.read().strip()
+    assert not os.path.isabs(alternate)
+    assert os.path.samefile(os.path.join(path, '.git', 'objects', alternate),
+                            os.path.join(store.mirror_path(address), 'objects'))
+    repo = pygit2.Repository(path)
+    assert repo.remotes['origin'].url == address
+    assert repo.branches.local['main'].upstream.branch_name == 'origin/main'
+    assert not repo.status()
+
+
+def test_another_project_checks_out_without_the_network(mock_host, workdir, project_dir):
+    address = mock_host.address_for('module-1')
+    clone_repository(address, os.path.join(project_dir, 'module-1'))
+    requests_before = mock_host.request_count
+
+    other = os.path.join(str(workdir), "Downloaded Repositories", "other", "module-1")
+    clone_repository(address, other)
+
+    assert mock_host.request_count == requests_before
+    assert head_of(other) == remote_head(mock_host, 'module-1')
+
+
+def test_stale_mirror_still_checks_out_when_the_host_is_down(mock_host, workdir, project_dir):
+    address = mock_host.address_for('module-1')
+    clone_repository(address, os.path.join(project_dir, 'module-1'))
+    get_object_store().fetch_ttl = 0  # Every checkout tries to update the mirror first
+    mock_host.stop()
+
+    other = os.path.join(str(workdir), "Downloaded Repositories", "other", "module-1")
+    clone_repository(address, other)
+
+    assert os.path.exists(os.path.join(other, 'lib', 'ModuleInfo.txt'))
+
+
+def test_checkouts_survive_moving_the_downloads_folder(mock_host, workdir, project_dir):
+    clone_repository(mock_host.address_for('module-1'), os.path.join(project_dir, 'module-1'))
+    sha = head_of(os.path.join(project_dir, 'module-1'))
+
+    shutil.move(str(workdir / "Downloaded Repositories"), str(workdir / "Moved"))
+
+    repo = pygit2.Repository(str(workdir / "Moved" / "proj" / "module-1"))
+    assert str(repo.head.target) == sha
+    assert repo.head.peel(pygit2.Commit).tree['lib']['ModuleInfo.txt'].data
+
+
+def test_prune_evicts_least_recently_used_unreferenced_mirrors(mock_host, workdir, project_dir):
+    store = ObjectStore(root=str(workdir / "store"), quota_bytes=0,
+                        downloads_root=str(workdir / "Downloaded Repositories"))
+    names = ['module-1', 'module-2', 'module-1-1']
+    for name in names:
+        store.ensure_mirror(mock_host.address_for(name))
+    store.checkout(mock_host.address_for('module-1'), os.path.join(project_dir, 'module-1'))
+    # Age the entries so none is protected as recently used: module-1 is the oldest, then module-2
+    sizes = {}
+    for age, name in zip([3, 2, 1], names):
+        entry_path = os.path.join(store.entry_dir(mock_host.address_for(name)), ENTRY_FILENAME)
+        with open(entry_path) as f:
+            entry = json.load(f)
+        entry['last_used'] -= EVICT_MIN_AGE * age
+        sizes[name] = entry['size']
+        with open(entry_path, 'w') as f:
+            json.dump(entry, f)
+
+    freed = store.prune(quota_bytes=sum(sizes.values()) - sizes['module-2'])
+
+    assert freed == sizes['module-2']
+    assert store.has_mirror(mock_host.address_for('module-1'))  # Borrowed from by a checkout
+    assert not store.has_mirror(mock_host.address_for('module-2'))
+    assert store.has_mirror(mock_host.address_for('module-1-1'))  # Used more recently
+    assert head_of(os.path.join(project_dir, 'module-1')) == remote_head(mock_host, 'module-1')
+
+
+@pytest.mark.parametrize('profile', ['docs-only', 'shallow', 'full'])
+def test_every_profile_downloads_again_without_the_network(mock_host, workdir, project_dir, profile):
+    from download_profiles import clone_with_profile
+
+    address = mock_host.address_for('module-1')
+    mock_host.update_module('module-1', files={'cad/frame.stl': b'solid frame\n'})
+    clone_with_profile(address, os.path.join(project_dir, 'module-1'), profile=profile)
+    mock_host.stop()
+
+    again = os.path.join(str(workdir), "Downloaded Repositories", "other", "module-1")
+    clone_with_profile(address, again, profile=profile)
+
+    repo = pygit2.Repository(again)
+    assert repo.remotes['origin'].url == address
+    assert os.path.exists(os.path.join(again, '.git', 'objects', 'info', 'alternates'))
+    assert os.path.exists(os.path.join(again, 'lib', 'ModuleInfo.txt'))
+    # docs-only keeps its sparse checkout; the mirror still holds every blob
+    assert os.path.exists(os.path.join(again, 'cad', 'frame.stl')) == (profile != 'docs-only')
+    assert repo.head.peel(pygit2.Commit).tree['cad']['frame.stl'].data == b'solid frame\n'
+
+
+def test_locked_mirror_falls_back_to_a_direct_clone(mock_host, project_dir, monkeypatch):
+    from atomic_storage import LockTimeout
+
+    def locked(self, url, callbacks=None, force_fetch=False):
+        raise LockTimeout("Mirror held by another clone")
+
+    monkeypatch.setattr(ObjectStore, 'ensure_mirror', locked)
+    path = os.path.join(project_dir, 'module-1')
+
+    clone_repository(mock_host.address_for('module-1'), path)
+
+    assert head_of(path) == remote_head(mock_host, 'module-1')
+    assert not os.path.exists(os.path.join(path, '.git', 'objects', 'info', 'alternates'))
+
+
+def test_cancel_while_waiting_for_a_mirror_lock(mock_host, project_dir):
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from atomic_storage import ProjectLock
+    from transfer_progress import TransferMonitor, CloneCancelled
+
+    address = mock_host.address_for('module-1')
+    monitor = TransferMonitor('module-1')
+    path = os.path.join(project_dir, 'module-1')
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with ProjectLock(get_object_store().entry_dir(address)):  # Another clone of the same module
+            future = executor.submit(clone_repository, address, path, callbacks=monitor)
+            time.sleep(0.2)
+            cancelled_at = time.monotonic()
+            monitor.cancel()
+            with pytest.raises(CloneCancelled):
+                future.result(timeout=5)
+            # Noticed at the next lock poll, not when the other clone finishes
+            assert time.monotonic() - cancelled_at < 2
+
+    assert not os.path.exists(path)
@@ -0,0 +1,129 @@
+"""Repository updates: fast-forwards, and skipping dirty or diverged working copies"""
+
+import os
+
+import pygit2
+import pytest
+
+from object_store import clone_repository
+from repo_updater import (update_repository, RepoUpdater, UpdateTask, UPDATED, UP_TO_DATE,
+                          SKIPPED)
+
+
+@pytest.fixture
+def checkout(mock_host, project_dir):
+    path = os.path.join(project_dir, 'module-1')
+    clone_repository(mock_host.address_for('module-1'), path)
+    return path
+
+
+def head_of(path):
+    return str(pygit2.Repository(path).head.target)
+
+
+def read(path, *parts):
+    with open(os.path.join(path, *parts), encoding='utf-8') as f:
+        return f.read()
+
+
+def write(path, content, *parts):
+    with open(os.path.join(path, *parts), 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+def test_new_commits_are_fast_forwarded(mock_host, checkout):
+    sha = mock_host.update_module('module-1', files={'docs/assembly.md': b'# Assembly\n'})
+
+    status, message = update_repository(checkout)
+
+    assert status == UPDATED, message
+    assert head_of(checkout) == str(sha)
+    assert read(checkout, 'docs', 'assembly.md') == "# Assembly\n"
+    assert not pygit2.Repository(checkout).status()
+
+
+def test_nothing_new_is_up_to_date(checkout):
+    sha = head_of(checkout)
+
+    assert update_repository(checkout)[0] == UP_TO_DATE
+    assert head_of(checkout) == sha
+
+
+def test_local_edits_the_update_does_not_touch_are_kept(mock_host, checkout):
+    info = read(checkout, 'lib', 'ModuleInfo.txt') + "[Completed] Yes\n"
+    write(checkout, info, 'lib', 'ModuleInfo.txt')
+    sha = mock_host.update_module('module-1', files={'docs/assembly.md': b'# Assembly\n'})
+
+    assert update_repository(checkout)[0] == UPDATED
+    assert head_of(checkout) == str(sha)
+    assert read(checkout, 'lib', 'ModuleInfo.txt') == info
+
+
+def test_conflicting_local_edit_is_skipped(mock_host, checkout):
+    sha = head_of(checkout)
+    write(checkout, "[Module Name] Edited here\n", 'lib', 'ModuleInfo.txt')
+    mock_host.update_module('module-1', description="Edited upstream")
+
+    status, message = update_repository(checkout)
+
+    assert status == SKIPPED
+    assert message.startswith("Local changes would be overwritten")
+    assert head_of(checkout) == sha
+    assert read(checkout, 'lib', 'ModuleInfo.txt') == "[Module Name] Edited here\n"
+
+
+def test_diverged_branch_is_skipped(mock_host, checkout):
+    repo = pygit2.Repository(checkout)
+    write(checkout, "# Local notes\n", 'NOTES.md')
+    repo.index.add('NOTES.md')
+    repo.index.write()
+    signature = pygit2.Signature("Local", "local@example.com")
+    local = repo.create_commit('HEAD', signature, signature, "Local commit", repo.index.write_tree(),
+                               [repo.head.target])
+    mock_host.update_module('module-1', files={'docs/assembly.md': b'# Assembly\n'})
+
+    status, message = update_repository(checkout)
+
+    assert status == SKIPPED
+    assert message.startswith("Diverged")
+    assert head_of(checkout) == str(local)
+
+
+def test_docs_only_download_updates_through_git(mock_host, project_dir):
+    from download_profiles import clone_with_profile, git_executable
+
+    if not git_executable():
+        pytest.skip("git is not installed")
+    path = os.path.join(project_dir, 'module-1')
+    clone_with_profile(mock_host.address_for('module-1'), path, profile='docs-only')
+    sha = mock_host.update_module('module-1', files={'docs/assembly.md': b'# Assembly\n',
+                                                     'cad/frame.stl': b'solid frame\n'})
+
+    status, message = update_repository(path)
+
+    assert status == UPDATED, message
+    assert head_of(path) == str(sha)
+    assert os.path.exists(os.path.join(path, 'docs', 'assembly.md'))
+    assert not os.path.exists(os.path.join(path, 'cad', 'frame.stl'))  # Still sparse
+
+
+def test_updater_thread_reports_each_repository(mock_host, project_dir, monkeypatch):
+    import update_checker
+
+    monkeypatch.setattr(update_checker, '_default_cache', None)
+    tasks = []
+    for name in ('module-1', 'module-2'):
+        path = os.path.join(project_dir, name)
+        clone_repository(mock_host.address_for(name), path)
+        tasks.append(UpdateTask(name, path))
+    mock_host.update_module('module-2', files={'docs/assembly.md': b'# Assembly\n'})
+    updater = RepoUpdater(tasks, max_workers=2)
+    result = []
+    updater.finished.connect(result.append)
+
+    updater.run()
+
+    summary = result[0]
+    assert [name for name, _ in summary[UPDATED]] == ['module-2']
+    assert [name for name, _ in summary[UP_TO_DATE]] == ['module-1']
+    assert not summary[SKIPPED] and not summary['failed'] and not summary['cancelled']
@@ -0,0 +1,83 @@
+"""Status writer: coalesced, debounced ModuleInfo.txt status edits"""
+
+import time
+
+import pytest
+from PyQt5.QtCore import QCoreApplication
+
+import status_writer
+from status_writer import ModuleStatusWriter, apply_status_edits
+
+CONTENT = "[Module Name] Frame\n[Team/Assigned] Nobody\n[Completed] No\n"
+
+
+@pytest.fixture
+def info_path(tmp_path):
+    path = tmp_path / "ModuleInfo.txt"
+    path.write_text(CONTENT, encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    written = []
+    atomic_write = status_writer.atomic_write
+
+    def counting_write(path, content):
+        written.append(path)
+        atomic_write(path, content)
+
+    monkeypatch.setattr(status_writer, 'atomic_write', counting_write)
+    return written
+
+
+def test_edits_to_one_file_are_written_once(info_path, writes):
+    writer = ModuleStatusWriter()
+    writer.queue(info_path, assigned_to="Alice")
+    writer.queue(info_path, completion_status='in_progress')
+    writer.queue(info_path, assigned_to="Bobby", completion_status='completed')
+
+    writer.flush(wait=True)
+
+    assert len(writes) == 1
+    with open(info_path, encoding='utf-8') as f:
+        content = f.read()
+    assert "[Team/Assigned] Bobby" in content
+    assert "[Completed] Yes" in content
+    assert "Alice" not in content and "Nobody" not in content
+
+
+def test_pending_edits_overlay_until_written(info_path, writes):
+    writer = ModuleStatusWriter()
+    writer.queue(info_path, completion_status='completed')
+
+    assert writer.pending_edits(info_path) == {'completion_status': 'completed'}
+    assert not writes
+
+    writer.flush(wait=True)
+
+    assert writer.pending_edits(info_path) == {}
+
+
+def test_debounce_timer_writes_after_a_quiet_period(info_path, writes):
+    app = QCoreApplication.instance() or QCoreApplication([])
+    writer = ModuleStatusWriter(debounce_ms=50)
+    writer.queue(info_path, assigned_to="Alice")
+    writer.queue(info_path, assigned_to="Bobby")
+
+    deadline = time.monotonic() + 5
+    while writer.pending_edits(info_path) and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+
+    assert len(writes) == 1
+    with open(info_path, encoding='utf-8') as f:
+        assert "[Team/Assigned] Bobby" in f.read()
+
+
+def test_apply_status_edits_replaces_or_appends_tags():
+    replaced = apply_status_edits(CONTENT, {'assigned_to': "Alice", 'completion_status': 'not_started'})
+    assert replaced == "[Module Name] Frame\n[Team/Assigned] Alice\n[Completed] No\n"
+
+    appended = apply_status_edits("[Module Name] Frame", {'completion_status': 'in_progress'})
+    assert appended == "[Module Name] Frame\n[Completed] In progress"
@@ -0,0 +1,95 @@
+"""Update checks: remote heads cached for a TTL and compared with the local HEAD"""
+
+import os
+import time
+
+import pygit2
+import pytest
+
+from object_store import clone_repository
+from update_checker import RemoteHeadCache, UpdateCheckThread, check_repository
+
+
+def remote_head(mock_host, name):
+    return str(pygit2.Repository(mock_host.modules[name]['path']).references['refs/heads/main'].target)
+
+
+@pytest.fixture
+def checkout(mock_host, project_dir):
+    path = os.path.join(project_dir, 'module-1')
+    clone_repository(mock_host.address_for('module-1'), path)
+    return path
+
+
+def test_cached_head_expires_after_the_ttl():
+    cache = RemoteHeadCache(ttl=0.1)
+    cache.put("https://example.com/mock/module-1", 'main', 'abc123')
+
+    assert cache.get("https://example.com/mock/module-1", 'main') == 'abc123'
+    assert cache.get("https://example.com/mock/module-1", 'release') is None
+    time.sleep(0.15)
+    assert cache.get("https://example.com/mock/module-1", 'main') is None
+
+
+def test_resolve_asks_the_host_once_per_ttl(mock_host):
+    cache = RemoteHeadCache(ttl=0.2)
+    address = mock_host.address_for('module-1')
+
+    before = mock_host.request_count
+    assert cache.resolve(address, 'main') == remote_head(mock_host, 'module-1')
+    resolved = mock_host.request_count
+    assert resolved > before
+
+    assert cache.resolve(address, 'main') == remote_head(mock_host, 'module-1')
+    assert mock_host.request_count == resolved
+
+    cache.resolve(address, 'main', fresh=True)
+    assert mock_host.request_count > resolved
+
+    after_fresh = mock_host.request_count
+    time.sleep(0.25)
+    cache.resolve(address, 'main')
+    assert mock_host.request_count > after_fresh
+
+
+def test_unreachable_head_is_not_cached(mock_host):
+    cache = RemoteHeadCache()
+
+    assert cache.resolve(mock_host.address_for('no-such-module'), 'main') is None
+    assert cache.get(mock_host.address_for('no-such-module'), 'main') is None
+
+
+def test_check_reports_new_remote_commits(mock_host, checkout):
+    cache = RemoteHeadCache()
+    local = str(pygit2.Repository(checkout).head.target)
+
+    assert check_repository(checkout, cache=cache) == (False, local, local)
+
+    sha = str(mock_host.update_module('module-1', files={'docs/assembly.md': b'# Assembly\n'}))
+    # Still cached: the move isn't seen until the TTL runs out or a fresh check
+    assert check_repository(checkout, cache=cache)[0] is False
+    assert check_repository(checkout, cache=cache, fresh=True) == (True, local, sha)
+
+
+def test_local_commits_ahead_are_not_an_update(mock_host, checkout):
+    repo = pygit2.Repository(checkout)
+    remote = str(repo.head.target)
+    signature = pygit2.Signature("Local", "local@example.com")
+    local = repo.create_commit('HEAD', signature, signature, "Local commit", repo.head.peel().tree.id,
+                               [repo.head.target])
+
+    assert check_repository(checkout, cache=RemoteHeadCache()) == (False, str(local), remote)
+
+
+def test_check_thread_reports_every_path(mock_host, project_dir, checkout):
+    other = os.path.join(project_dir, 'module-2')
+    clone_repository(mock_host.address_for('module-2'), other)
+    mock_host.update_module('module-2', files={'docs/assembly.md': b'# Assembly\n'})
+    thread = UpdateCheckThread([(checkout, None), (other, 'main')], cache=RemoteHeadCache())
+    result = []
+    thread.finished.connect(result.append)
+
+    thread.run()
+
+    assert result[0][checkout][0] is False
+    assert result[0][other][0] is True